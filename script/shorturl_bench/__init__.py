@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""短链接服务压测工具包
+
+原来的三个脚本共用这里的各层实现，性能相关的修改只需要改一处:
+    engine          请求处理函数、线程池/asyncio/开环引擎、多进程分片和分布式分发
+    workload        请求的生成：随机URL、混合读写、开环速率曲线
+    stats           固定内存的延迟直方图、请求汇总和每秒时间线
+    report          终端输出、结果文件字段和图表（matplotlib/NumPy 只在画图时导入）
+    scenarios       创建、获取、混合读写、端到端和容量搜索等测试场景
+    cli / visual    命令行参数版本和环境变量 + 图表版本的入口
+
+统一入口为 python -m shorturl_bench <命令>，见 __main__.py。
+本模块不导入任何子模块，保证代理等进程启动时只加载用到的部分。
+"""
+
+import os
+import sys
+
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def bench_command(*args):
+    """在子进程中运行本工具包某个命令的参数列表"""
+    return [sys.executable, "-m", __name__, *args]
+
+
+def bench_env(env=None):
+    """子进程的环境变量：把工具包所在目录加入 PYTHONPATH，子进程可以在任意工作目录下运行"""
+    env = dict(os.environ if env is None else env)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [PACKAGE_ROOT, env.get("PYTHONPATH")]))
+    return env
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""统一命令行入口: python -m shorturl_bench <命令> [参数...]
+
+命令对应的模块在选中后才导入，例如 agent 和 stub 不会加载压测引擎，
+只有画图或选键时才会加载 matplotlib / NumPy。
+"""
+
+import importlib
+import sys
+
+# 命令 -> (模块, 说明)
+COMMANDS = {
+    "run": ("cli", "命令行参数配置的压测：创建、获取、混合读写、开环、分布式和容量搜索"),
+    "visual": ("visual", "环境变量配置的端到端压测，保存结果文件并生成图表"),
+    "log": ("result_log", "从逐请求结果日志离线重新统计和画图"),
+    "report": ("html_report", "从保存的结果文件生成自包含的 HTML 报告（汇总、百分位、时间线和对比）"),
+    "compare": ("compare_results", "与基线结果比较，发现性能回归时以退出码 1 结束"),
+    "corpus": ("url_corpus", "生成和查看URL语料文件"),
+    "stub": ("stub_server", "启动本地替身服务"),
+    "agent": ("load_agent", "启动分布式压测代理"),
+}
+
+
+def print_usage():
+    print("用法: python -m shorturl_bench <命令> [参数...]\n\n命令:")
+    for name, (_, description) in COMMANDS.items():
+        print(f"  {name:<8} {description}")
+    print("\n各命令的参数见 python -m shorturl_bench <命令> --help")
+
+
+def main(argv=None):
+    """按第一个参数选择命令，其余参数交给对应模块的 main"""
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in COMMANDS:
+        print_usage()
+        return 0 if argv and argv[0] in ('-h', '--help') else 2
+    module = importlib.import_module(f"{__package__}.{COMMANDS[argv[0]][0]}")
+    return module.main(argv[1:])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+"""run 命令（原 advanced_test_short_url.py）：命令行参数配置的创建、获取、混合读写和容量搜索测试"""
+
+import argparse
+import importlib.util
+import sys
+from datetime import datetime
+
+from .engine import DEFAULT_CONFIG
+from .key_distribution import parse_key_distribution
+from .load_agent import get_authkey, start_local_agents, stop_local_agents
+from .result_log import reset_log
+from .scenarios import (parse_duration_ms, run_end_to_end_test, test_capacity, test_create_performance,
+                        test_cold_warm_reads, test_get_performance, test_mixed_performance, test_near_cache,
+                        test_consumer_throughput, test_replay, test_write_propagation)
+from .server_metrics import MetricsSampler
+from .workload import load_rate_curve, parse_mix
+
+
+def positive_int(value):
+    """argparse 的类型：至少为 1 的整数"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"必须是正整数: {value}")
+    return number
+
+
+def parse_arguments(argv=None):
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(prog='python -m shorturl_bench run', description='短链接服务性能测试工具')
+    parser.add_argument('--type', '-t', choices=['create', 'get', 'both'], default='both',
+                        help='测试类型: 创建短链接(create), 获取原始URL(get), 或两者都测试(both)')
+    parser.add_argument('--requests', '-r', type=int, default=DEFAULT_CONFIG["requests"],
+                        help=f'请求数量 (默认: {DEFAULT_CONFIG["requests"]})')
+    parser.add_argument('--concurrency', '-c', type=int, default=DEFAULT_CONFIG["concurrency"],
+                        help=f'并发数 (默认: {DEFAULT_CONFIG["concurrency"]})')
+    parser.add_argument('--base-url', '-u', default=DEFAULT_CONFIG["base_url"],
+                        help=f'API基础URL (默认: {DEFAULT_CONFIG["base_url"]})')
+    parser.add_argument('--output', '-o', default=DEFAULT_CONFIG["output_file"],
+                        help='输出结果保存文件名')
+    parser.add_argument('--url-file', '-f', default=DEFAULT_CONFIG["url_file"],
+                        help='包含短链接的JSON文件 (用于get测试)')
+    parser.add_argument('--verbose', '-v', action='store_true',
+                        help='显示详细信息')
+    parser.add_argument('--engine', '-e', choices=['threads', 'asyncio'], default=DEFAULT_CONFIG["engine"],
+                        help='压测引擎: 线程池(threads) 或 单事件循环+长连接池(asyncio，需要 aiohttp)')
+    parser.add_argument('--connections', type=int, default=DEFAULT_CONFIG["connections"],
+                        help=f'asyncio 引擎的长连接池大小 (默认: {DEFAULT_CONFIG["connections"]})')
+    parser.add_argument('--processes', '-p', type=int, default=DEFAULT_CONFIG["processes"],
+                        help='压测进程数，请求数、并发数和连接池按进程平分，结果合并后统一统计 (默认: 1)')
+    parser.add_argument('--rate', type=float, default=DEFAULT_CONFIG["rate"],
+                        help='开环模式的固定到达速率 (每秒请求数)，按固定时间线发送请求，并发数作为在途请求上限')
+    parser.add_argument('--rate-file',
+                        help='开环模式的速率曲线CSV文件，每行为: 起始秒数,每秒请求数')
+    parser.add_argument('--key-dist', '-k', default=DEFAULT_CONFIG["key_dist"],
+                        help='获取测试的键访问分布: sequential(每个短链接访问一次), uniform, zipf:S, '
+                             'hotspot:热点键比例:热点流量比例, list:FILE (默认: sequential)')
+    parser.add_argument('--seed', type=int, default=DEFAULT_CONFIG["seed"],
+                        help='键分布的随机种子，便于复现同一组访问序列')
+    parser.add_argument('--cache-ttl', type=float, default=DEFAULT_CONFIG["cache_ttl"],
+                        help=f'服务端 Redis 缓存的过期时间(秒)，用于推测缓存命中 (默认: {DEFAULT_CONFIG["cache_ttl"]:.0f})')
+    parser.add_argument('--mix', '-m',
+                        help='混合读写模式，读写比例 "读:写"，例如 80:20；读请求从已创建成功的短链接池中选取，'
+                             '--url-file 可提供初始池')
+    parser.add_argument('--log-file', '-l',
+                        help='测试过程中流式写入逐请求结果的JSONL文件 (.gz 结尾时压缩)，可用 result_log.py 离线重新统计')
+    parser.add_argument('--url-corpus',
+                        help='创建测试使用的URL语料文件（由 url_corpus.py generate 生成），不指定时在内存中批量生成')
+    parser.add_argument('--agents',
+                        help='分布式压测：逗号分隔的代理地址 host:port（在各压测机上运行 load_agent.py），'
+                             '请求数、并发数和速率按代理平分，结果合并后统一统计')
+    parser.add_argument('--local-agents', type=int, default=0,
+                        help='在本机启动指定数量的代理进程代替多台压测机（用于验证分布式模式）')
+    parser.add_argument('--find-capacity', action='store_true',
+                        help='容量搜索：以开环速率逐级加压并二分查找满足 SLO 的最大吞吐量，创建和获取分别搜索 (--rate 为起始速率)')
+    parser.add_argument('--slo-p99', default='50ms',
+                        help='容量搜索的 P99 上限，例如 50ms (默认: 50ms)')
+    parser.add_argument('--slo-error-rate', type=float, default=DEFAULT_CONFIG["slo_error_rate"],
+                        help=f'容量搜索允许的错误率 (默认: {DEFAULT_CONFIG["slo_error_rate"]})')
+    parser.add_argument('--step-duration', type=float, default=DEFAULT_CONFIG["step_duration"],
+                        help=f'容量搜索每个阶梯的持续时间(秒) (默认: {DEFAULT_CONFIG["step_duration"]:g})')
+    parser.add_argument('--max-steps', type=int, default=DEFAULT_CONFIG["max_steps"],
+                        help=f'容量搜索最多运行的阶梯数 (默认: {DEFAULT_CONFIG["max_steps"]})')
+    parser.add_argument('--capacity-chart',
+                        help='吞吐量-延迟曲线图表文件 (默认: capacity_<时间戳>.png)')
+    parser.add_argument('--metrics-endpoint', action='append',
+                        help='测试期间抓取的 Actuator Prometheus 端点，例如 http://localhost:8081/actuator/prometheus；'
+                             '可重复指定或用逗号分隔多个实例，指标按秒与客户端 P99 对齐比较')
+    parser.add_argument('--metrics-interval', type=float, default=DEFAULT_CONFIG["metrics_interval"],
+                        help=f'服务端指标的抓取间隔(秒) (默认: {DEFAULT_CONFIG["metrics_interval"]:g})')
+    parser.add_argument('--phase-timing', action='store_true',
+                        help='线程池引擎改用分阶段计时的客户端，分别统计 DNS、连接、TLS、请求写入、首字节等待和响应读取的耗时')
+    parser.add_argument('--probe-propagation', action='store_true',
+                        help='写入传播探测：创建短链接的同时轮询只查数据库的 /short-url/info，测量创建到持久化的延迟、'
+                             '未持久化的数量，以及缓存过期时尚未持久化而读取返回 404 的数量 (--rate 可限制创建速率)')
+    parser.add_argument('--probe-interval', type=float, default=DEFAULT_CONFIG["probe_interval"],
+                        help=f'写入传播探测的轮询间隔(秒) (默认: {DEFAULT_CONFIG["probe_interval"]:g})')
+    parser.add_argument('--probe-timeout', type=float, default=DEFAULT_CONFIG["probe_timeout"],
+                        help=f'创建结束后等待持久化的最长时间(秒)，超时仍未出现的记为未持久化 '
+                             f'(默认: {DEFAULT_CONFIG["probe_timeout"]:g})')
+    parser.add_argument('--probe-sample', type=int, default=DEFAULT_CONFIG["probe_sample"],
+                        help='写入传播探测和消费者吞吐量测试只跟踪每 N 个短链接中的一个，减少轮询量 (默认: 1，全部跟踪)')
+    parser.add_argument('--consumer-bench', action='store_true',
+                        help='消费者吞吐量测试：尽快创建 --requests 个短链接 (可配合 --batch-size)，'
+                             '测量 Kafka 消费者每秒写入 MySQL 的行数、积压和排空时间')
+    parser.add_argument('--replay',
+                        help='回放访问日志：nginx 访问日志（nginx.conf 的 timed 格式或 combined 格式）或 JSONL 轨迹，'
+                             '可为 .gz；按日志中的时间点发送创建和获取请求，日志中的短码换成预先创建的短码')
+    parser.add_argument('--speed', type=float, default=DEFAULT_CONFIG["replay_speed"],
+                        help=f'回放速度倍数，2 表示两倍速 (默认: {DEFAULT_CONFIG["replay_speed"]:g})')
+    parser.add_argument('--cold-warm', action='store_true',
+                        help='冷读/热读测试：创建 --requests 个短链接，让缓存失效后分别测量第一次读取(MySQL)和重复读取(Redis)')
+    parser.add_argument('--cache-flush',
+                        help='冷读测试让缓存失效的方法：http(s) 地址时发送 POST（替身服务为 .../stub/flush-cache），'
+                             '否则作为 shell 命令执行；不指定时等待一个 --cache-ttl')
+    parser.add_argument('--warm-reads', type=int, default=DEFAULT_CONFIG["warm_reads"],
+                        help=f'冷读之后每个键重复读取的次数 (默认: {DEFAULT_CONFIG["warm_reads"]})')
+    parser.add_argument('--herd', type=int, default=DEFAULT_CONFIG["herd_clients"],
+                        help='惊群测试：缓存失效后同时读取同一个键的客户端数，0 表示不测试 (默认: 0)')
+    parser.add_argument('--herd-keys', type=positive_int, default=DEFAULT_CONFIG["herd_keys"],
+                        help=f'惊群测试依次使用的键数 (默认: {DEFAULT_CONFIG["herd_keys"]})')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_CONFIG["batch_size"],
+                        help='创建测试每个请求通过 POST /short-url/batch 创建的短链接数，--requests 为短链接总数；'
+                             '大于 1 时同时报告每秒请求数和每秒创建的短链接数 (默认: 1，即逐个创建)')
+    parser.add_argument('--near-cache-compare', action='store_true',
+                        help='近端缓存对比：同一组偏斜读取 (--key-dist，默认 zipf:1.1) 分别在近端缓存关闭和开启时运行，'
+                             '比较吞吐量和 P99；需要 --near-cache-endpoint')
+    parser.add_argument('--near-cache-endpoint', action='append',
+                        help='各实例的近端缓存开关端点，例如 http://localhost:8081/actuator/nearcache；'
+                             '可重复指定或用逗号分隔多个实例')
+    parser.add_argument('--profile',
+                        help='压测期间对压测客户端自身做采样分析，把所有线程的调用栈写成折叠栈文件，'
+                             '可用 flamegraph.pl 或 speedscope 查看；各阶段追加到同一个文件，多进程时每个进程写自己的分片文件')
+    parser.add_argument('--profile-interval', type=float, default=DEFAULT_CONFIG["profile_interval"],
+                        help=f'采样分析的间隔(毫秒) (默认: {DEFAULT_CONFIG["profile_interval"]:g})')
+    parser.add_argument('--live', action='store_true',
+                        help='用每秒一行的实时视图(上一秒的请求数、错误率、P50/P99)代替进度条')
+    
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """主函数"""
+    args = parse_arguments(argv)
+    
+    config = {
+        "base_url": args.base_url,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "output_file": args.output,
+        "url_file": args.url_file,
+        "verbose": args.verbose,
+        "save_urls": False,
+        "engine": args.engine,
+        "connections": args.connections,
+        "processes": args.processes,
+        "rate": args.rate,
+        "rate_curve": load_rate_curve(args.rate_file) if args.rate_file else None,
+        "log_file": args.log_file,
+        "key_dist": args.key_dist,
+        "seed": args.seed,
+        "cache_ttl": args.cache_ttl,
+        "mix": None,
+        "live": args.live,
+        "progress": not args.live,
+        "agents": args.agents.split(',') if args.agents else None,
+        "agent_authkey": get_authkey(),
+        "url_corpus": args.url_corpus,
+        "slo_error_rate": args.slo_error_rate,
+        "step_duration": args.step_duration,
+        "max_steps": args.max_steps,
+        "capacity_tolerance": DEFAULT_CONFIG["capacity_tolerance"],
+        "capacity_chart": None,
+        "metrics_endpoints": [endpoint for value in args.metrics_endpoint or [] for endpoint in value.split(',')] or None,
+        "metrics_interval": args.metrics_interval,
+        "phase_timing": args.phase_timing,
+        "phase_keep_alive": DEFAULT_CONFIG["phase_keep_alive"],
+        "probe_interval": args.probe_interval,
+        "probe_timeout": args.probe_timeout,
+        "probe_sample": max(1, args.probe_sample),
+        "replay_file": args.replay,
+        "replay_speed": args.speed,
+        "profile_file": args.profile,
+        "profile_interval": args.profile_interval,
+        "cache_flush": args.cache_flush,
+        "warm_reads": args.warm_reads,
+        "herd_clients": args.herd,
+        "herd_keys": args.herd_keys,
+        "batch_size": max(1, args.batch_size),
+        "near_cache_endpoints": [endpoint for value in args.near_cache_endpoint or []
+                                 for endpoint in value.split(',')] or None
+    }
+    
+    if config["engine"] == "asyncio" and importlib.util.find_spec("aiohttp") is None:
+        print("错误: asyncio 引擎需要安装 aiohttp (pip install aiohttp)")
+        sys.exit(1)
+    
+    if args.near_cache_compare and not config["near_cache_endpoints"]:
+        print("错误: 近端缓存对比需要指定 --near-cache-endpoint")
+        sys.exit(1)
+    
+    if config["replay_speed"] <= 0:
+        print("错误: --speed 必须大于 0")
+        sys.exit(1)
+    
+    if config["profile_interval"] <= 0:
+        print("错误: --profile-interval 必须大于 0")
+        sys.exit(1)
+    
+    if config["batch_size"] > 1 and config["phase_timing"]:
+        print("错误: --phase-timing 不支持批量创建 (--batch-size)")
+        sys.exit(1)
+    
+    if config["log_file"]:
+        reset_log(config["log_file"])
+    if config["profile_file"]:
+        reset_log(config["profile_file"])
+    
+    try:
+        parse_key_distribution(config["key_dist"])
+        if args.mix:
+            config["mix"] = parse_mix(args.mix)
+        if args.find_capacity:
+            config["slo_p99"] = parse_duration_ms(args.slo_p99)
+            config["capacity_chart"] = (args.capacity_chart or
+                                        f"capacity_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png")
+    except ValueError as e:
+        print(f"错误: {e}")
+        sys.exit(1)
+    
+    local_agents = None
+    if args.local_agents:
+        local_agents = start_local_agents(args.local_agents)
+        config["agents"] = (config["agents"] or []) + local_agents[0]
+    
+    print(f"配置信息:")
+    for key, value in config.items():
+        if value is not None and key != "agent_authkey":
+            print(f"  {key}: {value}")
+    
+    if config["metrics_endpoints"]:
+        # 在打印配置之后启动，避免采样器对象出现在配置信息里
+        config["server_metrics"] = MetricsSampler(config["metrics_endpoints"], config["metrics_interval"]).start()
+    
+    try:
+        if args.near_cache_compare:
+            test_near_cache(config)
+        elif args.cold_warm:
+            if test_cold_warm_reads(config) is None:
+                sys.exit(1)
+        elif config["replay_file"]:
+            test_replay(config)
+        elif args.consumer_bench:
+            test_consumer_throughput(config)
+        elif args.probe_propagation:
+            test_write_propagation(config)
+        elif args.find_capacity:
+            test_capacity(config, args.type)
+        elif config["mix"] is not None:
+            test_mixed_performance(config)
+        elif args.type == 'create':
+            test_create_performance(config)
+        elif args.type == 'get':
+            test_get_performance(config)
+        else:  # 'both'
+            run_end_to_end_test(config)
+    finally:
+        if config.get("server_metrics") is not None:
+            config["server_metrics"].stop()
+        if local_agents:
+            stop_local_agents(*local_agents)
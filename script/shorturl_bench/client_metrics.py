@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""压测客户端的自我监测：判断吞吐量上不去时瓶颈在客户端还是服务端
+
+每个压测进程在发送请求期间运行一个 ClientMonitor，记录到 stats.ClientMetrics：
+- 进程占用的 CPU 核数（每秒采样）。Python 线程受 GIL 限制，一个进程接近 1 个核就已经饱和；
+- 监视线程每 10 毫秒 sleep 一次，超出的时间就是线程等待 GIL 或 CPU 调度的时间；
+- 开环模式下实际发送时刻与计划发送时刻之差（调度延迟），以及在途和已到发送时刻但还在排队的请求数；
+- 每个请求完成后处理结果（记入统计、时间线、结果日志、刷新进度条）占用的 CPU 时间。用线程 CPU 时间
+  （time.thread_time）而不是墙钟时间，否则多个线程争用 GIL 时等待 GIL 的时间也会算进去。
+
+StackSampler 是可选的墙钟采样分析器：按固定间隔抓取所有线程的调用栈，写成 flamegraph.pl 和 speedscope
+都能读取的折叠栈格式（每行 "帧1;帧2;帧3 次数"）。各测试阶段追加到同一个文件，阶段名是栈的根节点。
+"""
+
+import collections
+import os
+import re
+import sys
+import threading
+import time
+
+from .stats import ClientMetrics
+
+# 一个进程平均占用的 CPU 核数超过这个值时认为客户端已饱和（GIL 下纯 Python 线程实际很难超过 0.9 个核）
+CPU_SATURATION = 0.8
+# 监视线程 sleep 超时的 P99 超过这个毫秒数时，线程在等待 GIL 或 CPU
+STALL_P99_MS = 10.0
+# 开环模式调度延迟的 P99 超过这个毫秒数时，请求没能按计划发出
+SCHEDULE_LAG_P99_MS = 10.0
+# 结果处理平均占用的 CPU 核数超过这个值时，结果处理本身成了瓶颈
+HANDLING_SHARE = 0.25
+# 平均排队的请求数超过并发上限的这个比例时，并发上限（线程数/信号量）不够
+QUEUED_SHARE = 0.1
+
+
+class ClientMonitor:
+    """当前进程的压测客户端监测，计数方法在请求线程中调用，采样在后台线程中进行"""
+
+    def __init__(self, concurrency, interval=1.0, probe_interval=0.01):
+        self.metrics = ClientMetrics()
+        self.concurrency = concurrency
+        self.interval = interval
+        self.probe_interval = probe_interval
+        self.submitted = 0
+        self.started = 0
+        self.finished = 0
+        self.handling_seconds = 0.0
+        self._samples = {"cpu": [], "in_flight": [], "queued": []}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="client-monitor", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """停止采样，把本进程的汇总写入 metrics"""
+        self._stopped.set()
+        self._thread.join()
+        self.metrics.processes.append({"pid": os.getpid(), "concurrency": self.concurrency,
+                                       "interval": self.interval, "handling_seconds": self.handling_seconds,
+                                       **self._samples})
+        return self.metrics
+
+    def request_submitted(self):
+        """开环模式：请求到了计划发送时刻，交给线程池或协程"""
+        with self._lock:
+            self.submitted += 1
+
+    def request_started(self, planned_time=None):
+        """请求真正开始发送；planned_time 为计划发送时刻（time.perf_counter()）"""
+        lag = (time.perf_counter() - planned_time) * 1000 if planned_time is not None else None
+        with self._lock:
+            self.started += 1
+            if lag is not None:
+                self.metrics.schedule_lag.record(max(0.0, lag))
+
+    def request_finished(self):
+        with self._lock:
+            self.finished += 1
+
+    def result_handled(self, seconds):
+        """处理完一个结果，seconds 为处理占用的线程 CPU 时间"""
+        with self._lock:
+            self.handling_seconds += seconds
+            self.metrics.handling.record(seconds * 1000)
+
+    def _run(self):
+        last_cpu, last_wall = time.process_time(), time.perf_counter()
+        next_sample = last_wall + self.interval
+        while True:
+            before = time.perf_counter()
+            if self._stopped.wait(self.probe_interval):
+                return
+            now = time.perf_counter()
+            stall = (now - before - self.probe_interval) * 1000
+            with self._lock:
+                self.metrics.stall.record(max(0.0, stall))
+            if now < next_sample:
+                continue
+            cpu = time.process_time()
+            with self._lock:
+                in_flight = self.started - self.finished
+                queued = max(0, self.submitted - self.started)
+            self._samples["cpu"].append((cpu - last_cpu) / (now - last_wall))
+            self._samples["in_flight"].append(in_flight)
+            self._samples["queued"].append(queued)
+            last_cpu, last_wall = cpu, now
+            next_sample += self.interval
+
+
+def mean(values):
+    return sum(values) / len(values) if values else 0.0
+
+
+def client_metrics_report(metrics):
+    """汇总客户端指标并判断客户端是否饱和，返回可写入 JSON 的字典，warnings 为饱和的原因
+
+    排队数只在开环模式下计数（闭环模式没有计划发送时刻，请求不会排队），调度延迟同理。
+    """
+    processes = []
+    warnings = []
+    for process in metrics.processes:
+        # 只统计有请求在途或排队的秒，排除开始前的等待
+        active = [i for i, (in_flight, queued) in enumerate(zip(process["in_flight"], process["queued"]))
+                  if in_flight or queued] or list(range(len(process["cpu"])))
+        cpu = [process["cpu"][i] for i in active]
+        active_seconds = len(active) * process["interval"]
+        summary = {
+            "pid": process["pid"],
+            "cpu_mean": mean(cpu),
+            "cpu_max": max(cpu, default=0.0),
+            "in_flight_mean": mean([process["in_flight"][i] for i in active]),
+            "queued_mean": mean([process["queued"][i] for i in active]),
+            "concurrency": process["concurrency"],
+            "handling_share": process["handling_seconds"] / active_seconds if active_seconds else 0.0,
+        }
+        processes.append(summary)
+        if summary["cpu_mean"] >= CPU_SATURATION:
+            warnings.append(f"进程 {summary['pid']} 平均占用 {summary['cpu_mean']:.2f} 个 CPU 核，受 GIL 限制已接近上限")
+        if summary["handling_share"] >= HANDLING_SHARE:
+            warnings.append(f"进程 {summary['pid']} 处理结果占用了 {summary['handling_share']:.2f} 个 CPU 核")
+        if summary["queued_mean"] > QUEUED_SHARE * summary["concurrency"]:
+            warnings.append(f"进程 {summary['pid']} 平均有 {summary['queued_mean']:.1f} 个请求已到发送时刻但在客户端排队 "
+                            f"(并发上限 {summary['concurrency']})")
+    stall_p99 = metrics.stall.percentile(99) if metrics.stall.count else 0.0
+    if stall_p99 >= STALL_P99_MS:
+        warnings.append(f"线程调度停顿 P99 {stall_p99:.1f} 毫秒，线程在等待 GIL 或 CPU")
+    lag_p99 = metrics.schedule_lag.percentile(99) if metrics.schedule_lag.count else 0.0
+    if lag_p99 >= SCHEDULE_LAG_P99_MS:
+        warnings.append(f"调度延迟 P99 {lag_p99:.1f} 毫秒，请求没能按计划时刻发出")
+    return {
+        "processes": processes,
+        "stall": {"p50": metrics.stall.percentile(50), "p99": stall_p99, "max": metrics.stall.max},
+        "schedule_lag": {"p50": metrics.schedule_lag.percentile(50), "p99": lag_p99,
+                         "max": metrics.schedule_lag.max} if metrics.schedule_lag.count else None,
+        "handling": {"mean": metrics.handling.mean(), "p99": metrics.handling.percentile(99)},
+        "warnings": warnings,
+    }
+
+
+def print_client_metrics(report):
+    """打印客户端自身的指标；有饱和迹象时给出明确的警告"""
+    if not report["processes"]:
+        return
+    print("\n压测客户端:")
+    for process in report["processes"]:
+        print(f"  进程 {process['pid']}: CPU 平均 {process['cpu_mean']:.2f} 核 (最高 {process['cpu_max']:.2f}), "
+              f"在途 {process['in_flight_mean']:.1f} / {process['concurrency']}, 排队 {process['queued_mean']:.1f}, "
+              f"结果处理 {process['handling_share']:.2f} 核")
+    stall = report["stall"]
+    print(f"  调度停顿 P50/P99/最大: {stall['p50']:.2f} / {stall['p99']:.2f} / {stall['max']:.2f} 毫秒")
+    if report["schedule_lag"]:
+        lag = report["schedule_lag"]
+        print(f"  调度延迟 (实际 - 计划发送时刻) P50/P99/最大: {lag['p50']:.2f} / {lag['p99']:.2f} / {lag['max']:.2f} 毫秒")
+    handling = report["handling"]
+    print(f"  每个结果的处理 CPU 时间: 平均 {handling['mean']:.3f} 毫秒, P99 {handling['p99']:.3f} 毫秒")
+    if report["warnings"]:
+        print("警告: 压测客户端可能是瓶颈，测得的吞吐量和延迟反映的是客户端而不是服务端的上限:")
+        for warning in report["warnings"]:
+            print(f"  - {warning}")
+        print("  可以增加 --processes、改用 --engine asyncio、关闭进度条 (--live) 或使用分布式代理 (--agents)")
+
+
+def thread_group(name):
+    """线程池中的线程名去掉序号，同一个池的线程合并为一个根节点"""
+    return re.sub(r'[_-]?\d+$', '', name) or name
+
+
+class StackSampler:
+    """墙钟采样分析器：按间隔抓取所有线程的调用栈，停止时追加到折叠栈文件
+
+    等待网络的线程也会被采到（停在 socket 读写上），因此能看出时间花在等待服务端还是客户端自身的代码上。
+    label 为栈的根节点（测试阶段名），同一个文件中的多个阶段在火焰图中分开显示。
+    """
+
+    def __init__(self, filename, interval=0.005, label=None):
+        self.filename = filename
+        self.interval = interval
+        self.label = label
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+        with open(self.filename, 'a', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return self.filename
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                frames = []
+                while frame is not None:
+                    code = frame.f_code
+                    frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                frames.append(thread_group(names.get(ident, str(ident))))
+                if self.label:
+                    frames.append(self.label.replace(";", " "))
+                # 折叠栈格式从根到叶，分号分隔，最后一个空格后是次数；帧名中不能有换行
+                self.stacks[";".join(reversed(frames)).replace("\n", " ")] += 1
+            self.samples += 1
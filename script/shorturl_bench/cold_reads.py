@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""冷读与热读：让缓存失效的方法，以及很多客户端同时读取同一个已过期键的"惊群"请求
+
+ShortUrlServiceImpl.getOriginalUrl 先读 Redis，未命中时查 MySQL 并以固定 TTL 回填。
+缓存失效后的第一次读取走数据库（冷路径），之后的读取命中 Redis（热路径）。
+同一个键过期的瞬间有很多客户端同时读取时，在第一个回填完成之前的请求都会查一次数据库。
+"""
+
+import subprocess
+import threading
+import time
+
+import requests
+
+from .engine import get_original_url, timed_request
+from .stats import LatencyHistogram
+
+
+def make_cache_cold(config):
+    """让已创建的短链接全部从缓存中失效，清空失败时打印错误并返回 False
+
+    cache_flush 为 http(s) 地址时向它发送 POST（例如替身服务的 /stub/flush-cache），
+    为其他字符串时作为 shell 命令执行（例如 redis-cli 删除 short_url:* 键），不指定时等待一个缓存 TTL。
+    """
+    flush = config.get("cache_flush")
+    try:
+        if not flush:
+            wait = config["cache_ttl"] + 1.0
+            print(f"等待 {wait:g} 秒让缓存过期 (可用 --cache-flush 直接清空缓存)...")
+            time.sleep(wait)
+        elif flush.startswith(("http://", "https://")):
+            print(f"清空缓存: POST {flush}")
+            requests.post(flush).raise_for_status()
+        else:
+            print(f"清空缓存: {flush}")
+            subprocess.run(flush, shell=True, check=True)
+    except (requests.RequestException, subprocess.CalledProcessError, OSError) as e:
+        print(f"错误: 清空缓存失败 (--cache-flush {flush}): {e}")
+        return False
+    return True
+
+
+def run_herd(executor, clients, short_url, base_url, verbose=False):
+    """clients 个线程在同一时刻读取同一个短链接，返回这些请求的 (延迟直方图, 失败数)
+
+    executor 至少要有 clients 个线程，并在多轮之间复用，使每个线程的长连接在放行前已经建立。
+    """
+    histogram = LatencyHistogram()
+    failures = 0
+    lock = threading.Lock()
+    # 所有线程都就绪后同时放行，尽量让请求在同一个瞬间到达
+    barrier = threading.Barrier(clients)
+
+    def read(_):
+        nonlocal failures
+        barrier.wait()
+        result = timed_request(get_original_url, short_url, base_url, verbose)
+        with lock:
+            if result["status"] == "success":
+                histogram.record(result["response_time"])
+            else:
+                failures += 1
+
+    list(executor.map(read, range(clients)))
+    return histogram, failures
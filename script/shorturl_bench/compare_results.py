@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""性能回归检查：把新的测试结果与保存的基线结果比较，超过阈值时以非零状态退出
+
+基线和对比结果都是 visual 命令（visual_test_short_url.py）保存的 performance_results_<时间戳>.json。
+不指定 --candidate 时按基线的测试配置重新运行 visual 命令（可用 --base-url 指向新版本服务）。
+每个指标对基线和对比的多次运行分别重采样（bootstrap），给出均值相对变化的置信区间。
+
+    python -m shorturl_bench compare performance_results_*.json --runs 3
+    python -m shorturl_bench compare base1.json base2.json --candidate new1.json new2.json
+"""
+
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+from . import bench_command, bench_env
+
+PHASES = {"create_test": "创建短链接", "get_test": "获取原始URL"}
+# 指标 -> (显示名称, 数值越大越好)
+METRICS = {
+    "requests_per_second": ("吞吐量 (请求/秒)", True),
+    "p50_response_time": ("P50 (毫秒)", False),
+    "p99_response_time": ("P99 (毫秒)", False),
+}
+
+
+def load_results(filename):
+    """读取一个结果文件"""
+    with open(filename, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def workload_env(test_config, base_url=None):
+    """把基线的测试配置转换成 visual 命令的环境变量"""
+    env = bench_env()
+    env.update({
+        "SHORT_URL_API": base_url or test_config["base_url"],
+        "TEST_REQUESTS": str(test_config["num_requests"]),
+        "TEST_CONCURRENCY": str(test_config["max_workers"]),
+        "TEST_PROCESSES": str(test_config.get("processes", 1)),
+        "TEST_KEY_DIST": test_config.get("key_distribution", "sequential"),
+        "SAVE_RESULTS": "true",
+        "GENERATE_CHART": "false",
+        "STREAM_RESULTS": "false",
+    })
+    for key, name in (("key_seed", "TEST_KEY_SEED"), ("cache_ttl", "CACHE_TTL")):
+        if test_config.get(key) is not None:
+            env[name] = str(test_config[key])
+    # 客户端实现不同会影响测得的延迟，按基线使用的客户端重新运行
+    for key, name in (("phase_timing", "PHASE_TIMING"), ("phase_keep_alive", "PHASE_KEEP_ALIVE")):
+        if test_config.get(key) is not None:
+            env[name] = str(test_config[key]).lower()
+    env.pop("RESULT_LOG_FILE", None)
+    return env
+
+
+def run_workload(test_config, base_url=None):
+    """在临时目录中运行一次与基线相同的测试，返回保存的结果"""
+    with tempfile.TemporaryDirectory(prefix="compare_") as workdir:
+        subprocess.run(bench_command("visual"), cwd=workdir, env=workload_env(test_config, base_url), check=True)
+        result_files = glob.glob(os.path.join(workdir, "performance_results_*.json"))
+        if not result_files:
+            raise RuntimeError("测试没有生成结果文件")
+        return load_results(result_files[0])
+
+
+def metric_values(results_list, phase, metric):
+    """取出多次运行中某个指标的值，缺少该指标的结果跳过"""
+    return np.array([results[phase][metric] for results in results_list
+                     if metric in results.get(phase, {})], dtype=np.float64)
+
+
+def bootstrap_change(baseline, candidate, iterations=10000, confidence=0.95, seed=None):
+    """均值相对变化（百分比）的点估计和 bootstrap 置信区间
+
+    基线和对比分别有放回地重采样，各算一次均值后求相对变化；只有一次运行时区间退化为点估计。
+    """
+    change = (candidate.mean() / baseline.mean() - 1) * 100
+    rng = np.random.default_rng(seed)
+    baseline_means = rng.choice(baseline, size=(iterations, len(baseline))).mean(axis=1)
+    candidate_means = rng.choice(candidate, size=(iterations, len(candidate))).mean(axis=1)
+    changes = (candidate_means / baseline_means - 1) * 100
+    alpha = (1 - confidence) / 2
+    low, high = np.quantile(changes, [alpha, 1 - alpha])
+    return change, low, high
+
+
+def compare(baselines, candidates, thresholds, iterations=10000, confidence=0.95, seed=None):
+    """逐阶段逐指标比较，返回比较结果列表
+
+    变差幅度超过阈值、且置信区间整体落在变差一侧（排除了"没有变化"）时判定为回归。
+    """
+    rows = []
+    for phase in PHASES:
+        for metric, (_, higher_is_better) in METRICS.items():
+            baseline = metric_values(baselines, phase, metric)
+            candidate = metric_values(candidates, phase, metric)
+            if not len(baseline) or not len(candidate) or not baseline.mean():
+                continue
+            change, low, high = bootstrap_change(baseline, candidate, iterations, confidence, seed)
+            # 统一换算成"变差了多少"：吞吐量下降、延迟上升为正
+            worse, worse_low = (-change, -high) if higher_is_better else (change, low)
+            threshold = thresholds["throughput" if higher_is_better else "latency"]
+            rows.append({
+                "phase": phase,
+                "metric": metric,
+                "baseline": float(baseline.mean()),
+                "candidate": float(candidate.mean()),
+                "change": float(change),
+                "ci_low": float(low),
+                "ci_high": float(high),
+                "threshold": threshold,
+                "regression": bool(worse > threshold and worse_low > 0),
+            })
+    return rows
+
+
+def print_report(rows, confidence, baseline_runs, candidate_runs):
+    """打印比较结果"""
+    print(f"\n基线 {baseline_runs} 次运行, 对比 {candidate_runs} 次运行, 置信度 {confidence:.0%}")
+    if min(baseline_runs, candidate_runs) < 2:
+        print("提示: 只有一次运行时无法估计波动，置信区间退化为点估计；建议每侧至少运行 3 次")
+    for phase, label in PHASES.items():
+        phase_rows = [row for row in rows if row["phase"] == phase]
+        if not phase_rows:
+            continue
+        print(f"\n{label}:")
+        for row in phase_rows:
+            name = METRICS[row["metric"]][0]
+            verdict = f"回归 (阈值 {row['threshold']:.1f}%)" if row["regression"] else "通过"
+            print(f"  {name:<16} {row['baseline']:>10.2f} -> {row['candidate']:>10.2f}  "
+                  f"{row['change']:+7.2f}% [{row['ci_low']:+.2f}%, {row['ci_high']:+.2f}%]  {verdict}")
+
+
+def parse_arguments(argv=None):
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(prog='python -m shorturl_bench compare', description='与基线结果比较，检测性能回归')
+    parser.add_argument('baselines', nargs='+', help='基线结果文件 (performance_results_*.json)，可以是多次运行')
+    parser.add_argument('--candidate', nargs='+',
+                        help='要比较的结果文件；不指定时按基线配置重新运行测试')
+    parser.add_argument('--runs', '-n', type=int, default=3,
+                        help='不指定 --candidate 时重新运行测试的次数 (默认: 3)')
+    parser.add_argument('--base-url', '-u',
+                        help='重新运行测试时使用的API基础URL (默认: 基线中的地址)')
+    parser.add_argument('--max-throughput-drop', type=float, default=5.0,
+                        help='允许的吞吐量下降百分比 (默认: 5)')
+    parser.add_argument('--max-latency-increase', type=float, default=10.0,
+                        help='允许的 P50/P99 上升百分比 (默认: 10)')
+    parser.add_argument('--confidence', type=float, default=0.95,
+                        help='置信区间的置信度 (默认: 0.95)')
+    parser.add_argument('--bootstrap', type=int, default=10000,
+                        help='bootstrap 重采样次数 (默认: 10000)')
+    parser.add_argument('--seed', type=int, help='bootstrap 的随机种子')
+    parser.add_argument('--output', '-o', help='把比较结果保存为JSON文件')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """主函数，发现回归时返回 1"""
+    args = parse_arguments(argv)
+    baselines = [load_results(filename) for filename in args.baselines]
+
+    if args.candidate:
+        candidates = [load_results(filename) for filename in args.candidate]
+    else:
+        test_config = baselines[0]["test_config"]
+        candidates = []
+        for i in range(args.runs):
+            print(f"\n[{i + 1}/{args.runs}] 按基线配置运行测试...")
+            candidates.append(run_workload(test_config, args.base_url))
+
+    thresholds = {"throughput": args.max_throughput_drop, "latency": args.max_latency_increase}
+    rows = compare(baselines, candidates, thresholds, args.bootstrap, args.confidence, args.seed)
+    print_report(rows, args.confidence, len(baselines), len(candidates))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"thresholds": thresholds, "confidence": args.confidence, "comparisons": rows},
+                      f, ensure_ascii=False, indent=2)
+        print(f"\n比较结果已保存到: {args.output}")
+
+    regressions = [row for row in rows if row["regression"]]
+    if regressions:
+        print(f"\n发现 {len(regressions)} 项性能回归")
+        return 1
+    print("\n未发现性能回归")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
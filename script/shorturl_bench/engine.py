@@ -0,0 +1,585 @@
+# -*- coding: utf-8 -*-
+"""压测引擎：请求处理函数，以及线程池、asyncio、开环三种发送方式，多进程分片和分布式分发
+
+所有入口（run / visual 命令和原来的三个脚本）都通过 run_sharded_requests 发送请求，
+请求的发送、计时和统计只在这里实现一次。aiohttp 只在使用 asyncio 引擎时导入。
+"""
+
+import asyncio
+import concurrent.futures
+import contextlib
+import json
+import multiprocessing
+import threading
+import time
+
+import requests
+from tqdm import tqdm
+
+from .client_metrics import ClientMonitor, StackSampler
+from .key_distribution import CacheHitEstimator
+from .live_view import LiveView, TimelinePublisher
+from .load_agent import AgentClient
+from .phase_client import PhaseTimingConnection
+from .result_log import ResultLogWriter, worker_log_path
+from .stats import OperationStats, RequestStats, Timeline
+from .workload import MixedWorkload, build_schedule
+
+# 默认配置
+DEFAULT_CONFIG = {
+    "base_url": "http://localhost:8080/short-url",
+    "requests": 10000,
+    "concurrency": 50,
+    "output_file": None,
+    "save_urls": False,
+    "url_file": None,
+    "verbose": False,
+    "engine": "threads",
+    "connections": 100,
+    "processes": 1,
+    "rate": None,
+    "rate_curve": None,
+    "log_file": None,
+    "key_dist": "sequential",
+    "seed": None,
+    "cache_ttl": 60.0,
+    "mix": None,
+    "live": False,
+    "progress": True,
+    "agents": None,
+    "url_corpus": None,
+    "slo_p99": 50.0,
+    "slo_error_rate": 0.01,
+    "step_duration": 10.0,
+    "max_steps": 12,
+    "capacity_tolerance": 0.05,
+    "capacity_chart": None,
+    "metrics_endpoints": None,
+    "metrics_interval": 1.0,
+    "phase_timing": False,
+    "phase_keep_alive": True,
+    "probe_interval": 0.2,
+    "probe_timeout": 120.0,
+    "probe_sample": 1,
+    "replay_file": None,
+    "replay_speed": 1.0,
+    "profile_file": None,
+    "profile_interval": 5.0,
+    "cache_flush": None,
+    "warm_reads": 1,
+    "herd_clients": 0,
+    "herd_keys": 5,
+    "batch_size": 1,
+    "near_cache_endpoints": None
+}
+
+_thread_local = threading.local()
+
+
+def get_session():
+    """每个线程复用自己的 Session，避免每个请求都新建 TCP 连接"""
+    session = getattr(_thread_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        _thread_local.session = session
+    return session
+
+
+def create_result(url, status_code, text, verbose=False):
+    """把创建请求的响应转换成结果字典"""
+    if status_code == 201:
+        if verbose:
+            print(f"创建成功: {url} -> {text}")
+        return {"status": "success", "short_url": text, "original_url": url}
+    if verbose:
+        print(f"创建失败: {status_code} - {text}")
+    return {"status": "error", "code": status_code, "message": text, "original_url": url}
+
+
+def create_batch_result(urls, status_code, text, verbose=False):
+    """把批量创建请求的响应（短链接 JSON 数组）转换成结果字典，"links" 为本次创建的短链接数"""
+    if status_code == 201:
+        short_urls = json.loads(text)
+        if verbose:
+            print(f"批量创建成功: {len(short_urls)} 个短链接")
+        return {"status": "success", "short_urls": short_urls, "original_urls": urls, "links": len(short_urls)}
+    if verbose:
+        print(f"批量创建失败: {status_code} - {text}")
+    return {"status": "error", "code": status_code, "message": text, "links": 0}
+
+
+def get_result(short_url, status_code, text, verbose=False):
+    """把获取请求的响应转换成结果字典"""
+    if status_code == 200:
+        if verbose:
+            print(f"获取成功: {short_url} -> {text}")
+        return {"status": "success", "short_url": short_url, "original_url": text}
+    if verbose:
+        print(f"获取失败: {status_code} - {text}")
+    return {"status": "error", "code": status_code, "message": text, "short_url": short_url}
+
+
+def exception_result(e, verbose=False, **fields):
+    """请求抛出异常时的结果字典"""
+    if verbose:
+        print(f"请求异常: {e}")
+    return {"status": "exception", "message": str(e), **fields}
+
+
+def create_short_url(url, base_url, verbose=False):
+    """创建短链接"""
+    try:
+        response = get_session().post(f"{base_url}", params={"url": url})
+        return create_result(url, response.status_code, response.text, verbose)
+    except Exception as e:
+        return exception_result(e, verbose, original_url=url)
+
+
+def batch_url(base_url):
+    return f"{base_url.rstrip('/')}/batch"
+
+
+def create_short_url_batch(urls, base_url, verbose=False):
+    """批量创建短链接：一个请求发送一批原始URL（JSON 数组）"""
+    urls = list(urls)
+    try:
+        response = get_session().post(batch_url(base_url), json=urls)
+        return create_batch_result(urls, response.status_code, response.text, verbose)
+    except Exception as e:
+        return exception_result(e, verbose, links=0)
+
+
+def get_original_url(short_url, base_url, verbose=False):
+    """根据短链接获取原始URL"""
+    try:
+        response = get_session().get(f"{base_url}", params={"shortUrl": short_url})
+        return get_result(short_url, response.status_code, response.text, verbose)
+    except Exception as e:
+        return exception_result(e, verbose, short_url=short_url)
+
+
+async def async_create_short_url(session, url, base_url, verbose=False):
+    """异步创建短链接（复用连接池中的长连接）"""
+    try:
+        async with session.post(base_url, params={"url": url}) as response:
+            return create_result(url, response.status, await response.text(), verbose)
+    except Exception as e:
+        return exception_result(e, verbose, original_url=url)
+
+
+async def async_get_original_url(session, short_url, base_url, verbose=False):
+    """异步根据短链接获取原始URL（复用连接池中的长连接）"""
+    try:
+        async with session.get(base_url, params={"shortUrl": short_url}) as response:
+            return get_result(short_url, response.status, await response.text(), verbose)
+    except Exception as e:
+        return exception_result(e, verbose, short_url=short_url)
+
+
+async def async_create_short_url_batch(session, urls, base_url, verbose=False):
+    """异步批量创建短链接"""
+    urls = list(urls)
+    try:
+        async with session.post(batch_url(base_url), json=urls) as response:
+            return create_batch_result(urls, response.status, await response.text(), verbose)
+    except Exception as e:
+        return exception_result(e, verbose, links=0)
+
+
+def phase_timing_handlers(keep_alive=True):
+    """分阶段计时客户端的处理函数，结果中附带 "phases"；每个线程对每个地址各用一条连接"""
+
+    def connection(base_url):
+        connections = getattr(_thread_local, "phase_connections", None)
+        if connections is None:
+            connections = _thread_local.phase_connections = {}
+        if base_url not in connections:
+            connections[base_url] = PhaseTimingConnection(base_url, keep_alive=keep_alive)
+        return connections[base_url]
+
+    def create(url, base_url, verbose=False):
+        try:
+            status_code, text, phases = connection(base_url).request("POST", {"url": url})
+        except Exception as e:
+            return exception_result(e, verbose, original_url=url)
+        return dict(create_result(url, status_code, text, verbose), phases=phases)
+
+    def get(short_url, base_url, verbose=False):
+        try:
+            status_code, text, phases = connection(base_url).request("GET", {"shortUrl": short_url})
+        except Exception as e:
+            return exception_result(e, verbose, short_url=short_url)
+        return dict(get_result(short_url, status_code, text, verbose), phases=phases)
+
+    return {"create": create, "get": get}
+
+
+SYNC_HANDLERS = {"create": create_short_url, "get": get_original_url, "create_batch": create_short_url_batch}
+ASYNC_HANDLERS = {"create": async_create_short_url, "get": async_get_original_url,
+                  "create_batch": async_create_short_url_batch}
+
+
+def get_handler(kind, config, asynchronous=False):
+    """按请求类型取处理函数；混合模式每个请求由当前进程的 MixedWorkload 决定读还是写"""
+    if asynchronous:
+        handlers = ASYNC_HANDLERS
+    elif config.get("phase_timing"):
+        handlers = phase_timing_handlers(config.get("phase_keep_alive", True))
+    else:
+        handlers = SYNC_HANDLERS
+    if kind != "mixed":
+        return handlers[kind]
+
+    workload = config["mixed_workload"]
+    if asynchronous:
+        async def mixed_handler(session, item, base_url, verbose=False):
+            op, payload = workload.next_request()
+            result = await handlers[op](session, payload, base_url, verbose)
+            result["op"] = op
+            workload.observe(result)
+            return result
+    else:
+        def mixed_handler(item, base_url, verbose=False):
+            op, payload = workload.next_request()
+            result = handlers[op](payload, base_url, verbose)
+            result["op"] = op
+            workload.observe(result)
+            return result
+    return mixed_handler
+
+
+def new_stats(kind, config):
+    """创建统计对象：创建阶段保留成功的短链接，获取阶段按推测的缓存命中情况分组，混合模式按操作分别统计"""
+    if kind == "mixed":
+        return OperationStats({"get": config.get("cache_classifier")})
+    return RequestStats(keep_successful=kind in ("create", "create_batch"), classifier=config.get("cache_classifier"))
+
+
+def merge_stats(kind, config, stats_list):
+    """合并多个线程或进程的统计结果"""
+    merged = new_stats(kind, dict(config, cache_classifier=None))
+    for stats in stats_list:
+        merged.merge(stats)
+    return merged
+
+
+async def run_async_requests(kind, items, config, desc, position=None, on_result=None):
+    """在单个事件循环中发送请求：并发数决定同时在途的请求数，连接池大小限制长连接数"""
+    import aiohttp
+
+    base_url = config["base_url"]
+    verbose = config["verbose"]
+    handler = get_handler(kind, config, asynchronous=True)
+    stats = new_stats(kind, config)
+    monitor = config["client_monitor"]
+    pending = iter(items)
+
+    connector = aiohttp.TCPConnector(limit=config["connections"], ttl_dns_cache=300)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        with tqdm(total=len(items), desc=desc, position=position, disable=not config["progress"]) as progress:
+            async def worker():
+                # 所有协程共享同一个迭代器，取下一个任务时不会切换协程，因此无需加锁
+                for item in pending:
+                    monitor.request_started()
+                    start_time = time.perf_counter()
+                    result = await handler(session, item, base_url, verbose)
+                    end_time = time.perf_counter()
+                    monitor.request_finished()
+                    handling_start = time.thread_time()
+                    result["response_time"] = (end_time - start_time) * 1000
+                    stats.add(result)
+                    on_result(result.get("op", kind), result)
+                    progress.update(1)
+                    monitor.result_handled(time.thread_time() - handling_start)
+
+            await asyncio.gather(*(worker() for _ in range(min(config["concurrency"], len(items)))))
+    return stats
+
+
+def timed_request(handler, item, base_url, verbose):
+    """执行一次同步请求并记录响应时间（毫秒）"""
+    start_time = time.perf_counter()
+    result = handler(item, base_url, verbose)
+    result["response_time"] = (time.perf_counter() - start_time) * 1000
+    return result
+
+
+def is_open_loop(config):
+    """是否使用开环（固定到达速率）模式"""
+    return bool(config["rate"] or config["rate_curve"])
+
+
+async def run_async_open_loop_requests(kind, scheduled_items, config, desc, position=None, on_result=None):
+    """开环模式（asyncio）：按计划时间发起请求，不等待之前的请求完成"""
+    import aiohttp
+
+    base_url = config["base_url"]
+    verbose = config["verbose"]
+    handler = get_handler(kind, config, asynchronous=True)
+    stats = new_stats(kind, config)
+    monitor = config["client_monitor"]
+    in_flight = set()
+    # 并发数限制同时在途的请求数，排队等待的时间计入校正后的响应时间
+    slots = asyncio.Semaphore(config["concurrency"])
+
+    connector = aiohttp.TCPConnector(limit=config["connections"], ttl_dns_cache=300)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        with tqdm(total=len(scheduled_items), desc=desc, position=position, disable=not config["progress"]) as progress:
+            async def send(item, planned_time):
+                async with slots:
+                    monitor.request_started(planned_time)
+                    start_time = time.perf_counter()
+                    result = await handler(session, item, base_url, verbose)
+                end_time = time.perf_counter()
+                monitor.request_finished()
+                handling_start = time.thread_time()
+                result["response_time"] = (end_time - start_time) * 1000
+                result["corrected_response_time"] = (end_time - planned_time) * 1000
+                stats.add(result)
+                on_result(result.get("op", kind), result)
+                progress.update(1)
+                monitor.result_handled(time.thread_time() - handling_start)
+
+            await asyncio.sleep(max(0.0, config["start_at"] - time.time()))
+            origin = time.perf_counter()
+            for item, offset in scheduled_items:
+                delay = origin + offset - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                monitor.request_submitted()
+                task = asyncio.create_task(send(item, origin + offset))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+            await asyncio.gather(*in_flight)
+    return stats
+
+
+def timed_scheduled_request(handler, item, base_url, verbose, planned_time):
+    """执行一次同步请求，同时记录实际响应时间和从计划发送时间起算的响应时间"""
+    start_time = time.perf_counter()
+    result = handler(item, base_url, verbose)
+    end_time = time.perf_counter()
+    result["response_time"] = (end_time - start_time) * 1000
+    result["corrected_response_time"] = (end_time - planned_time) * 1000
+    return result
+
+
+def run_open_loop_requests(kind, scheduled_items, config, desc, position=None, on_result=None):
+    """开环模式：按计划时间发起请求，线程池已满时请求排队，排队时间计入校正后的响应时间"""
+    if config["engine"] == "asyncio":
+        return asyncio.run(run_async_open_loop_requests(kind, scheduled_items, config, desc, position, on_result))
+
+    base_url = config["base_url"]
+    verbose = config["verbose"]
+    handler = get_handler(kind, config)
+    stats = new_stats(kind, config)
+    monitor = config["client_monitor"]
+    lock = threading.Lock()
+
+    def send(item, planned_time):
+        monitor.request_started(planned_time)
+        try:
+            return timed_scheduled_request(handler, item, base_url, verbose, planned_time)
+        finally:
+            monitor.request_finished()
+
+    def record(future):
+        # 回调在工作线程中执行，记录结果后不再保留 future
+        handling_start = time.thread_time()
+        result = future.result()
+        with lock:
+            stats.add(result)
+            progress.update(1)
+        on_result(result.get("op", kind), result)
+        monitor.result_handled(time.thread_time() - handling_start)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=config["concurrency"]) as executor, \
+            tqdm(total=len(scheduled_items), desc=desc, position=position, disable=not config["progress"]) as progress:
+        time.sleep(max(0.0, config["start_at"] - time.time()))
+        origin = time.perf_counter()
+        for item, offset in scheduled_items:
+            delay = origin + offset - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            monitor.request_submitted()
+            executor.submit(send, item, origin + offset).add_done_callback(record)
+        executor.shutdown(wait=True)
+    return stats
+
+
+def run_requests(kind, items, config, desc, position=None):
+    """按配置的引擎在当前进程内并发执行请求，返回汇总统计；配置了日志文件时边测边写逐请求结果"""
+    if kind in ("get", "mixed"):
+        # 每个进程各自推测缓存命中情况，线程之间共享同一个推测器
+        config = dict(config, cache_classifier=CacheHitEstimator(config["cache_ttl"], config.get("keys_cached_at"),
+                                                                 config.get("keys_created_at")))
+    if kind == "mixed":
+        config["mixed_workload"] = MixedWorkload(config["mix"], config.get("initial_pool"), config["seed"],
+                                                 config["cache_classifier"], config["url_corpus"])
+    result_log = None
+    if config["log_file"]:
+        # 多进程时每个进程写自己的分片文件
+        log_path = config["log_file"] if position is None else worker_log_path(config["log_file"], position)
+        result_log = ResultLogWriter(log_path)
+    # 每个进程记录自己的每秒时间线；单进程实时视图直接读取传入的时间线
+    timeline = config.get("live_timeline") or Timeline()
+    publisher = None
+    if config.get("live_queue") is not None:
+        publisher = TimelinePublisher(timeline, config["live_queue"]).start()
+    # 压测客户端自身的 CPU、调度延迟和结果处理耗时，用来判断瓶颈是否在客户端
+    monitor = ClientMonitor(config["concurrency"]).start()
+    config = dict(config, client_monitor=monitor)
+    profiler = None
+    if config["profile_file"]:
+        profile_path = config["profile_file"] if position is None else worker_log_path(config["profile_file"], position)
+        profiler = StackSampler(profile_path, config["profile_interval"] / 1000, desc).start()
+
+    def on_result(op, result):
+        # 请求完成时调用：计入当前秒的窗口，并追加到结果日志
+        timeline.record(op, result)
+        if result_log:
+            result_log.record(op, result)
+
+    try:
+        if is_open_loop(config):
+            stats = run_open_loop_requests(kind, items, config, desc, position, on_result)
+        elif config["engine"] == "asyncio":
+            stats = asyncio.run(run_async_requests(kind, items, config, desc, position, on_result))
+        else:
+            stats = run_thread_requests(kind, items, config, desc, position, on_result)
+        stats.timeline = timeline
+        stats.client = monitor.metrics
+        return stats
+    finally:
+        monitor.stop()
+        if profiler:
+            profiler.stop()
+        if publisher:
+            publisher.stop()
+        if result_log:
+            result_log.close()
+
+
+def run_thread_requests(kind, items, config, desc, position=None, on_result=None):
+    """闭环模式（线程池）：每个线程发完一个请求再取下一个"""
+    base_url = config["base_url"]
+    verbose = config["verbose"]
+    handler = get_handler(kind, config)
+    monitor = config["client_monitor"]
+    pending = iter(items)
+    lock = threading.Lock()
+    workers = min(config["concurrency"], max(1, len(items)))
+    # 每个线程记录到自己的统计对象，结束后再合并，热路径上不需要争用锁
+    per_thread_stats = [new_stats(kind, config) for _ in range(workers)]
+
+    def worker(stats):
+        while True:
+            with lock:
+                item = next(pending, None)
+            if item is None:
+                return
+            monitor.request_started()
+            result = timed_request(handler, item, base_url, verbose)
+            monitor.request_finished()
+            handling_start = time.thread_time()
+            stats.add(result)
+            on_result(result.get("op", kind), result)
+            progress.update(1)
+            monitor.result_handled(time.thread_time() - handling_start)
+
+    # 使用tqdm显示进度条
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor, \
+            tqdm(total=len(items), desc=desc, position=position, disable=not config["progress"]) as progress:
+        list(executor.map(worker, per_thread_stats))
+    return merge_stats(kind, config, per_thread_stats)
+
+
+def split_evenly(items, parts):
+    """把请求列表尽量均匀地切成 parts 份"""
+    return [items[i * len(items) // parts:(i + 1) * len(items) // parts] for i in range(parts)]
+
+
+def run_sharded_requests(kind, items, config, desc):
+    """把请求分摊到多个进程执行，每个进程有自己的连接池，最后合并各进程的统计"""
+    if config["agents"]:
+        return run_distributed_requests(kind, items, config, desc)
+    processes = min(config["processes"], max(1, len(items)))
+    # 指标抓取只在协调进程中运行，不传给工作进程
+    worker_config = dict(config, server_metrics=None)
+    if is_open_loop(config):
+        # 开环模式：先生成全局时间线，再轮流分配给各进程，合起来仍是同一条时间线
+        schedule = build_schedule(len(items), config["rate"], config["rate_curve"])
+        if len(schedule) < len(items):
+            print(f"警告: 速率曲线只能安排 {len(schedule)} 个请求，其余 {len(items) - len(schedule)} 个请求不会发送")
+        items = list(zip(items, schedule))
+        # 所有进程约定同一个开始时刻，抵消进程启动时间的差异
+        worker_config["start_at"] = time.time() + (1.0 if processes > 1 else 0.0)
+        chunks = [items[i::processes] for i in range(processes)]
+    else:
+        chunks = split_evenly(items, processes)
+
+    if processes <= 1:
+        if not config["live"]:
+            return with_open_loop_start(run_requests(kind, items, worker_config, desc), worker_config)
+        worker_config["live_timeline"] = Timeline()
+        live_view = LiveView(worker_config["live_timeline"]).start()
+        try:
+            return with_open_loop_start(run_requests(kind, items, worker_config, desc), worker_config)
+        finally:
+            live_view.stop()
+
+    # 并发数与连接池大小是全局值，按进程数平分
+    worker_config["concurrency"] = max(1, -(-config["concurrency"] // processes))
+    worker_config["connections"] = max(1, -(-config["connections"] // processes))
+
+    with contextlib.ExitStack() as stack:
+        if config["live"]:
+            # 各进程每秒把已结束的窗口发到父进程，由父进程合并后打印
+            manager = stack.enter_context(multiprocessing.Manager())
+            worker_config["live_queue"] = manager.Queue()
+            stack.callback(LiveView(queue=worker_config["live_queue"]).start().stop)
+        with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as executor:
+            futures = [executor.submit(run_requests, kind, chunk, worker_config, f"{desc}#{i}", i)
+                       for i, chunk in enumerate(chunks)]
+            # 合并各进程的直方图后再计算百分位，而不是对各进程的百分位取平均
+            stats = merge_stats(kind, config, (future.result() for future in futures))
+    return with_open_loop_start(stats, worker_config)
+
+
+def with_open_loop_start(stats, worker_config):
+    """开环模式的吞吐量从约定的开始时刻算起，不包含等待各进程就绪的时间"""
+    if "start_at" in worker_config:
+        stats.started_at = worker_config["start_at"]
+    return stats
+
+
+def run_distributed_requests(kind, items, config, desc):
+    """把请求分给多个压测代理，在统一时刻开始执行，最后合并各代理的直方图和时间线
+
+    请求数、并发数、连接池大小和开环速率都按代理数平分；每个代理内部再按 --processes 分摊到多个进程。
+    """
+    clients = [AgentClient(address, config["agent_authkey"]) for address in config["agents"]]
+    try:
+        count = len(clients)
+        agent_config = dict(config, agents=None, live=False, progress=False, server_metrics=None,
+                            concurrency=max(1, -(-config["concurrency"] // count)),
+                            connections=max(1, -(-config["connections"] // count)))
+        if config["rate"]:
+            agent_config["rate"] = config["rate"] / count
+        if config["rate_curve"]:
+            agent_config["rate_curve"] = [(start, rate / count) for start, rate in config["rate_curve"]]
+        # 按代理时钟与本机时钟的差换算开始时间，抵消各压测机之间的时钟偏差
+        offsets = [client.clock_offset() for client in clients]
+        start_at = time.time() + 2.0
+        for i, (client, chunk) in enumerate(zip(clients, split_evenly(items, count))):
+            log_file = worker_log_path(config["log_file"], f"agent{i}") if config["log_file"] else None
+            client.submit(kind, chunk, dict(agent_config, log_file=log_file), start_at + offsets[i])
+        print(f"{desc}: 已分发到 {count} 个代理，时钟偏差 "
+              f"{', '.join(f'{offset * 1000:+.1f}ms' for offset in offsets)}，2 秒后统一开始")
+        stats = merge_stats(kind, config, [client.result() for client in clients])
+    finally:
+        for client in clients:
+            client.close()
+    # 吞吐量从统一开始时刻算起，不包含分发等待的时间
+    stats.started_at = start_at
+    return stats
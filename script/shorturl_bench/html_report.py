@@ -0,0 +1,342 @@
+# -*- coding: utf-8 -*-
+"""从保存的结果文件生成自包含的 HTML 报告
+
+报告只依赖结果文件中预先分好桶的延迟直方图和每秒时间线，绘图开销与请求数无关，
+几百万请求的测试也能在一秒内生成。图表为内联 SVG，不需要 matplotlib，也不引用任何外部文件。
+吞吐量按时间线的墙钟窗口计算（第一个到最后一个有请求的秒之间的请求数 / 秒数）。
+
+指定多个结果文件时，第一个作为基线，其余文件的各项指标给出相对基线的变化。
+
+    python -m shorturl_bench report performance_results_20240101_120000.json -o report.html
+    python -m shorturl_bench report baseline.json candidate.json -o compare.html
+"""
+
+import argparse
+import html
+import json
+import math
+import os
+
+from .phase_client import PHASE_LABELS
+from .report import OP_LABELS, window_throughput
+from .stats import LatencyHistogram
+
+# 结果文件中的测试阶段 -> (时间线中的操作名, 显示名称)
+TESTS = {"create_test": ("create", "创建短链接"), "get_test": ("get", "获取原始URL")}
+PERCENTILES = [50, 90, 95, 99, 99.9, 99.99]
+# 对比表中的指标 -> (显示名称, 数值越大越好)
+COMPARE_METRICS = {
+    "throughput": ("吞吐量 (请求/秒)", True),
+    "error_rate": ("错误率", False),
+    "p50": ("P50 (毫秒)", False),
+    "p99": ("P99 (毫秒)", False),
+    "p99.9": ("P99.9 (毫秒)", False),
+    "max": ("最大值 (毫秒)", False),
+}
+# 时间线图最多绘制的点数，超过时按相邻窗口合并
+MAX_CHART_POINTS = 600
+SERIES_COLORS = ["#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd", "#8c564b"]
+
+STYLE = """
+body { font-family: -apple-system, "Microsoft YaHei", "PingFang SC", sans-serif; margin: 24px; color: #222; }
+h1 { font-size: 22px; } h2 { font-size: 18px; margin-top: 32px; border-bottom: 1px solid #ddd; }
+table { border-collapse: collapse; margin: 8px 0 16px; font-size: 13px; }
+th, td { border: 1px solid #ccc; padding: 4px 10px; text-align: right; }
+th:first-child, td:first-child { text-align: left; }
+th { background: #f4f4f4; }
+.better { color: #2a7d2a; } .worse { color: #c0392b; }
+.muted { color: #888; font-size: 12px; }
+svg { background: #fff; border: 1px solid #eee; margin: 4px 8px 16px 0; }
+svg text { font-size: 11px; fill: #444; }
+"""
+
+
+def load_results(filename):
+    """读取一个结果文件"""
+    with open(filename, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_summary(results, test_key):
+    """单个测试阶段的汇总：优先使用直方图和时间线，旧结果文件退回到保存的固定字段"""
+    test = results.get(test_key)
+    if not test:
+        return None
+    op = TESTS[test_key][0]
+    points = results.get("timeline", {}).get(op, [])
+    total = test.get("total_requests", 0)
+    successful = test.get("successful_requests", 0)
+    summary = {
+        "requests": total,
+        "successful": successful,
+        "error_rate": (total - successful) / total if total else 0.0,
+        "elapsed": test.get("total_time"),
+        # 没有时间线的旧结果文件只有按总耗时计算的吞吐量
+        "throughput": window_throughput(points) if points else test.get("requests_per_second", 0.0),
+        "mean": test.get("avg_response_time"),
+        "histogram": None,
+        "points": points,
+        "phases": test.get("phase_breakdown") or {},
+    }
+    if test.get("latency_histogram"):
+        histogram = LatencyHistogram.from_dict(test["latency_histogram"])
+        summary["histogram"] = histogram
+        summary["mean"] = histogram.mean()
+        summary.update(zip((f"p{p:g}" for p in PERCENTILES), histogram.percentiles(PERCENTILES)))
+        summary["min"], summary["max"] = histogram.min, histogram.max
+    else:
+        for p in PERCENTILES:
+            summary[f"p{p:g}"] = test.get(f"p{p:g}_response_time")
+        summary["min"] = summary["max"] = None
+    return summary
+
+
+def format_number(value, digits=2):
+    if value is None:
+        return "-"
+    if isinstance(value, float) and not math.isfinite(value):
+        return "-"
+    return f"{value:,.{digits}f}" if isinstance(value, float) else f"{value:,}"
+
+
+def render_table(headers, rows):
+    """rows 中的单元格已经是 HTML 片段（调用方负责转义）"""
+    head = "".join(f"<th>{html.escape(str(h))}</th>" for h in headers)
+    body = "".join("<tr>" + "".join(f"<td>{cell}</td>" for cell in row) + "</tr>" for row in rows)
+    return f"<table><thead><tr>{head}</tr></thead><tbody>{body}</tbody></table>"
+
+
+def downsample(points, reduce):
+    """点数超过 MAX_CHART_POINTS 时把相邻的点合并为一个，x 取组内第一个点"""
+    if len(points) <= MAX_CHART_POINTS:
+        return points
+    size = math.ceil(len(points) / MAX_CHART_POINTS)
+    return [(points[i][0], reduce([y for _, y in points[i:i + size]])) for i in range(0, len(points), size)]
+
+
+def nice_ticks(low, high, count=5):
+    """坐标轴刻度：取 1/2/5 × 10^n 的步长"""
+    if high <= low:
+        return [low]
+    raw = (high - low) / count
+    magnitude = 10 ** math.floor(math.log10(raw))
+    step = next(m * magnitude for m in (1, 2, 5, 10) if m * magnitude >= raw)
+    first = math.ceil(low / step) * step
+    return [first + i * step for i in range(int((high - first) / step) + 1)]
+
+
+def svg_line_chart(title, series, y_label, x_label="测试时间 (秒)", width=720, height=260):
+    """折线图，series 为 {名称: [(x, y), ...]}"""
+    series = {name: points for name, points in series.items() if points}
+    if not series:
+        return ""
+    left, right, top, bottom = 60, 130, 28, 36
+    plot_w, plot_h = width - left - right, height - top - bottom
+    xs = [x for points in series.values() for x, _ in points]
+    ys = [y for points in series.values() for _, y in points]
+    x_min, x_max = min(xs), max(max(xs), min(xs) + 1)
+    y_max = max(ys) * 1.1 or 1
+
+    def sx(x):
+        return left + (x - x_min) / (x_max - x_min) * plot_w
+
+    def sy(y):
+        return top + plot_h - y / y_max * plot_h
+
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}">',
+             f'<text x="{left}" y="16" font-weight="bold">{html.escape(title)}</text>']
+    for tick in nice_ticks(0, y_max):
+        parts.append(f'<line x1="{left}" x2="{left + plot_w}" y1="{sy(tick):.1f}" y2="{sy(tick):.1f}" stroke="#eee"/>'
+                     f'<text x="{left - 6}" y="{sy(tick) + 4:.1f}" text-anchor="end">{tick:g}</text>')
+    for tick in nice_ticks(x_min, x_max, 8):
+        parts.append(f'<text x="{sx(tick):.1f}" y="{top + plot_h + 16}" text-anchor="middle">{tick:g}</text>')
+    parts.append(f'<rect x="{left}" y="{top}" width="{plot_w}" height="{plot_h}" fill="none" stroke="#999"/>')
+    parts.append(f'<text x="{left + plot_w / 2}" y="{height - 4}" text-anchor="middle">{html.escape(x_label)}</text>')
+    parts.append(f'<text transform="translate(14,{top + plot_h / 2}) rotate(-90)" text-anchor="middle">'
+                 f'{html.escape(y_label)}</text>')
+    for i, (name, points) in enumerate(series.items()):
+        color = SERIES_COLORS[i % len(SERIES_COLORS)]
+        path = " ".join(f"{sx(x):.1f},{sy(y):.1f}" for x, y in points)
+        parts.append(f'<polyline points="{path}" fill="none" stroke="{color}" stroke-width="1.5"/>')
+        legend_y = top + 12 + i * 16
+        parts.append(f'<line x1="{left + plot_w + 10}" x2="{left + plot_w + 28}" y1="{legend_y - 4}" '
+                     f'y2="{legend_y - 4}" stroke="{color}" stroke-width="2"/>'
+                     f'<text x="{left + plot_w + 32}" y="{legend_y}">{html.escape(name)}</text>')
+    parts.append('</svg>')
+    return "".join(parts)
+
+
+def distribution_series(histogram, bins=60):
+    """把直方图的桶重新合并到对数刻度的箱中，返回 [(箱中点毫秒, 占比%)]"""
+    low, high = max(histogram.min, 0.001), max(histogram.max, histogram.min * 1.01, 0.002)
+    edges = [low * (high / low) ** (i / bins) for i in range(bins + 1)]
+    counts = [0] * bins
+    for bucket_low, bucket_high, count in histogram.buckets():
+        center = (bucket_low + bucket_high) / 2
+        index = min(max(int(math.log(max(center, low) / low) / math.log(high / low) * bins), 0), bins - 1)
+        counts[index] += count
+    return [(math.sqrt(edges[i] * edges[i + 1]), counts[i] / histogram.count * 100) for i in range(bins)]
+
+
+def svg_distribution_chart(histograms, width=720, height=260):
+    """响应时间分布：横轴为对数刻度的延迟，纵轴为样本占比"""
+    series = {}
+    for label, histogram in histograms.items():
+        if histogram is not None and histogram.count:
+            series[label] = [(math.log10(x), y) for x, y in distribution_series(histogram)]
+    return svg_line_chart("响应时间分布", series, "样本占比 (%)", "log10(响应时间 / 毫秒)", width, height)
+
+
+def timeline_charts(label, points):
+    """单个测试阶段的每秒吞吐量、延迟和错误率折线图"""
+    if not points:
+        return ""
+
+    def mean(values):
+        return sum(values) / len(values)
+
+    def column(key, reduce):
+        return downsample([(point["t"], point[key]) for point in points], reduce)
+
+    return (svg_line_chart(f"{label} - 每秒请求数", {"请求/秒": column("requests", mean)}, "请求/秒") +
+            svg_line_chart(f"{label} - 每秒延迟", {"P50": column("p50", max), "P99": column("p99", max)},
+                           "响应时间 (毫秒)") +
+            svg_line_chart(f"{label} - 错误率", {"错误率": column("error_rate", max)}, "错误率"))
+
+
+def server_metrics_charts(server_metrics):
+    """服务端指标的时间序列，每个指标一张图"""
+    charts = []
+    for name, points in sorted((server_metrics or {}).get("series", {}).items()):
+        values = downsample([(point["t"], point["value"]) for point in points if point.get("value") is not None],
+                            max)
+        charts.append(svg_line_chart(name, {name: values}, "数值"))
+    return "".join(charts)
+
+
+def relative_change(baseline, value):
+    if baseline in (None, 0) or value is None:
+        return None
+    return (value - baseline) / baseline
+
+
+def change_cell(baseline, value, higher_is_better, digits=2):
+    """对比单元格：数值加相对基线的变化，变好为绿色，变差为红色"""
+    change = relative_change(baseline, value)
+    if change is None:
+        return format_number(value, digits)
+    better = change > 0 if higher_is_better else change < 0
+    css = "better" if better else "worse" if change else "muted"
+    return f'{format_number(value, digits)} <span class="{css}">({change:+.1%})</span>'
+
+
+def render_run(name, results):
+    """单个结果文件的报告部分"""
+    parts = [f"<h2>{html.escape(name)}</h2>"]
+    config = results.get("test_config", {})
+    parts.append(render_table(["配置项", "值"], [[html.escape(str(k)), html.escape(str(v))] for k, v in config.items()]))
+
+    summaries = {key: test_summary(results, key) for key in TESTS}
+    summaries = {key: summary for key, summary in summaries.items() if summary}
+    rows = []
+    for key, summary in summaries.items():
+        rows.append([TESTS[key][1], format_number(summary["requests"]), format_number(summary["successful"]),
+                     f"{summary['error_rate']:.2%}", format_number(summary["elapsed"]),
+                     format_number(summary["throughput"]), format_number(summary["mean"])])
+    parts.append("<h3>汇总</h3>")
+    parts.append(render_table(["测试", "总请求数", "成功请求数", "错误率", "总耗时 (秒)", "吞吐量 (请求/秒)",
+                               "平均响应时间 (毫秒)"], rows))
+
+    rows = [[TESTS[key][1]] + [format_number(summary[f"p{p:g}"]) for p in PERCENTILES] +
+            [format_number(summary["min"]), format_number(summary["max"])] for key, summary in summaries.items()]
+    parts.append("<h3>响应时间百分位 (毫秒)</h3>")
+    parts.append(render_table(["测试"] + [f"P{p:g}" for p in PERCENTILES] + ["最小值", "最大值"], rows))
+
+    parts.append(svg_distribution_chart({TESTS[key][1]: summary["histogram"] for key, summary in summaries.items()}))
+
+    for key, summary in summaries.items():
+        if summary["phases"]:
+            phase_rows = [[html.escape(PHASE_LABELS.get(phase, phase))] +
+                          [format_number(values.get(k)) for k in ("mean", "p50", "p99")]
+                          for phase, values in summary["phases"].items()]
+            parts.append(f"<h3>{TESTS[key][1]} - 请求阶段耗时 (毫秒)</h3>")
+            parts.append(render_table(["阶段", "平均", "P50", "P99"], phase_rows))
+
+    timeline = results.get("timeline", {})
+    if timeline:
+        parts.append("<h3>时间线</h3>")
+        for key, (op, label) in TESTS.items():
+            parts.append(timeline_charts(label, timeline.get(op, [])))
+        # 其他阶段写入的操作也画出来
+        for op, points in timeline.items():
+            if op not in {op for op, _ in TESTS.values()}:
+                parts.append(timeline_charts(OP_LABELS.get(op, op), points))
+
+    if results.get("server_metrics", {}).get("series"):
+        parts.append("<h3>服务端指标</h3>")
+        parts.append(server_metrics_charts(results["server_metrics"]))
+    return "".join(parts)
+
+
+def render_comparison(runs):
+    """多个结果文件时的对比表：第一个文件为基线"""
+    (baseline_name, baseline), candidates = runs[0], runs[1:]
+    parts = [f"<h2>对比 (基线: {html.escape(baseline_name)})</h2>"]
+    for key, (_, label) in TESTS.items():
+        base = test_summary(baseline, key)
+        if not base:
+            continue
+        rows = []
+        for metric, (title, higher_is_better) in COMPARE_METRICS.items():
+            row = [title, format_number(base.get(metric), 4 if metric == "error_rate" else 2)]
+            for _, results in candidates:
+                summary = test_summary(results, key) or {}
+                row.append(change_cell(base.get(metric), summary.get(metric), higher_is_better,
+                                       4 if metric == "error_rate" else 2))
+            rows.append(row)
+        parts.append(f"<h3>{label}</h3>")
+        parts.append(render_table(["指标", "基线"] + [html.escape(name) for name, _ in candidates], rows))
+
+        histograms = {baseline_name: base["histogram"]}
+        series = {baseline_name: [(p["t"], p["p99"]) for p in base["points"]]}
+        for name, results in candidates:
+            summary = test_summary(results, key) or {}
+            histograms[name] = summary.get("histogram")
+            series[name] = [(p["t"], p["p99"]) for p in summary.get("points", [])]
+        parts.append(svg_distribution_chart(histograms))
+        parts.append(svg_line_chart(f"{label} - 每秒 P99", {name: downsample(points, max)
+                                                           for name, points in series.items()}, "响应时间 (毫秒)"))
+    return "".join(parts)
+
+
+def render_report(runs, title="短链接服务性能测试报告"):
+    """runs 为 [(名称, 结果字典)]，返回完整的 HTML 文本"""
+    body = [f"<h1>{html.escape(title)}</h1>"]
+    if len(runs) > 1:
+        body.append(render_comparison(runs))
+    body.extend(render_run(name, results) for name, results in runs)
+    return ("<!DOCTYPE html>\n<html lang=\"zh-CN\"><head><meta charset=\"utf-8\">"
+            f"<title>{html.escape(title)}</title><style>{STYLE}</style></head>"
+            f"<body>{''.join(body)}</body></html>\n")
+
+
+def save_html_report(result_files, output_file, title="短链接服务性能测试报告"):
+    """读取结果文件并写出 HTML 报告"""
+    runs = [(os.path.basename(filename), load_results(filename)) for filename in result_files]
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write(render_report(runs, title))
+    print(f"HTML报告已保存为 {output_file}")
+
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m shorturl_bench report', description='从保存的结果文件生成自包含的 HTML 报告')
+    parser.add_argument('results', nargs='+', help='结果文件 (performance_results_*.json)，多个时第一个作为基线')
+    parser.add_argument('-o', '--output', default='performance_report.html', help='输出的 HTML 文件')
+    parser.add_argument('--title', default='短链接服务性能测试报告', help='报告标题')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_arguments(argv)
+    save_html_report(args.results, args.output, args.title)
+    return 0
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""获取测试的键访问分布（向量化生成）以及按 Redis TTL 推测缓存命中的分类器
+
+分布描述字符串:
+    sequential          每个短链接按创建顺序各访问一次（原有行为）
+    uniform             均匀随机
+    zipf:S              Zipf 分布，指数为 S（越大越集中）
+    hotspot:K:T         K 比例的热点键承担 T 比例的请求，例如 hotspot:0.1:0.9
+    list:FILE           按文件中的短链接顺序循环访问（每行一个短链接）
+"""
+
+import threading
+import time
+
+
+def parse_key_distribution(spec):
+    """解析分布描述字符串，返回 (名称, 参数列表)"""
+    name, _, rest = spec.partition(':')
+    if name == 'list':
+        if not rest:
+            raise ValueError("list 分布需要指定文件: list:FILE")
+        return name, [rest]
+    params = [float(p) for p in rest.split(':')] if rest else []
+    if name in ('sequential', 'uniform') and not params:
+        return name, params
+    if name == 'zipf' and len(params) == 1 and params[0] > 0:
+        return name, params
+    if name == 'hotspot' and len(params) == 2 and 0 < params[0] < 1 and 0 <= params[1] <= 1:
+        return name, params
+    raise ValueError(f"无法识别的键分布: {spec}")
+
+
+def generate_key_indices(num_keys, num_requests, spec, seed=None):
+    """按分布生成 num_requests 个键下标（0..num_keys-1），全部向量化完成"""
+    # NumPy 只在真正选键时导入，CacheHitEstimator 等不需要它
+    import numpy as np
+
+    name, params = parse_key_distribution(spec)
+    rng = np.random.default_rng(seed)
+    if name == 'sequential':
+        return np.arange(min(num_keys, num_requests))
+    if name == 'uniform':
+        return rng.integers(0, num_keys, size=num_requests)
+    if name == 'zipf':
+        # 有界 Zipf：第 k 热的键概率正比于 1/k^s，用累积分布 + 二分查找采样
+        weights = np.arange(1, num_keys + 1, dtype=np.float64) ** -params[0]
+        cdf = np.cumsum(weights)
+        cdf /= cdf[-1]
+        ranks = np.searchsorted(cdf, rng.random(num_requests), side='right')
+        # 热度排名随机映射到键上，避免热点总是最先创建的那批短链接
+        return rng.permutation(num_keys)[np.minimum(ranks, num_keys - 1)]
+    if name == 'hotspot':
+        hot_fraction, hot_traffic = params
+        hot_keys = max(1, int(num_keys * hot_fraction))
+        is_hot = rng.random(num_requests) < hot_traffic
+        hot = rng.integers(0, hot_keys, size=num_requests)
+        cold = rng.integers(hot_keys, num_keys, size=num_requests) if hot_keys < num_keys else hot
+        # 与 zipf 相同，热点键从打乱后的键中选出，而不是最先创建的那批短链接
+        return rng.permutation(num_keys)[np.where(is_hot, hot, cold)]
+    raise ValueError(f"无法识别的键分布: {spec}")
+
+
+def load_key_list(filename):
+    """读取固定样本列表（每行一个短链接）"""
+    with open(filename, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def select_keys(keys, num_requests, spec, seed=None):
+    """按分布从 keys 中选出 num_requests 个要访问的短链接"""
+    name, params = parse_key_distribution(spec)
+    if name == 'sequential':
+        # 默认分布按顺序各访问一次，不需要 NumPy
+        return list(keys[:num_requests])
+
+    import numpy as np
+
+    if name == 'list':
+        sample = load_key_list(params[0])
+        if not sample:
+            return []
+        return np.resize(np.array(sample, dtype=object), num_requests).tolist()
+    if not keys:
+        return []
+    indices = generate_key_indices(len(keys), num_requests, spec, seed)
+    return np.array(keys, dtype=object)[indices].tolist()
+
+
+class CacheHitEstimator:
+    """按服务端 Redis 的写入规则推测每次读取是否命中缓存
+
+    ShortUrlServiceImpl 在创建时写入 Redis（TTL 固定），读取命中不会续期，
+    未命中时从 MySQL 读取并重新写入同样的 TTL。客户端据此跟踪每个键的缓存到期时间，
+    把成功的读取分到 cache_hit / cache_miss 两组。多进程时各进程分别推测，结果是近似值。
+    """
+
+    def __init__(self, ttl_seconds=60.0, cached_since=None, created_at=None):
+        self.ttl_seconds = ttl_seconds
+        # 已知所有键都在该时刻或之后写入过缓存（例如冷读阶段的开始时间）；未知时首次访问按未命中计
+        self._default_expiry = cached_since + ttl_seconds if cached_since else 0.0
+        # {键: 创建时刻}：创建时写入缓存，按每个键自己的写入时间推测首次访问
+        self._created_at = created_at or {}
+        self._expiry = {}
+        self._lock = threading.Lock()
+
+    def record_write(self, key, at=None):
+        """记录客户端已知的一次缓存写入（例如本进程刚创建的短链接）"""
+        with self._lock:
+            self._expiry[key] = (at or time.time()) + self.ttl_seconds
+
+    def __call__(self, result):
+        """返回该读取结果所属的分组名"""
+        sent_at = time.time() - result["response_time"] / 1000
+        key = result["short_url"]
+        with self._lock:
+            expiry = self._expiry.get(key)
+            if expiry is None:
+                created_at = self._created_at.get(key)
+                expiry = created_at + self.ttl_seconds if created_at is not None else self._default_expiry
+            if sent_at < expiry:
+                return "cache_hit"
+            self._expiry[key] = sent_at + self.ttl_seconds
+            return "cache_miss"
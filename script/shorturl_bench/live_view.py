@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""压测过程中的实时终端视图：每秒打印上一秒各操作的 RPS、错误率和 P50/P99
+
+单进程时 LiveView 直接读取本进程的时间线；多进程时各工作进程用 TimelinePublisher
+把已结束的秒窗口发到父进程的队列，父进程的 LiveView 合并后再打印。
+"""
+
+import queue as queue_module
+import threading
+import time
+
+from .stats import Timeline
+
+OP_NAMES = {"create": "创建", "get": "获取"}
+
+
+class TimelinePublisher:
+    """工作进程内的后台线程：每秒把已经结束的窗口发送到父进程"""
+
+    def __init__(self, timeline, queue, interval=1.0):
+        self.timeline = timeline
+        self.queue = queue
+        self.interval = interval
+        self._published_until = 0
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="timeline-publisher", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """停止并发送剩余的全部窗口"""
+        self._stopped.set()
+        self._thread.join()
+        self._publish(float('inf'))
+
+    def _publish(self, until_second):
+        """发送 [已发送位置, until_second) 范围内的窗口；记录按完成时间归秒，已结束的秒不会再变化"""
+        for window in self.timeline.windows_in(self._published_until, until_second - 1):
+            self.queue.put(window)
+        self._published_until = until_second
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self._publish(int(time.time()))
+
+
+class LiveView:
+    """每秒打印一行实时指标，只读取按秒聚合的窗口，不扫描逐请求结果"""
+
+    def __init__(self, timeline=None, queue=None, interval=1.0):
+        self.timeline = timeline if timeline is not None else Timeline()
+        self.queue = queue
+        self.interval = interval
+        # 多进程时窗口要经过队列才能到达，多等一秒再打印
+        self.lag = 2 if queue is not None else 1
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="live-view", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+        self._drain()
+
+    def _drain(self):
+        if self.queue is None:
+            return
+        while True:
+            try:
+                op, second, success, failed, histogram = self.queue.get_nowait()
+            except queue_module.Empty:
+                return
+            self.timeline.merge_window(op, second, success, failed, histogram)
+
+    def format_line(self, second):
+        """生成某一秒的实时指标行"""
+        parts = [time.strftime('%H:%M:%S', time.localtime(second))]
+        windows = sorted(self.timeline.windows_in(second, second))
+        if not windows:
+            parts.append("无完成的请求")
+        for op, _, success, failed, histogram in windows:
+            metrics = Timeline.summarize(success, failed, histogram)
+            parts.append(f"{OP_NAMES.get(op, op)} {metrics['requests']:>6}/s 错误 {metrics['error_rate']:>5.1%} "
+                         f"P50 {metrics['p50']:>7.2f} P99 {metrics['p99']:>7.2f} 毫秒")
+        return " | ".join(parts)
+
+    def _run(self):
+        # 对齐到整秒后每秒刷新一次
+        while not self._stopped.wait(self.interval - time.time() % self.interval):
+            self._drain()
+            print(self.format_line(int(time.time()) - self.lag), flush=True)
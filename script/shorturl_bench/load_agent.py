@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""分布式压测代理：在每台压测机上运行，接收协调端分配的一部分请求，在约定时刻开始执行，返回直方图和时间线
+
+代理:
+    LOAD_AGENT_AUTHKEY=secret python -m shorturl_bench agent --host 0.0.0.0 --port 9100
+
+协调端:
+    LOAD_AGENT_AUTHKEY=secret python -m shorturl_bench run --agents host1:9100,host2:9100
+
+协调端和代理之间使用 multiprocessing.connection 通信（pickle + authkey 认证），
+只应在可信网络中使用，监听非本机地址时必须设置 authkey。
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+import traceback
+from multiprocessing.connection import Client, Listener
+
+from . import bench_command, bench_env
+
+DEFAULT_PORT = 9100
+AUTHKEY_ENV = "LOAD_AGENT_AUTHKEY"
+# 未设置环境变量时的默认 authkey，只允许在本机使用
+DEFAULT_AUTHKEY = "short-url-bench"
+
+
+def get_authkey():
+    """从环境变量读取 authkey"""
+    return os.environ.get(AUTHKEY_ENV, DEFAULT_AUTHKEY).encode()
+
+
+def parse_address(address):
+    """"host:port" -> (host, port)"""
+    host, _, port = address.rpartition(':')
+    return host or '127.0.0.1', int(port or DEFAULT_PORT)
+
+
+def run_task(kind, items, config, start_at):
+    """在约定时刻开始执行分配到的请求，返回汇总统计"""
+    # 延迟导入，代理进程启动时不需要加载压测引擎
+    from .engine import run_sharded_requests
+    from .result_log import reset_log
+
+    if config["log_file"]:
+        reset_log(config["log_file"])
+    time.sleep(max(0.0, start_at - time.time()))
+    return run_sharded_requests(kind, items, config, f"代理 {kind}")
+
+
+def serve(host, port, authkey, quiet=False):
+    """依次处理协调端的连接，直到收到 shutdown"""
+    with Listener((host, port), authkey=authkey) as listener:
+        print(f"压测代理已启动: {listener.address[0]}:{listener.address[1]}", flush=True)
+        while True:
+            with listener.accept() as conn:
+                while True:
+                    try:
+                        message = conn.recv()
+                    except EOFError:
+                        break
+                    command = message[0]
+                    if command == "clock":
+                        conn.send(time.time())
+                    elif command == "run":
+                        try:
+                            conn.send(("ok", run_task(*message[1:])))
+                        except Exception:
+                            conn.send(("error", traceback.format_exc()))
+                    elif command == "shutdown":
+                        return
+                    if not quiet:
+                        print(f"已处理命令: {command}", flush=True)
+
+
+class AgentClient:
+    """协调端到一个代理的连接"""
+
+    def __init__(self, address, authkey):
+        self.address = address
+        self._conn = Client(parse_address(address), authkey=authkey)
+
+    def clock_offset(self, samples=5):
+        """估计代理时钟与本机时钟的差（秒），取往返时间最短的一次"""
+        best = None
+        for _ in range(samples):
+            sent = time.time()
+            self._conn.send(("clock",))
+            agent_time = self._conn.recv()
+            received = time.time()
+            if best is None or received - sent < best[0]:
+                best = (received - sent, agent_time - (sent + received) / 2)
+        return best[1]
+
+    def submit(self, kind, items, config, start_at):
+        """发送任务后立即返回，start_at 为代理时钟下的开始时间"""
+        self._conn.send(("run", kind, items, config, start_at))
+
+    def result(self):
+        """等待任务完成并返回统计结果"""
+        status, payload = self._conn.recv()
+        if status != "ok":
+            raise RuntimeError(f"代理 {self.address} 执行失败:\n{payload}")
+        return payload
+
+    def shutdown(self):
+        self._conn.send(("shutdown",))
+        self.close()
+
+    def close(self):
+        self._conn.close()
+
+
+def start_local_agents(count):
+    """在本机启动 count 个代理进程（只监听 127.0.0.1），代替多台压测机；返回 (地址列表, 进程列表)"""
+    processes, addresses = [], []
+    for _ in range(count):
+        process = subprocess.Popen(bench_command("agent", "--port", "0", "--quiet"),
+                                   stdout=subprocess.PIPE, text=True, env=bench_env())
+        # 第一行输出是实际监听的地址
+        addresses.append(process.stdout.readline().rsplit(' ', 1)[-1].strip())
+        processes.append(process)
+    return addresses, processes
+
+
+def stop_local_agents(addresses, processes):
+    """通知本机代理退出"""
+    for address, process in zip(addresses, processes):
+        try:
+            AgentClient(address, get_authkey()).shutdown()
+        except OSError:
+            process.terminate()
+        process.wait()
+
+
+def parse_arguments(argv=None):
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(prog='python -m shorturl_bench agent', description='分布式压测代理')
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址 (默认: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'监听端口，0 表示自动分配 (默认: {DEFAULT_PORT})')
+    parser.add_argument('--quiet', action='store_true', help='不输出已处理的命令')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """主函数"""
+    args = parse_arguments(argv)
+    authkey = os.environ.get(AUTHKEY_ENV)
+    if not authkey and args.host not in ('127.0.0.1', 'localhost'):
+        print(f"错误: 监听非本机地址时必须通过环境变量 {AUTHKEY_ENV} 设置 authkey")
+        sys.exit(1)
+    serve(args.host, args.port, get_authkey(), args.quiet)
+
+
+if __name__ == "__main__":
+    main()
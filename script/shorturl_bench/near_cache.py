@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""近端缓存的开关和计数：通过各实例 Actuator 的 /actuator/nearcache 端点
+
+每个应用实例有自己的近端缓存，nginx 后面有多个实例时需要逐个指定管理端口上的端点，
+例如 http://app1:8081/actuator/nearcache,http://app2:8081/actuator/nearcache。
+"""
+
+import requests
+
+# 各实例计数中需要求和的字段
+COUNTERS = ("hits", "misses", "evictions", "negativeHits")
+
+
+def set_near_cache(endpoints, enabled):
+    """在所有实例上开启或关闭近端缓存（关闭时实例会清空缓存）"""
+    for endpoint in endpoints:
+        requests.post(endpoint, json={"enabled": enabled}, timeout=5).raise_for_status()
+
+
+def near_cache_counters(endpoints):
+    """所有实例的计数之和"""
+    totals = dict.fromkeys(COUNTERS, 0)
+    for endpoint in endpoints:
+        response = requests.get(endpoint, timeout=5)
+        response.raise_for_status()
+        stats = response.json()
+        for name in COUNTERS:
+            totals[name] += stats.get(name, 0)
+    return totals
+
+
+def counter_delta(before, after):
+    """两次读取之间的计数变化，以及近端缓存的命中率"""
+    delta = {name: after[name] - before[name] for name in COUNTERS}
+    lookups = delta["hits"] + delta["misses"]
+    delta["hit_ratio"] = delta["hits"] / lookups if lookups else 0.0
+    return delta
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""分阶段计时的 HTTP/1.1 客户端：分别记录 DNS 解析、TCP 连接、TLS 握手、请求写入、首字节等待和响应体读取
+
+requests 只能测出一次请求的总耗时，分不清 nginx 排队、建立连接和应用处理各占多少。
+这里直接在 socket 上收发，每个阶段用 perf_counter_ns 计时。连接保持复用时，
+复用的请求 DNS/连接/TLS 三个阶段记为 0，这样各阶段的平均值相加正好等于总耗时。
+
+    connection = PhaseTimingConnection("http://localhost:8080/short-url")
+    status, text, phases = connection.request("POST", {"url": "https://example.com/x"})
+"""
+
+import socket
+import ssl
+import time
+from urllib.parse import urlencode, urlsplit
+
+# 阶段按发生顺序排列，图表按此顺序堆叠
+PHASES = ("dns", "connect", "tls", "write", "ttfb", "body")
+PHASE_LABELS = {"dns": "DNS 解析", "connect": "TCP 连接", "tls": "TLS 握手", "write": "请求写入",
+                "ttfb": "等待首字节", "body": "读取响应"}
+
+
+def _elapsed_ms(start_ns, end_ns):
+    return (end_ns - start_ns) / 1e6
+
+
+class PhaseTimingConnection:
+    """单条（可保持复用的）HTTP/1.1 连接，不是线程安全的，每个线程各用一个"""
+
+    def __init__(self, base_url, keep_alive=True, timeout=30.0):
+        url = urlsplit(base_url)
+        self.https = url.scheme == "https"
+        self.host = url.hostname
+        self.port = url.port or (443 if self.https else 80)
+        self.path = url.path or "/"
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self._host_header = url.netloc
+        self._ssl_context = ssl.create_default_context() if self.https else None
+        self._sock = None
+        self._reader = None
+
+    def close(self):
+        if self._sock is not None:
+            self._reader.close()
+            self._sock.close()
+            self._sock = None
+            self._reader = None
+
+    def _connect(self, phases):
+        """建立新连接，记录 DNS、TCP 连接和 TLS 握手的耗时"""
+        t0 = time.perf_counter_ns()
+        family, socktype, proto, _, address = socket.getaddrinfo(self.host, self.port, type=socket.SOCK_STREAM)[0]
+        t1 = time.perf_counter_ns()
+        sock = socket.socket(family, socktype, proto)
+        sock.settimeout(self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            sock.connect(address)
+            t2 = time.perf_counter_ns()
+            if self._ssl_context is not None:
+                sock = self._ssl_context.wrap_socket(sock, server_hostname=self.host)
+            t3 = time.perf_counter_ns()
+        except BaseException:
+            sock.close()
+            raise
+        phases["dns"] = _elapsed_ms(t0, t1)
+        phases["connect"] = _elapsed_ms(t1, t2)
+        phases["tls"] = _elapsed_ms(t2, t3)
+        self._sock = sock
+        self._reader = sock.makefile('rb')
+
+    def _read_response(self):
+        """读取状态行、响应头和响应体，支持 Content-Length 和 chunked 两种格式"""
+        reader = self._reader
+        status_line = reader.readline()
+        if not status_line:
+            raise ConnectionError("连接已被服务端关闭")
+        status = int(status_line.split(None, 2)[1])
+        headers = {}
+        while True:
+            line = reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode('latin-1').partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int(reader.readline().split(b";")[0], 16)
+                if size == 0:
+                    # 跳过可能存在的 trailer
+                    while reader.readline() not in (b"\r\n", b"\n", b""):
+                        pass
+                    break
+                chunks.append(reader.read(size))
+                reader.readline()
+            body = b"".join(chunks)
+        else:
+            body = reader.read(int(headers.get("content-length", 0)))
+        return status, body, headers
+
+    def request(self, method, params):
+        """发送一个请求，返回 (状态码, 响应文本, {阶段: 毫秒})
+
+        复用的连接已被服务端关闭时（keep-alive 超时），重新建立连接后重试一次。
+        """
+        target = f"{self.path}?{urlencode(params)}" if params else self.path
+        head = (f"{method} {target} HTTP/1.1\r\nHost: {self._host_header}\r\nContent-Length: 0\r\n"
+                f"Connection: {'keep-alive' if self.keep_alive else 'close'}\r\n\r\n").encode('latin-1')
+        for attempt in range(2):
+            phases = {"dns": 0.0, "connect": 0.0, "tls": 0.0}
+            reused = self._sock is not None
+            if not reused:
+                self._connect(phases)
+            try:
+                t0 = time.perf_counter_ns()
+                self._sock.sendall(head)
+                t1 = time.perf_counter_ns()
+                # peek 阻塞到响应的第一个字节到达
+                if not self._reader.peek(1):
+                    raise ConnectionError("连接已被服务端关闭")
+                t2 = time.perf_counter_ns()
+                status, body, headers = self._read_response()
+                t3 = time.perf_counter_ns()
+            except OSError as e:
+                self.close()
+                # 只有复用的连接被对端关闭时才重试，超时等错误可能已经在服务端执行过
+                if reused and attempt == 0 and isinstance(e, ConnectionError):
+                    continue
+                raise
+            phases["write"] = _elapsed_ms(t0, t1)
+            phases["ttfb"] = _elapsed_ms(t1, t2)
+            phases["body"] = _elapsed_ms(t2, t3)
+            if not self.keep_alive or headers.get("connection", "").lower() == "close":
+                self.close()
+            return status, body.decode('utf-8', 'replace'), phases
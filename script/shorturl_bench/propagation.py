@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""写入传播探测：测量短链接从创建成功到写入 MySQL 的时间
+
+createShortUrl 返回短码时只写了 Redis（TTL 固定）并发出 Kafka 消息，KafkaConsumerService 批量消费后
+才通过 addBatch 写入 MySQL。探测器在创建的同时轮询只查数据库的 /short-url/info，直到每个短链接出现，
+得到"创建 -> 持久化"的延迟分布和始终没有持久化的数量。
+
+缓存过期时仍未持久化的短链接会再走一次正常读取接口：此时 Redis 已经没有这个键，MySQL 也还没有，
+用户会拿到 404，即"短链接消失"。这类短链接单独计数。
+
+探测器同时按秒记录新发现持久化的短链接数和尚未持久化的数量，用来估计消费者每秒写入的行数和积压。
+创建量很大时可以只跟踪每 sample 个短链接中的一个，计数按 sample 放大。
+"""
+
+import collections
+import concurrent.futures
+import threading
+import time
+
+from .engine import create_short_url, create_short_url_batch, get_original_url, get_session, timed_request
+from .stats import LatencyHistogram, RequestStats
+from .workload import UrlBatches
+
+# 轮询 /short-url/info 的线程数，与创建请求的并发数无关
+PROBE_WORKERS = 8
+
+
+def info_url(base_url):
+    return f"{base_url.rstrip('/')}/info"
+
+
+class PropagationProbe:
+    """跟踪已创建但尚未持久化的短链接，按固定间隔轮询 /short-url/info
+
+    所有时间都用 time.monotonic()；持久化延迟的精度取决于轮询间隔和每轮轮询的耗时，报告中给出实际的平均轮询周期。
+    """
+
+    def __init__(self, base_url, cache_ttl=60.0, interval=0.2, timeout=120.0, workers=PROBE_WORKERS):
+        self.base_url = base_url
+        self.cache_ttl = cache_ttl
+        self.interval = interval
+        self.timeout = timeout
+        self.workers = workers
+        # 短链接 -> 创建成功的时刻
+        self.pending = {}
+        self.durable_latency = LatencyHistogram()
+        # 缓存过期前未持久化的短链接中，正常读取接口返回 404 的
+        self.vanished = set()
+        self.persisted_after_expiry = 0
+        self.never_persisted = []
+        self.poll_errors = 0
+        self.rounds = 0
+        self.round_time = 0.0
+        self._checked_read_path = set()
+        self._lock = threading.Lock()
+        self._creating = True
+        self._thread = None
+        self.started_at = time.monotonic()
+        self.creating_finished_at = None
+        self.backlog_at_finish = 0
+        # 探测开始后的秒 -> 这一秒内发现持久化的短链接数
+        self.persisted_per_second = collections.Counter()
+        # 每轮轮询结束时 (相对时间秒, 尚未持久化的短链接数)
+        self.backlog = []
+
+    def created(self, short_url, at=None):
+        """记录一个刚创建成功的短链接"""
+        with self._lock:
+            self.pending[short_url] = at or time.monotonic()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="propagation-probe", daemon=True)
+        self._thread.start()
+        return self
+
+    def finish(self):
+        """创建阶段结束：继续轮询直到全部持久化或超时"""
+        self.creating_finished_at = time.monotonic()
+        with self._lock:
+            self.backlog_at_finish = len(self.pending)
+        self._creating = False
+        self._thread.join()
+
+    def _check(self, short_url, created_at):
+        """查询一个短链接是否已经持久化；返回 (短链接, 持久化延迟毫秒或None)"""
+        try:
+            response = get_session().get(info_url(self.base_url), params={"shortUrl": short_url})
+        except Exception:
+            with self._lock:
+                self.poll_errors += 1
+            return short_url, None
+        now = time.monotonic()
+        if response.status_code == 200:
+            return short_url, (now - created_at) * 1000
+        if response.status_code != 404:
+            with self._lock:
+                self.poll_errors += 1
+        elif now - created_at > self.cache_ttl and short_url not in self._checked_read_path:
+            # 缓存已经过期、数据库还没有：看看用户通过正常读取接口会得到什么
+            self._checked_read_path.add(short_url)
+            result = get_original_url(short_url, self.base_url)
+            if result.get("code") == 404:
+                with self._lock:
+                    self.vanished.add(short_url)
+        return short_url, None
+
+    def _run(self):
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while True:
+                round_start = time.monotonic()
+                with self._lock:
+                    batch = list(self.pending.items())
+                if not batch and not self._creating:
+                    return
+                for short_url, latency in executor.map(lambda item: self._check(*item), batch):
+                    if latency is None:
+                        continue
+                    with self._lock:
+                        del self.pending[short_url]
+                        self.durable_latency.record(latency)
+                        if latency > self.cache_ttl * 1000:
+                            self.persisted_after_expiry += 1
+                        self.persisted_per_second[int(time.monotonic() - self.started_at)] += 1
+                now = time.monotonic()
+                self.rounds += 1
+                self.round_time += now - round_start
+                with self._lock:
+                    self.backlog.append((now - self.started_at, len(self.pending)))
+                if not self._creating:
+                    # 超时从创建结束（或创建结束之后才记录的短链接的创建时刻）算起，
+                    # 创建阶段比超时更长时，早期创建的短链接也有完整的等待时间
+                    with self._lock:
+                        expired = [short_url for short_url, created_at in self.pending.items()
+                                   if now - max(created_at, self.creating_finished_at) > self.timeout]
+                        for short_url in expired:
+                            del self.pending[short_url]
+                        self.never_persisted.extend(expired)
+                time.sleep(max(0.0, self.interval - (now - round_start)))
+
+    def throughput(self, sample=1):
+        """消费者吞吐量和积压的估计值（已按 sample 放大），可直接写入 JSON
+
+        持久化速率以第一个和最后一个发现持久化的秒之间的时间计算；排空时间为创建结束到最后一次发现持久化。
+        """
+        seconds = sorted(self.persisted_per_second)
+        persisted = sum(self.persisted_per_second.values()) * sample
+        active = seconds[-1] - seconds[0] + 1 if seconds else 0
+        created_until = (self.creating_finished_at or time.monotonic()) - self.started_at
+        return {
+            "sample": sample,
+            "persisted_rows": persisted,
+            "rows_per_second": persisted / active if active else 0.0,
+            "peak_rows_per_second": max(self.persisted_per_second.values(), default=0) * sample,
+            "peak_backlog": max((pending for _, pending in self.backlog), default=0) * sample,
+            # 创建结束时尚未确认持久化的数量，其中可能有已经持久化、但还没轮询到的
+            "backlog_at_create_end": self.backlog_at_finish * sample,
+            "drain_seconds": max(0.0, seconds[-1] + 1 - created_until) if seconds else None,
+            "rows_timeline": [{"t": second, "rows": self.persisted_per_second.get(second, 0) * sample}
+                              for second in range(seconds[0], seconds[-1] + 1)] if seconds else [],
+            "backlog_timeline": [{"t": round(t, 3), "pending": pending * sample} for t, pending in self.backlog],
+        }
+
+    def report(self):
+        """探测结果，可直接写入 JSON"""
+        p50, p90, p99, p999 = self.durable_latency.percentiles([50, 90, 99, 99.9])
+        return {
+            "durable": self.durable_latency.count,
+            "never_persisted": len(self.never_persisted),
+            "persisted_after_cache_expiry": self.persisted_after_expiry,
+            "vanished_after_cache_expiry": len(self.vanished),
+            "poll_errors": self.poll_errors,
+            "mean_poll_round_ms": self.round_time / self.rounds * 1000 if self.rounds else 0.0,
+            "latency": {"mean": self.durable_latency.mean(), "p50": p50, "p90": p90, "p99": p99, "p99.9": p999,
+                        "max": self.durable_latency.max},
+            "never_persisted_sample": self.never_persisted[:20],
+            "vanished_sample": sorted(self.vanished)[:20],
+        }
+
+
+def run_propagation_probe(config, urls):
+    """以配置的并发数（和可选的固定速率）创建短链接，同时探测它们的持久化时间，返回 (创建统计, 探测器)
+
+    batch_size 大于 1 时每个请求通过批量接口创建一批；只跟踪每 probe_sample 个短链接中的一个。
+    """
+    probe = PropagationProbe(config["base_url"], config["cache_ttl"], config["probe_interval"],
+                             config["probe_timeout"]).start()
+    stats = RequestStats()
+    lock = threading.Lock()
+    interval = 1.0 / config["rate"] if config["rate"] else 0.0
+    origin = time.monotonic()
+    batch_size = config["batch_size"]
+    batches = UrlBatches(urls, batch_size)
+    sample = config["probe_sample"]
+
+    def create(index):
+        if interval:
+            time.sleep(max(0.0, origin + index * interval - time.monotonic()))
+        if batch_size > 1:
+            first = index * batch_size
+            result = timed_request(create_short_url_batch, batches[index], config["base_url"], config["verbose"])
+            created = result.get("short_urls", []) if result["status"] == "success" else []
+        else:
+            first = index
+            result = timed_request(create_short_url, urls[index], config["base_url"], config["verbose"])
+            created = [result["short_url"]] if result["status"] == "success" else []
+        at = time.monotonic()
+        for position, short_url in enumerate(created, first):
+            if position % sample == 0:
+                probe.created(short_url, at)
+        with lock:
+            stats.add(result)
+
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=config["concurrency"]) as executor:
+            list(executor.map(create, range(len(batches))))
+    finally:
+        probe.finish()
+    return stats, probe
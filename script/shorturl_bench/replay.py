@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+"""访问日志回放：按生产流量的原始时间点（可用 speed 加速或放慢）重新发送创建和获取请求
+
+支持两种输入，文件名以 .gz 结尾时按 gzip 读取，都是逐行流式读取，不会整个读入内存：
+
+- nginx 访问日志：nginx.conf 中 location /short-url 使用的 timed 格式（combined 格式后面加上
+  $request_time $upstream_response_time $msec），也接受不带后三项的 combined 格式。
+  POST /short-url?url=... 回放为创建，GET /short-url?shortUrl=... 回放为获取，其余请求（/info、/batch 等）跳过。
+  有 $msec 时发送时刻为 $msec - $request_time（毫秒精度），否则同一秒内的请求在这一秒内均匀分布。
+- JSONL 轨迹（扩展名 .jsonl）：每行一个对象，例如
+  {"ts": 1760000000.123, "op": "get", "short_url": "abc123", "status": 200, "latency_ms": 3.2}
+  {"ts": 1760000000.125, "op": "create", "url": "https://example.com/x", "status": 201}
+  ts 为请求开始的 Unix 时间（秒），status 和 latency_ms 可省略。
+
+日志中的短码在测试环境中并不存在：回放前先扫描一遍日志，为每个成功读取过的短码预先创建一个短链接，
+回放时把原短码换成对应的新短码，键的热度分布保持不变；日志中读取失败（404 等）的短码换成不可能存在的短码。
+短码映射的大小与不同短码的个数成正比，与日志行数无关。
+"""
+
+import concurrent.futures
+import contextlib
+import functools
+import gzip
+import itertools
+import json
+import re
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+from urllib.parse import parse_qs, urlsplit
+
+from tqdm import tqdm
+
+from .client_metrics import ClientMonitor, StackSampler
+from .engine import SYNC_HANDLERS, run_sharded_requests, timed_scheduled_request
+from .stats import LatencyHistogram, OperationStats, Timeline
+from .workload import create_urls
+
+# 一条要回放的请求: 开始时刻(Unix 秒), 操作, 参数(原始URL或短码), 日志中的状态码, 日志中的响应时间(毫秒)
+TraceRecord = namedtuple("TraceRecord", "ts op arg status latency_ms")
+
+# combined 格式，后面可选 $request_time $upstream_response_time $msec
+NGINX_LINE = re.compile(
+    r'(?P<addr>\S+) \S+ \S+ \[(?P<time>[^\]]+)\] "(?P<method>[A-Z]+) (?P<target>\S+)[^"]*" (?P<status>\d{3}) \S+'
+    r'(?: "[^"]*" "[^"]*")?'
+    r'(?: (?P<request_time>[\d.]+|-) (?P<upstream_time>[\d.]+(?:, [\d.]+)*|-)(?: (?P<msec>\d+\.\d+))?)?')
+
+# 日志中读取失败的短码回放时换成这个前缀开头的短码，base62 短码中不会出现 "-"
+MISSING_PREFIX = "-"
+# 预先创建短链接失败时重试的轮数
+SEED_RETRIES = 2
+# 已到发送时刻、还在线程池中排队的请求数上限（不含正在发送的）；排满时暂停读取日志，
+# 内存占用与日志长度无关，后面的请求晚于计划时刻发出，延误计入校正后的响应时间和调度延迟
+MAX_QUEUED = 10000
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_time_local(value):
+    """解析 nginx 的 $time_local（例如 18/Oct/2026:10:00:00 +0800），同一秒的行很多，结果按字符串缓存"""
+    return datetime.strptime(value, "%d/%b/%Y:%H:%M:%S %z").timestamp()
+
+
+def parse_nginx_line(line):
+    """解析一行访问日志，返回 (TraceRecord, 是否有毫秒时间戳)；不需要回放的行返回 (None, False)"""
+    match = NGINX_LINE.match(line)
+    if match is None:
+        return None, False
+    url = urlsplit(match["target"])
+    if url.path.rstrip('/') != '/short-url':
+        return None, False
+    query = parse_qs(url.query)
+    if match["method"] == 'POST' and 'url' in query:
+        op, arg = "create", query['url'][0]
+    elif match["method"] == 'GET' and 'shortUrl' in query:
+        op, arg = "get", query['shortUrl'][0]
+    else:
+        return None, False
+    latency = float(match["request_time"]) * 1000 if match["request_time"] not in (None, '-') else None
+    if match["msec"]:
+        # $msec 是写日志（请求结束）的时刻
+        return TraceRecord(float(match["msec"]) - (latency or 0.0) / 1000, op, arg, int(match["status"]),
+                           latency), True
+    return TraceRecord(parse_time_local(match["time"]), op, arg, int(match["status"]), latency), False
+
+
+def parse_jsonl_line(line):
+    """解析 JSONL 轨迹的一行，不需要回放的行返回 None"""
+    line = line.strip()
+    if not line:
+        return None
+    entry = json.loads(line)
+    op = entry.get("op")
+    arg = entry.get("url") if op == "create" else entry.get("short_url") if op == "get" else None
+    if arg is None:
+        return None
+    return TraceRecord(float(entry["ts"]), op, arg, entry.get("status"), entry.get("latency_ms"))
+
+
+def open_trace(filename):
+    return gzip.open(filename, 'rt', encoding='utf-8') if filename.endswith('.gz') else \
+        open(filename, 'r', encoding='utf-8')
+
+
+def spread_within_second(records):
+    """只有秒级时间戳的记录：把同一秒的记录均匀分布到这一秒内（每次只缓存一秒的记录）"""
+    second, group = None, []
+    for record in records:
+        if record.ts != second and group:
+            for i, pending in enumerate(group):
+                yield pending._replace(ts=second + i / len(group))
+            group = []
+        second = record.ts
+        group.append(record)
+    for i, pending in enumerate(group):
+        yield pending._replace(ts=second + i / len(group))
+
+
+def nginx_records(f):
+    """逐行解析访问日志: (TraceRecord, 是否有毫秒时间戳)"""
+    for line in f:
+        record, precise = parse_nginx_line(line)
+        if record is not None:
+            yield record, precise
+
+
+def read_trace(filename):
+    """逐行读取访问日志或 JSONL 轨迹，生成 TraceRecord，跳过无法解析和不需要回放的行"""
+    with open_trace(filename) as f:
+        if filename.endswith(('.jsonl', '.jsonl.gz')):
+            for line in f:
+                try:
+                    record = parse_jsonl_line(line)
+                except (ValueError, KeyError, TypeError):
+                    continue
+                if record is not None:
+                    yield record
+            return
+        records = nginx_records(f)
+        first = next(records, None)
+        if first is None:
+            return
+        # 按第一行判断日志格式：同一个文件中的行格式相同
+        records = (record for record, _ in itertools.chain([first], records))
+        yield from records if first[1] else spread_within_second(records)
+
+
+def is_success(status):
+    return status is None or status < 400
+
+
+def scan_trace(filename):
+    """第一遍扫描：统计各操作的请求数和时间范围，按第一次出现的顺序收集成功读取过的短码"""
+    counts = {}
+    # dict 作为有序集合
+    found = {}
+    first = last = None
+    for record in read_trace(filename):
+        counts[record.op] = counts.get(record.op, 0) + 1
+        first = record.ts if first is None else min(first, record.ts)
+        last = record.ts if last is None else max(last, record.ts)
+        if record.op == "get" and is_success(record.status):
+            found[record.arg] = None
+    return {"counts": counts, "first": first, "last": last, "codes": list(found)}
+
+
+def seed_short_codes(codes, config):
+    """为日志中的每个短码在测试环境中创建一个短链接，返回 {日志短码: 新短码}
+
+    创建失败的部分最多重试 SEED_RETRIES 轮；仍然缺少的短码不在映射中，由调用方报告。
+    """
+    seed_config = dict(config, rate=None, rate_curve=None, batch_size=1)
+    created = []
+    for attempt in range(SEED_RETRIES + 1):
+        missing = len(codes) - len(created)
+        if not missing:
+            break
+        if attempt:
+            print(f"有 {missing} 个短链接创建失败，重试 ({attempt}/{SEED_RETRIES})")
+        stats = run_sharded_requests("create", create_urls(missing, config["url_corpus"]), seed_config,
+                                     "预先创建短链接")
+        created.extend(short_url for short_url, _ in stats.successful)
+    # 任意一一对应都能保持键的热度分布
+    return dict(zip(codes, created))
+
+
+def replay_trace(filename, code_map, config, first_ts, total=None):
+    """按日志时间点回放（相对第一条记录的时间除以 speed），返回 (统计, 日志中记录的各操作延迟直方图)
+
+    开环发送：线程池已满时请求排队，排队时间计入校正后的响应时间；线程池引擎。
+    排队的请求超过 MAX_QUEUED 时暂停读取日志，直到有请求完成。
+    """
+    base_url = config["base_url"]
+    verbose = config["verbose"]
+    speed = config["replay_speed"]
+    stats = OperationStats()
+    timeline = Timeline()
+    logged = {}
+    lock = threading.Lock()
+    monitor = ClientMonitor(config["concurrency"])
+    # 正在发送和排队的请求数上限，在请求处理完时释放
+    slots = threading.BoundedSemaphore(config["concurrency"] + MAX_QUEUED)
+    profiler = StackSampler(config["profile_file"], config["profile_interval"] / 1000, "回放访问日志") \
+        if config["profile_file"] else None
+
+    def send(handler, arg, planned_time):
+        monitor.request_started(planned_time)
+        try:
+            return timed_scheduled_request(handler, arg, base_url, verbose, planned_time)
+        finally:
+            monitor.request_finished()
+
+    def record(op, future):
+        handling_start = time.thread_time()
+        result = future.result()
+        result["op"] = op
+        with lock:
+            stats.add(result)
+            progress.update(1)
+        timeline.record(op, result)
+        monitor.result_handled(time.thread_time() - handling_start)
+        slots.release()
+
+    with contextlib.ExitStack() as stack:
+        stack.callback(monitor.start().stop)
+        if profiler:
+            stack.callback(profiler.start().stop)
+        executor = stack.enter_context(concurrent.futures.ThreadPoolExecutor(max_workers=config["concurrency"]))
+        progress = stack.enter_context(tqdm(total=total, desc="回放访问日志", disable=not config["progress"]))
+        origin = time.perf_counter()
+        stats.started_at = time.time()
+        for entry in read_trace(filename):
+            arg = entry.arg
+            if entry.op == "get":
+                arg = code_map.get(arg) or MISSING_PREFIX + arg
+            if entry.latency_ms is not None and is_success(entry.status):
+                logged.setdefault(entry.op, LatencyHistogram()).record(entry.latency_ms)
+            planned = origin + (entry.ts - first_ts) / speed
+            delay = planned - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            monitor.request_submitted()
+            slots.acquire()
+            executor.submit(send, SYNC_HANDLERS[entry.op], arg, planned).add_done_callback(functools.partial(record, entry.op))
+        executor.shutdown(wait=True)
+    stats.timeline = timeline
+    stats.client = monitor.metrics
+    return stats, logged
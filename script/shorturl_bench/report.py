@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+"""报告层：终端输出、结果文件中的汇总字段和图表
+
+所有统计都来自 stats 中的直方图和时间线；matplotlib 和 NumPy 只在画图的函数内部导入，
+不画图的运行（CI 冒烟测试、压测代理）不会加载它们。
+"""
+
+import os
+
+from .phase_client import PHASES, PHASE_LABELS
+
+GROUP_LABELS = {"cache_hit": "推测缓存命中", "cache_miss": "推测缓存未命中"}
+OP_LABELS = {"create": "创建短链接", "get": "获取原始URL"}
+
+
+def print_latency_percentiles(stats):
+    """打印成功请求的响应时间百分位数；开环模式下同时打印校正后的百分位数，获取测试按推测的缓存命中情况分组打印"""
+    for histogram, label in ((stats.latency, "响应时间"), (stats.corrected_latency, "校正后响应时间(从计划发送时间起算)")):
+        if not histogram.count:
+            continue
+        p50, p90, p95, p99 = histogram.percentiles([50, 90, 95, 99])
+        print(f"{label} P50/P90/P95/P99: {p50:.2f} / {p90:.2f} / {p95:.2f} / {p99:.2f} 毫秒")
+    for group, histogram in sorted(stats.groups.items()):
+        p50, p90, p95, p99 = histogram.percentiles([50, 90, 95, 99])
+        print(f"  {GROUP_LABELS.get(group, group)} ({histogram.count} 请求) P50/P90/P95/P99: "
+              f"{p50:.2f} / {p90:.2f} / {p95:.2f} / {p99:.2f} 毫秒")
+
+
+def histogram_summary(histogram):
+    """从直方图计算保存到结果文件的响应时间指标"""
+    p50, p90, p95, p99 = histogram.percentiles([50, 90, 95, 99])
+    return {
+        "avg_response_time": histogram.mean(),
+        "p50_response_time": p50,
+        "p90_response_time": p90,
+        "p95_response_time": p95,
+        "p99_response_time": p99,
+        "latency_histogram": histogram.to_dict()
+    }
+
+
+def phase_breakdown(phases):
+    """各阶段的平均值和百分位数（毫秒），按阶段发生顺序排列"""
+    breakdown = {}
+    for phase in PHASES:
+        if phase in phases:
+            p50, p90, p99 = phases[phase].percentiles([50, 90, 99])
+            breakdown[phase] = {"mean": phases[phase].mean(), "p50": p50, "p90": p90, "p99": p99}
+    return breakdown
+
+
+def print_duplicate_codes(stats):
+    """检查创建阶段收到的短码是否有重复；不同实例或重试分配到同一个短码会让后写入的覆盖先写入的"""
+    if stats.codes is None or not stats.codes.count:
+        return 0
+    duplicates, sample = stats.codes.duplicates()
+    if duplicates:
+        print(f"警告: 收到重复短码 {duplicates} 个 (共 {stats.codes.count} 个短码)，例如: {', '.join(sample)}")
+    else:
+        print(f"重复短码: 0 (共 {stats.codes.count} 个短码)")
+    return duplicates
+
+
+def print_phase_breakdown(phases):
+    """打印分阶段耗时表；复用连接的请求 DNS/连接/TLS 记为 0，各阶段平均值之和等于平均响应时间"""
+    if not phases:
+        return
+    print(f"  分阶段耗时 (毫秒):   {'平均':>8} {'P50':>8} {'P90':>8} {'P99':>8}")
+    for phase, item in phase_breakdown(phases).items():
+        print(f"    {PHASE_LABELS[phase]:<10} {item['mean']:>8.2f} {item['p50']:>8.2f} {item['p90']:>8.2f} {item['p99']:>8.2f}")
+
+
+def setup_chinese_font():
+    """配置matplotlib支持中文显示"""
+    import matplotlib.pyplot as plt
+    
+    # 尝试使用系统中文字体
+    font_paths = [
+        '/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc',  # Arch Linux常见路径
+        '/usr/share/fonts/wenquanyi/wqy-microhei.ttc',        # WenQuanYi微米黑
+        '/usr/share/fonts/wqy-microhei/wqy-microhei.ttc',     # 另一种路径
+        '/usr/share/fonts/TTF/SourceHanSansCN-Regular.ttf',   # 思源黑体
+        '/usr/share/fonts/noto/NotoSansCJK-Regular.ttc',      # Noto Sans CJK
+        '/usr/share/fonts/google-noto-cjk/NotoSansCJK-Regular.ttc'  # Google Noto CJK
+    ]
+    
+    font_found = False
+    for font_path in font_paths:
+        if os.path.exists(font_path):
+            plt.rcParams['font.family'] = ['sans-serif']
+            if 'wqy-microhei' in font_path:
+                plt.rcParams['font.sans-serif'] = ['WenQuanYi Micro Hei']
+            elif 'SourceHanSansCN' in font_path:
+                plt.rcParams['font.sans-serif'] = ['Source Han Sans CN']
+            else:
+                plt.rcParams['font.sans-serif'] = ['Noto Sans CJK JP']
+            plt.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
+            print(f"使用中文字体: {font_path}")
+            font_found = True
+            break
+    
+    if not font_found:
+        # 使用matplotlib自带的DejaVu字体
+        print("警告: 未找到合适的中文字体，图表中的中文可能无法正确显示")
+        print("尝试安装中文字体: sudo pacman -S noto-fonts-cjk wqy-microhei")
+        plt.rcParams['font.family'] = ['sans-serif']
+        plt.rcParams['font.sans-serif'] = ['DejaVu Sans']
+        plt.rcParams['axes.unicode_minus'] = False
+
+
+def histogram_points(histogram):
+    """把延迟直方图展开成 (桶中点, 样本数) 两个数组，用于按权重重新分箱"""
+    import numpy as np
+    
+    buckets = list(histogram.buckets())
+    centers = np.array([(low + high) / 2 for low, high, _ in buckets])
+    counts = np.array([count for _, _, count in buckets])
+    return centers, counts
+
+
+def window_throughput(points):
+    """按墙钟时间计算吞吐量：第一个到最后一个有请求的秒窗口之间的请求数 / 秒数
+
+    并发时各请求的响应时间相互重叠，不能用 请求数 / 响应时间之和 计算吞吐量。
+    """
+    active = [point for point in points if point["requests"]]
+    if not active:
+        return 0.0
+    seconds = active[-1]["timestamp"] - active[0]["timestamp"] + 1
+    return sum(point["requests"] for point in active) / seconds
+
+
+def generate_performance_chart(create_histogram, get_histogram, output_file='performance_chart.png', timeline=None,
+                               server_metrics=None, phase_stats=None):
+    """生成性能测试图表
+
+    传入每秒时间线时追加延迟随时间变化的面板，传入服务端指标时追加与客户端 P99 对照的面板，
+    传入各操作的分阶段直方图 {操作: {阶段: 直方图}} 时追加分阶段耗时的堆叠柱状图。
+    """
+    # 只有需要画图时才导入 matplotlib 和 NumPy
+    import matplotlib.pyplot as plt
+    import numpy as np
+    
+    # 设置中文字体
+    setup_chinese_font()
+    
+    series = timeline.series() if timeline is not None else {}
+    server_series = server_metrics["series"] if series and server_metrics else {}
+    phase_stats = {op: phases for op, phases in (phase_stats or {}).items() if phases}
+    panels = 3 + bool(series) + bool(server_series) + bool(phase_stats)
+    fig, axes = plt.subplots(panels, 1, figsize=(12, 6 * panels))
+    ax1, ax2, ax3 = axes[:3]
+    
+    # 响应时间分布：直接把直方图的桶重新合并到对数刻度的箱中，耗时只取决于桶数，与请求数无关
+    low = max(min(create_histogram.min, get_histogram.min), 0.001)
+    bins = np.geomspace(low, max(create_histogram.max, get_histogram.max) * 1.1, 80)
+    for histogram, label in ((create_histogram, '创建短链接'), (get_histogram, '获取原始URL')):
+        centers, counts = histogram_points(histogram)
+        binned, _ = np.histogram(centers, bins=bins, weights=counts)
+        ax1.stairs(binned, bins, fill=True, alpha=0.5, label=label)
+    ax1.set_xscale('log')
+    ax1.set_title('响应时间分布')
+    ax1.set_xlabel('响应时间 (毫秒，对数刻度)')
+    ax1.set_ylabel('请求数量')
+    ax1.legend()
+    ax1.grid(True, linestyle='--', alpha=0.7)
+    
+    # 响应时间百分位数
+    percentiles = [50, 75, 90, 95, 99]
+    create_percentiles = create_histogram.percentiles(percentiles)
+    get_percentiles = get_histogram.percentiles(percentiles)
+    
+    ax2.bar(
+        [f"P{p}创建" for p in percentiles], 
+        create_percentiles, 
+        width=0.4, 
+        label='创建短链接'
+    )
+    ax2.bar(
+        [f"P{p}获取" for p in percentiles], 
+        get_percentiles, 
+        width=0.4, 
+        label='获取原始URL'
+    )
+    ax2.set_title('响应时间百分位数')
+    ax2.set_ylabel('响应时间 (毫秒)')
+    ax2.legend()
+    ax2.grid(True, linestyle='--', alpha=0.7)
+    
+    # 平均响应时间和吞吐量比较，吞吐量按每秒时间线的墙钟时间计算
+    metrics = ['平均响应时间 (毫秒)', '吞吐量 (请求/秒)']
+    create_metrics = [create_histogram.mean(), window_throughput(series.get("create", []))]
+    get_metrics = [get_histogram.mean(), window_throughput(series.get("get", []))]
+    
+    x = np.arange(len(metrics))
+    width = 0.35
+    
+    ax3.bar(x - width/2, create_metrics, width, label='创建短链接')
+    ax3.bar(x + width/2, get_metrics, width, label='获取原始URL')
+    
+    ax3.set_title('性能指标比较')
+    ax3.set_xticks(x)
+    ax3.set_xticklabels(metrics)
+    ax3.legend()
+    ax3.grid(True, linestyle='--', alpha=0.7)
+    
+    # 每秒的 P50/P99 延迟和请求数，便于观察预热、停顿和缓存过期造成的突变
+    if series:
+        ax4 = axes[3]
+        ax4_rps = ax4.twinx()
+        for op, points in series.items():
+            label = OP_LABELS.get(op, op)
+            t = [point["t"] for point in points]
+            # 没有成功请求的秒不画延迟，避免把空档画成 0 毫秒
+            p50 = [point["p50"] if point["requests"] > point["errors"] else np.nan for point in points]
+            p99 = [point["p99"] if point["requests"] > point["errors"] else np.nan for point in points]
+            line, = ax4.plot(t, p50, label=f'{label} P50')
+            ax4.plot(t, p99, linestyle='--', color=line.get_color(), label=f'{label} P99')
+            ax4_rps.plot(t, [point["requests"] for point in points], linestyle=':', color=line.get_color(),
+                         alpha=0.6, label=f'{label} 请求/秒')
+        ax4.set_title('响应时间随时间变化')
+        ax4.set_xlabel('测试开始后的时间 (秒)')
+        ax4.set_ylabel('响应时间 (毫秒)')
+        ax4_rps.set_ylabel('请求/秒')
+        lines, labels = ax4.get_legend_handles_labels()
+        rps_lines, rps_labels = ax4_rps.get_legend_handles_labels()
+        ax4.legend(lines + rps_lines, labels + rps_labels, loc='upper left')
+        ax4.grid(True, linestyle='--', alpha=0.7)
+    
+    # 服务端连接池、线程数等指标与客户端每秒 P99 画在同一时间轴上，一起升高的指标多半是瓶颈
+    if server_series:
+        ax5 = axes[4]
+        ax5_server = ax5.twinx()
+        for op, points in series.items():
+            ax5.plot([point["t"] for point in points],
+                     [point["p99"] if point["requests"] > point["errors"] else np.nan for point in points],
+                     linestyle='--', label=f'{OP_LABELS.get(op, op)} P99')
+        for name, points in server_series.items():
+            ax5_server.plot([point["t"] for point in points],
+                            [point["value"] if point["value"] is not None else np.nan for point in points],
+                            label=server_metrics["summary"][name]["label"])
+        ax5.set_title('服务端指标与客户端 P99')
+        ax5.set_xlabel('测试开始后的时间 (秒)')
+        ax5.set_ylabel('响应时间 (毫秒)')
+        ax5_server.set_ylabel('服务端指标')
+        lines, labels = ax5.get_legend_handles_labels()
+        server_lines, server_labels = ax5_server.get_legend_handles_labels()
+        ax5.legend(lines + server_lines, labels + server_labels, loc='upper left')
+        ax5.grid(True, linestyle='--', alpha=0.7)
+    
+    # 分阶段耗时：每个操作的平均值和 P50/P90/P99 各一根柱，按阶段堆叠
+    if phase_stats:
+        ax6 = axes[-1]
+        stats_names = ["mean", "p50", "p90", "p99"]
+        bar_labels = []
+        bottoms = []
+        breakdowns = []
+        for op, phases in phase_stats.items():
+            breakdown = phase_breakdown(phases)
+            for name in stats_names:
+                bar_labels.append(f"{OP_LABELS.get(op, op)}\n{'平均' if name == 'mean' else name.upper()}")
+                breakdowns.append({phase: item[name] for phase, item in breakdown.items()})
+                bottoms.append(0.0)
+        x = np.arange(len(bar_labels))
+        for phase in PHASES:
+            values = np.array([breakdown.get(phase, 0.0) for breakdown in breakdowns])
+            if not values.any():
+                continue
+            ax6.bar(x, values, bottom=bottoms, label=PHASE_LABELS[phase])
+            bottoms = [bottom + value for bottom, value in zip(bottoms, values)]
+        ax6.set_title('分阶段耗时 (百分位柱为各阶段各自的百分位数相加)')
+        ax6.set_xticks(x)
+        ax6.set_xticklabels(bar_labels)
+        ax6.set_ylabel('响应时间 (毫秒)')
+        ax6.legend()
+        ax6.grid(True, linestyle='--', alpha=0.7)
+    
+    plt.tight_layout()
+    plt.savefig(output_file)
+    print(f"性能图表已保存到: {output_file}")
+
+
+def print_capacity_curve(label, capacity, steps):
+    """按速率顺序打印吞吐量-延迟曲线"""
+    print(f"\n{label} 吞吐量-延迟曲线:")
+    print(f"  {'目标(请求/秒)':>14} {'实际(请求/秒)':>14} {'P50(毫秒)':>10} {'P99(毫秒)':>10} {'错误率':>8}  结果")
+    for step in sorted(steps, key=lambda step: step["target_rps"]):
+        print(f"  {step['target_rps']:>14.0f} {step['achieved_rps']:>14.0f} {step['p50']:>10.2f} "
+              f"{step['p99']:>10.2f} {step['error_rate']:>8.2%}  {'满足' if step['passed'] else '不满足'}")
+    print(f"{label} 满足 SLO 的最大吞吐量: {capacity:.0f} 请求/秒" if capacity else f"{label}: 最低速率也不满足 SLO")
+
+
+def save_capacity_chart(curves, slo_p99, output_file):
+    """把创建和获取的吞吐量-延迟曲线画在两个子图中"""
+    # 只有需要画图时才导入 matplotlib
+    import matplotlib.pyplot as plt
+    
+    setup_chinese_font()
+    fig, axes = plt.subplots(len(curves), 1, figsize=(10, 6 * len(curves)), squeeze=False)
+    for ax, (label, capacity, steps) in zip(axes[:, 0], curves):
+        steps = sorted(steps, key=lambda step: step["achieved_rps"])
+        ax.plot([step["achieved_rps"] for step in steps], [step["p99"] for step in steps], marker='o', label='P99')
+        ax.plot([step["achieved_rps"] for step in steps], [step["p50"] for step in steps], marker='.', label='P50')
+        for step in steps:
+            if not step["passed"]:
+                ax.plot(step["achieved_rps"], step["p99"], 'rx', markersize=10)
+        ax.axhline(slo_p99, color='red', linestyle='--', label=f'SLO P99 {slo_p99:g} 毫秒')
+        if capacity:
+            ax.axvline(capacity, color='green', linestyle=':', label=f'最大吞吐量 {capacity:.0f} 请求/秒')
+        ax.set_title(f'{label} 吞吐量-延迟曲线')
+        ax.set_xlabel('实际吞吐量 (请求/秒)')
+        ax.set_ylabel('响应时间 (毫秒)')
+        ax.set_yscale('log')
+        ax.legend()
+        ax.grid(True, linestyle='--', alpha=0.7)
+    plt.tight_layout()
+    plt.savefig(output_file)
+    print(f"吞吐量-延迟曲线已保存到: {output_file}")
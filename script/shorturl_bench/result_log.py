@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""逐请求结果日志：测试过程中由后台线程流式写入 JSONL，测试结束后可离线重新统计和画图
+
+写入:
+    with ResultLogWriter("results.jsonl") as log:
+        log.record("create", result)
+
+离线分析（不发送任何请求）:
+    python -m shorturl_bench log results.jsonl --chart chart.png
+"""
+
+import argparse
+import glob
+import gzip
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+from .stats import RequestStats, Timeline
+
+OP_NAMES = {"create": "创建短链接", "get": "获取原始URL"}
+
+
+def _open_log(path, mode):
+    """按扩展名打开普通文本文件或 gzip 文件"""
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def worker_log_path(path, index):
+    """多进程压测时每个进程写自己的分片文件: results.jsonl -> results.part0.jsonl"""
+    if path.endswith('.gz'):
+        root, ext = os.path.splitext(path[:-3])
+        return f"{root}.part{index}{ext}.gz"
+    root, ext = os.path.splitext(path)
+    return f"{root}.part{index}{ext}"
+
+
+def expand_log_paths(paths):
+    """展开日志路径：同时包含主文件和它的所有分片文件"""
+    expanded = []
+    for path in paths:
+        if os.path.exists(path):
+            expanded.append(path)
+        expanded.extend(sorted(glob.glob(worker_log_path(glob.escape(path), '*'))))
+    # 同时传入主文件和分片文件时去重，避免重复统计
+    return list(dict.fromkeys(expanded))
+
+
+def reset_log(path):
+    """测试开始前清空日志文件，并删除上次运行留下的分片文件"""
+    for part in expand_log_paths([path]):
+        os.remove(part)
+    with _open_log(path, 'w'):
+        pass
+
+
+class ResultLogWriter:
+    """把请求结果缓冲后交给后台线程追加写入 JSONL 文件
+
+    record() 只在锁内追加一个元组，序列化和写盘都在后台线程完成；
+    每写完一批就 flush，进程崩溃时最多丢失一个缓冲区（或最近 flush_interval 秒）的数据。
+    """
+
+    def __init__(self, path, buffer_size=1000, flush_interval=1.0):
+        self.path = path
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="result-log-writer", daemon=True)
+        self._thread.start()
+
+    def record(self, op, result):
+        """记录一个请求结果（在请求完成时调用）"""
+        entry = (time.time(), op, result["status"], result.get("code"), result.get("response_time"),
+                 result.get("corrected_response_time"), result.get("short_url"))
+        with self._lock:
+            self._buffer.append(entry)
+            if len(self._buffer) >= self.buffer_size:
+                batch, self._buffer = self._buffer, []
+                self._queue.put(batch)
+
+    def flush(self):
+        """把当前缓冲区交给后台线程"""
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        if batch:
+            self._queue.put(batch)
+
+    def close(self):
+        """写完所有缓冲数据并停止后台线程"""
+        self.flush()
+        self._queue.put(None)
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _run(self):
+        with _open_log(self.path, 'a') as f:
+            while True:
+                try:
+                    batch = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    # 请求速率较低时按时间间隔落盘
+                    self.flush()
+                    continue
+                if batch is None:
+                    return
+                f.write(''.join(self._format(entry) for entry in batch))
+                f.flush()
+
+    @staticmethod
+    def _format(entry):
+        timestamp, op, status, code, latency, corrected, short_url = entry
+        record = {"ts": round(timestamp, 6), "op": op, "status": status}
+        if code is not None:
+            record["code"] = code
+        if latency is not None:
+            record["latency_ms"] = round(latency, 3)
+        if corrected is not None:
+            record["corrected_ms"] = round(corrected, 3)
+        if short_url is not None:
+            record["short_url"] = short_url
+        return json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+def iter_result_log(paths):
+    """逐行读取一个或多个结果日志（含分片文件），不会一次性载入内存"""
+    for path in expand_log_paths(paths):
+        with _open_log(path, 'r') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def summarize_result_log(paths):
+    """从结果日志重建每种操作的统计: {op: {"stats", "start", "end"}}，每秒时间线挂在各操作的 stats.timeline 上"""
+    phases = {}
+    for record in iter_result_log(paths):
+        phase = phases.get(record["op"])
+        if phase is None:
+            phase = phases[record["op"]] = {"stats": RequestStats(), "start": None, "end": None}
+            phase["stats"].timeline = Timeline()
+        latency = record.get("latency_ms", 0.0)
+        result = {"status": record["status"], "response_time": latency}
+        if "corrected_ms" in record:
+            result["corrected_response_time"] = record["corrected_ms"]
+        phase["stats"].add(result)
+        phase["stats"].timeline.record(record["op"], result, now=record["ts"])
+        start = record["ts"] - latency / 1000
+        if phase["start"] is None or start < phase["start"]:
+            phase["start"] = start
+        if phase["end"] is None or record["ts"] > phase["end"]:
+            phase["end"] = record["ts"]
+    return phases
+
+
+def print_summary(phases):
+    """打印与压测脚本相同格式的汇总"""
+    for op, phase in phases.items():
+        stats = phase["stats"]
+        elapsed_time = max(phase["end"] - phase["start"], 1e-9)
+        print(f"\n{OP_NAMES.get(op, op)}:")
+        print(f"总请求数: {stats.total}")
+        print(f"成功请求数: {stats.success}")
+        print(f"错误请求数: {stats.error}")
+        print(f"异常请求数: {stats.exception}")
+        print(f"总耗时: {elapsed_time:.2f} 秒")
+        print(f"平均每秒处理: {stats.total / elapsed_time:.2f} 请求")
+        print(f"平均响应时间: {stats.latency.mean():.2f} 毫秒")
+        for histogram, label in ((stats.latency, "响应时间"), (stats.corrected_latency, "校正后响应时间(从计划发送时间起算)")):
+            if histogram.count:
+                p50, p90, p95, p99 = histogram.percentiles([50, 90, 95, 99])
+                print(f"{label} P50/P90/P95/P99: {p50:.2f} / {p90:.2f} / {p95:.2f} / {p99:.2f} 毫秒")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m shorturl_bench log', description='从逐请求结果日志重新生成汇总和图表（不发送请求）')
+    parser.add_argument('logs', nargs='+', help='结果日志文件 (.jsonl 或 .jsonl.gz)，分片文件会自动包含')
+    parser.add_argument('--chart', help='生成性能图表到指定文件（需要同时包含创建和获取的记录）')
+    args = parser.parse_args(argv)
+
+    phases = summarize_result_log(args.logs)
+    if not phases:
+        print("错误: 日志中没有任何记录")
+        return 1
+    print_summary(phases)
+
+    if args.chart:
+        if "create" not in phases or "get" not in phases:
+            print("错误: 生成图表需要同时包含创建和获取的记录")
+            return 1
+        # 只有需要画图时才导入 matplotlib
+        from .report import generate_performance_chart
+        create_stats, get_stats = phases["create"]["stats"], phases["get"]["stats"]
+        timeline = Timeline().merge(create_stats.timeline).merge(get_stats.timeline)
+        generate_performance_chart(create_stats.latency, get_stats.latency, args.chart, timeline)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,647 @@
+# -*- coding: utf-8 -*-
+"""测试场景：创建、获取、混合读写、端到端、容量搜索和访问日志回放，全部通过 engine.run_sharded_requests 发送请求"""
+
+import concurrent.futures
+import json
+import time
+
+from .client_metrics import client_metrics_report, print_client_metrics
+from .cold_reads import make_cache_cold, run_herd
+from .engine import run_sharded_requests
+from .key_distribution import select_keys
+from .near_cache import counter_delta, near_cache_counters, set_near_cache
+from .propagation import run_propagation_probe
+from .replay import replay_trace, scan_trace, seed_short_codes
+from .report import (histogram_summary, print_capacity_curve, print_duplicate_codes, print_latency_percentiles,
+                     print_phase_breakdown, save_capacity_chart)
+from .server_metrics import print_server_metrics, server_metrics_report
+from .workload import UrlBatches, create_urls
+
+
+def print_phase_server_metrics(config, stats):
+    """打印本阶段的服务端指标（与本阶段客户端每秒 P99 对齐比较）和压测客户端自身的指标"""
+    if config.get("server_metrics") is not None and stats.timeline is not None:
+        print_server_metrics(server_metrics_report(config["server_metrics"], stats.timeline),
+                             {"create": "创建", "get": "获取"})
+    if stats.client is not None:
+        print_client_metrics(client_metrics_report(stats.client))
+
+
+def test_create_performance(config):
+    """测试创建短链接的性能；batch_size 大于 1 时每个请求通过批量接口创建一批短链接，requests 为短链接总数"""
+    num_links = config["requests"]
+    concurrency = config["concurrency"]
+    batch_size = config["batch_size"]
+    
+    # 语料文件通过内存映射读取，分发给多进程时只传递文件路径和范围
+    urls = create_urls(num_links, config["url_corpus"])
+    if batch_size > 1:
+        kind, items = "create_batch", UrlBatches(urls, batch_size)
+        print(f"\n开始测试批量创建短链接性能 ({num_links} 个短链接, 每批 {batch_size} 个, {len(items)} 请求, "
+              f"{concurrency} 并发)...")
+    else:
+        kind, items = "create", urls
+        print(f"\n开始测试创建短链接性能 ({num_links} 请求, {concurrency} 并发)...")
+    num_requests = len(items)
+    start_time = time.time()
+    
+    stats = run_sharded_requests(kind, items, config, "创建短链接")
+    # 速率曲线不够长时只发送了其中一部分请求
+    num_requests = stats.total
+    
+    end_time = time.time()
+    elapsed_time = end_time - (stats.started_at or start_time)
+    
+    print(f"\n创建短链接测试完成:")
+    print(f"总请求数: {num_requests}")
+    print(f"成功请求数: {stats.success}")
+    print(f"错误请求数: {stats.error}")
+    print(f"异常请求数: {stats.exception}")
+    print(f"总耗时: {elapsed_time:.2f} 秒")
+    print(f"平均每秒处理: {num_requests / elapsed_time:.2f} 请求")
+    if batch_size > 1:
+        print(f"创建成功的短链接: {stats.links}, 平均每秒创建: {stats.links / elapsed_time:.2f} 个短链接")
+    print(f"平均响应时间: {stats.latency.mean():.2f} 毫秒")
+    print_latency_percentiles(stats)
+    print_phase_breakdown(stats.phases)
+    print_phase_server_metrics(config, stats)
+    print_duplicate_codes(stats)
+    
+    # 保存成功的短链接以供后续测试
+    successful = [{"status": "success", "short_url": short_url, "original_url": original_url, "created_at": created_at}
+                  for (short_url, original_url), created_at in zip(stats.successful, stats.created_at)]
+    if config["save_urls"] and config["output_file"]:
+        save_results_to_file(successful, config["output_file"])
+        print(f"已保存 {len(successful)} 个短链接到 {config['output_file']}")
+    
+    return successful
+
+
+def test_get_performance(config):
+    """测试获取原始URL的性能"""
+    key_dist = config["key_dist"]
+    keys = []
+    if not key_dist.startswith("list:"):
+        if not config["url_file"]:
+            print("错误: 获取原始URL测试需要提供url文件 (--url-file)")
+            return []
+        
+        short_urls = load_urls_from_file(config["url_file"])
+        if not short_urls:
+            print("错误: 无法从文件加载短链接")
+            return []
+        keys = [url["short_url"] for url in short_urls]
+        config = dict(config, keys_created_at=key_creation_times(short_urls))
+    
+    # sequential 每个短链接只访问一次；其他分布按请求数重复访问
+    num_requests = min(config["requests"], len(keys)) if key_dist == "sequential" else config["requests"]
+    concurrency = config["concurrency"]
+    
+    selected_urls = select_keys(keys, num_requests, key_dist, config["seed"])
+    num_requests = len(selected_urls)
+    if not num_requests:
+        print("错误: 没有可访问的短链接")
+        return []
+    print(f"\n开始测试获取原始URL性能 ({num_requests} 请求, {concurrency} 并发, 键分布 {key_dist})...")
+    start_time = time.time()
+    
+    stats = run_sharded_requests("get", selected_urls, config, "获取原始URL")
+    num_requests = stats.total
+    
+    end_time = time.time()
+    elapsed_time = end_time - (stats.started_at or start_time)
+    
+    print(f"\n获取原始URL测试完成:")
+    print(f"总请求数: {num_requests}")
+    print(f"成功请求数: {stats.success}")
+    print(f"错误请求数: {stats.error}")
+    print(f"异常请求数: {stats.exception}")
+    print(f"总耗时: {elapsed_time:.2f} 秒")
+    print(f"平均每秒处理: {num_requests / elapsed_time:.2f} 请求")
+    print(f"平均响应时间: {stats.latency.mean():.2f} 毫秒")
+    print_latency_percentiles(stats)
+    print_phase_breakdown(stats.phases)
+    print_phase_server_metrics(config, stats)
+    
+    return stats
+
+
+def test_mixed_performance(config):
+    """混合读写测试：读写请求由同一个发生器同时发出，在同一时间窗口内分别统计"""
+    num_requests = config["requests"]
+    concurrency = config["concurrency"]
+    
+    initial_pool = []
+    if config["url_file"]:
+        records = load_urls_from_file(config["url_file"])
+        initial_pool = [url["short_url"] for url in records]
+        config = dict(config, keys_created_at=key_creation_times(records))
+    config = dict(config, initial_pool=initial_pool)
+    
+    print(f"\n开始混合读写测试 ({num_requests} 请求, {concurrency} 并发, 读比例 {config['mix']:.0%}, "
+          f"初始短链接池 {len(initial_pool)})...")
+    start_time = time.time()
+    
+    stats = run_sharded_requests("mixed", range(num_requests), config, "混合读写")
+    
+    end_time = time.time()
+    elapsed_time = end_time - (stats.started_at or start_time)
+    
+    print(f"\n混合读写测试完成:")
+    print(f"总请求数: {stats.total}")
+    print(f"总耗时: {elapsed_time:.2f} 秒")
+    print(f"平均每秒处理: {stats.total / elapsed_time:.2f} 请求")
+    for op, label in (("create", "创建短链接"), ("get", "获取原始URL")):
+        op_stats = stats.by_op.get(op)
+        if op_stats is None:
+            continue
+        print(f"\n{label}:")
+        print(f"请求数: {op_stats.total} (成功 {op_stats.success}, 错误 {op_stats.error}, 异常 {op_stats.exception})")
+        print(f"平均每秒处理: {op_stats.total / elapsed_time:.2f} 请求")
+        print(f"平均响应时间: {op_stats.latency.mean():.2f} 毫秒")
+        print_latency_percentiles(op_stats)
+        print_phase_breakdown(op_stats.phases)
+    print_phase_server_metrics(config, stats)
+    
+    return stats
+
+
+def parse_duration_ms(value):
+    """解析毫秒数，允许带 "ms" 或 "s" 后缀，例如 50ms、0.05s"""
+    value = value.strip().lower()
+    if value.endswith("ms"):
+        return float(value[:-2])
+    if value.endswith("s"):
+        return float(value[:-1]) * 1000
+    return float(value)
+
+
+def run_capacity_step(kind, make_items, rate, config):
+    """以固定到达速率运行一个阶梯，返回该阶梯的测量结果
+
+    前 20% 的秒窗口视为预热不计入；之后的窗口前后两半比较 P99，后半段明显升高说明请求在排队、尚未进入稳态。
+    """
+    duration = config["step_duration"]
+    items = make_items(max(1, int(rate * duration)))
+    stats = run_sharded_requests(kind, items, dict(config, rate=rate, rate_curve=None), f"{rate:.0f} 请求/秒")
+    points = next(iter(stats.timeline.series().values()), [])
+    # 去掉预热窗口和最后一个不完整的窗口
+    steady = points[max(1, int(len(points) * 0.2)):-1] or points
+    half = len(steady) // 2
+    first_p99 = sum(point["p99"] for point in steady[:half]) / half if half else 0.0
+    second_p99 = sum(point["p99"] for point in steady[half:]) / (len(steady) - half) if half else 0.0
+    latency = stats.corrected_latency if stats.corrected_latency.count else stats.latency
+    p50, p99 = latency.percentiles([50, 99])
+    achieved = sum(point["requests"] for point in steady) / len(steady) if steady else 0.0
+    step = {
+        "target_rps": rate,
+        "achieved_rps": achieved,
+        "p50": p50,
+        "p99": p99,
+        "error_rate": (stats.error + stats.exception) / stats.total if stats.total else 1.0,
+        "steady": not half or second_p99 <= max(first_p99 * 1.5, first_p99 + 5.0),
+    }
+    step["passed"] = (step["p99"] <= config["slo_p99"] and step["error_rate"] <= config["slo_error_rate"]
+                      and achieved >= rate * 0.95 and step["steady"])
+    status = "满足" if step["passed"] else "不满足"
+    print(f"  目标 {rate:.0f} 请求/秒: 实际 {achieved:.0f} 请求/秒, P50 {p50:.2f} 毫秒, P99 {p99:.2f} 毫秒, "
+          f"错误率 {step['error_rate']:.2%}, {'稳态' if step['steady'] else '延迟持续上升'} -> {status}")
+    return step, stats
+
+
+def search_capacity(kind, make_items, config, on_stats=None):
+    """先按倍数提高到达速率直到不满足 SLO，再在最后满足与首次不满足之间二分，返回 (最大可持续速率, 各阶梯结果)"""
+    steps = []
+    passed_rate, failed_rate = 0.0, None
+    rate = config["rate"] or 50.0
+    while len(steps) < config["max_steps"]:
+        step, stats = run_capacity_step(kind, make_items, rate, config)
+        steps.append(step)
+        if on_stats:
+            on_stats(stats)
+        if step["passed"]:
+            passed_rate = max(passed_rate, rate)
+        else:
+            failed_rate = rate if failed_rate is None else min(failed_rate, rate)
+        if failed_rate is None:
+            rate *= 2
+        elif failed_rate - passed_rate <= max(passed_rate, 1.0) * config["capacity_tolerance"]:
+            break
+        else:
+            rate = (passed_rate + failed_rate) / 2
+    return passed_rate, steps
+
+
+def capacity_urls(corpus_file):
+    """容量搜索每个阶梯的原始URL：指定语料文件时各阶梯依次取接下来的一段，用完后从头开始；否则每个阶梯重新生成"""
+    if not corpus_file:
+        return create_urls
+    # 语料模块依赖 NumPy，只在读取语料文件时导入
+    from .url_corpus import UrlCorpus
+
+    corpus = UrlCorpus(corpus_file)
+    position = 0
+
+    def make_urls(count):
+        nonlocal position
+        if position and position + count > len(corpus):
+            print("警告: 语料文件中的URL已用完，从头开始重复使用")
+            position = 0
+        urls = corpus[position:position + count]
+        position += len(urls)
+        return urls
+
+    return make_urls
+
+
+def test_capacity(config, test_type):
+    """容量搜索：分别找出创建和获取在满足 P99 与错误率 SLO 时的最大可持续吞吐量"""
+    print(f"\n开始容量搜索 (SLO: P99 <= {config['slo_p99']:g} 毫秒, 错误率 <= {config['slo_error_rate']:.2%}, "
+          f"每个阶梯 {config['step_duration']:g} 秒)...")
+    curves = []
+    keys = []
+    created_at = {}
+    if test_type in ('create', 'both'):
+        print("\n创建短链接:")
+        # 创建成功的短链接及其创建时刻留给获取的容量搜索使用
+        capacity, steps = search_capacity(
+            "create", capacity_urls(config["url_corpus"]), config,
+            lambda stats: created_at.update(stats.creation_times()))
+        keys = list(created_at)
+        curves.append(("创建短链接", capacity, steps))
+        print_capacity_curve("创建短链接", capacity, steps)
+    if test_type in ('get', 'both'):
+        if config["url_file"]:
+            records = load_urls_from_file(config["url_file"])
+            keys = [url["short_url"] for url in records]
+            created_at = key_creation_times(records)
+        config = dict(config, keys_created_at=created_at)
+        if not keys and not config["key_dist"].startswith("list:"):
+            print("错误: 获取容量搜索需要提供url文件 (--url-file)，或与创建一起搜索 (--type both)")
+        else:
+            print("\n获取原始URL:")
+            # sequential 在这里没有意义，按均匀分布重复访问
+            key_dist = "uniform" if config["key_dist"] == "sequential" else config["key_dist"]
+            capacity, steps = search_capacity(
+                "get", lambda count: select_keys(keys, count, key_dist, config["seed"]), config)
+            curves.append(("获取原始URL", capacity, steps))
+            print_capacity_curve("获取原始URL", capacity, steps)
+    if curves and config["capacity_chart"]:
+        save_capacity_chart(curves, config["slo_p99"], config["capacity_chart"])
+    return curves
+
+
+def test_write_propagation(config):
+    """写入传播探测：创建短链接的同时轮询 /short-url/info，测量 Redis -> Kafka -> MySQL 的持久化延迟"""
+    num_requests = config["requests"]
+    rate = f", {config['rate']:g} 请求/秒" if config["rate"] else ""
+    tracked = f", 跟踪每 {config['probe_sample']} 个中的 1 个" if config["probe_sample"] > 1 else ""
+    print(f"\n开始写入传播探测 ({num_requests} 个短链接, {config['concurrency']} 并发{rate}{tracked}, "
+          f"轮询间隔 {config['probe_interval']:g} 秒, 超时 {config['probe_timeout']:g} 秒)...")
+    start_time = time.time()
+    
+    stats, probe = run_propagation_probe(config, create_urls(num_requests, config["url_corpus"]))
+    report = probe.report()
+    
+    print(f"\n写入传播探测完成 (耗时 {time.time() - start_time:.2f} 秒):")
+    print(f"创建成功: {stats.success} (错误 {stats.error}, 异常 {stats.exception})")
+    print(f"创建响应时间 P50/P99: {stats.latency.percentile(50):.2f} / {stats.latency.percentile(99):.2f} 毫秒")
+    print(f"已持久化: {report['durable']}")
+    latency = report["latency"]
+    if report["durable"]:
+        print(f"创建 -> 持久化延迟: 平均 {latency['mean']:.0f} 毫秒, P50 {latency['p50']:.0f}, P90 {latency['p90']:.0f}, "
+              f"P99 {latency['p99']:.0f}, P99.9 {latency['p99.9']:.0f}, 最大 {latency['max']:.0f} 毫秒")
+        print(f"  (精度受轮询周期限制: 间隔 {config['probe_interval']:g} 秒，每轮轮询平均耗时 "
+              f"{report['mean_poll_round_ms']:.0f} 毫秒)")
+    print(f"超时仍未持久化: {report['never_persisted']}")
+    print(f"缓存过期后才持久化: {report['persisted_after_cache_expiry']}")
+    print(f"缓存过期时尚未持久化、读取返回 404 (短链接消失): {report['vanished_after_cache_expiry']}")
+    if report["poll_errors"]:
+        print(f"轮询错误: {report['poll_errors']}")
+    if report["never_persisted"] or report["vanished_after_cache_expiry"]:
+        print(f"警告: 有短链接丢失或在缓存过期后暂时不可读，Kafka 消费者跟不上写入速度 "
+              f"(缓存 TTL {config['cache_ttl']:g} 秒)")
+    
+    if config["output_file"]:
+        report["create_latency"] = histogram_summary(stats.latency)
+        save_results_to_file(report, config["output_file"])
+        print(f"探测结果已保存到 {config['output_file']}")
+    return report
+
+
+def server_consumer_metrics(sampler, started_at, finished_at):
+    """测试期间服务端报告的消费者写入速率和积压: {指标名: {"mean": 平均值, "max": 最大值}}，没有样本的指标省略"""
+    names = ("short_url_persisted_rows_total", "kafka_consumer_fetch_manager_records_lag_max")
+    series = sampler.series(int(started_at), int(finished_at))
+    summary = {}
+    for name in names:
+        present = [value for value in series.get(name, []) if value is not None]
+        if present:
+            summary[name] = {"mean": sum(present) / len(present), "max": max(present)}
+    return summary
+
+
+def test_consumer_throughput(config):
+    """消费者吞吐量测试：尽快创建 requests 个短链接，测量 Kafka 消费者每秒写入 MySQL 的行数和积压
+
+    复用写入传播探测：探测器每秒发现持久化的短链接数即消费者的写入速率，尚未持久化的数量即积压。
+    batch_size 大于 1 时通过批量接口创建，probe_sample 大于 1 时只跟踪部分短链接并按比例放大。
+    指定了 --metrics-endpoint 时同时给出服务端报告的写入速率和 Kafka 消费积压。
+    """
+    num_links = config["requests"]
+    batch_size = config["batch_size"]
+    sample = config["probe_sample"]
+    batch = f", 每批 {batch_size} 个" if batch_size > 1 else ""
+    tracked = f", 跟踪每 {sample} 个中的 1 个" if sample > 1 else ""
+    print(f"\n开始消费者吞吐量测试 ({num_links} 个短链接{batch}, {config['concurrency']} 并发{tracked})...")
+    started_at = time.time()
+    
+    stats, probe = run_propagation_probe(config, create_urls(num_links, config["url_corpus"]))
+    finished_at = time.time()
+    report = probe.throughput(sample)
+    create_seconds = probe.creating_finished_at - probe.started_at
+    
+    print(f"\n消费者吞吐量测试完成 (耗时 {finished_at - started_at:.2f} 秒):")
+    print(f"创建成功: {stats.links} 个短链接 (错误 {stats.error}, 异常 {stats.exception}), "
+          f"{stats.links / create_seconds:.0f} 个/秒")
+    print(f"已持久化: {report['persisted_rows']} 行, 平均 {report['rows_per_second']:.0f} 行/秒, "
+          f"峰值 {report['peak_rows_per_second']} 行/秒")
+    print(f"积压: 创建结束时 {report['backlog_at_create_end']}, 峰值 {report['peak_backlog']}")
+    if report["drain_seconds"] is not None:
+        print(f"创建结束后排空积压用时: {report['drain_seconds']:.1f} 秒")
+    if probe.never_persisted:
+        print(f"超时仍未持久化: {len(probe.never_persisted) * sample}")
+    print(f"  (精度受轮询周期限制: 间隔 {config['probe_interval']:g} 秒，每轮轮询平均耗时 "
+          f"{probe.report()['mean_poll_round_ms']:.0f} 毫秒)")
+    
+    if config.get("server_metrics") is not None:
+        report["server"] = server_consumer_metrics(config["server_metrics"], started_at, finished_at)
+        rows = report["server"].get("short_url_persisted_rows_total")
+        lag = report["server"].get("kafka_consumer_fetch_manager_records_lag_max")
+        if rows:
+            print(f"服务端报告的写入速率: 平均 {rows['mean']:.0f} 行/秒, 峰值 {rows['max']:.0f} 行/秒")
+        if lag:
+            print(f"服务端报告的 Kafka 消费积压: 最大 {lag['max']:.0f} 条")
+    
+    if config["output_file"]:
+        report["create"] = {"links": stats.links, "links_per_second": stats.links / create_seconds,
+                            **histogram_summary(stats.latency)}
+        report["propagation"] = probe.report()
+        save_results_to_file(report, config["output_file"])
+        print(f"测试结果已保存到 {config['output_file']}")
+    return report
+
+
+def test_replay(config):
+    """回放访问日志：先为日志中读取过的短码预先创建短链接，再按原始时间点（除以 replay_speed）发送，
+    与日志中记录的响应时间比较"""
+    filename = config["replay_file"]
+    speed = config["replay_speed"]
+    print(f"\n扫描访问日志 {filename}...")
+    scan = scan_trace(filename)
+    counts = scan["counts"]
+    total = sum(counts.values())
+    if not total:
+        print("错误: 日志中没有可回放的创建或获取请求")
+        return None
+    duration = scan["last"] - scan["first"]
+    print(f"可回放请求: {total} (创建 {counts.get('create', 0)}, 获取 {counts.get('get', 0)}), "
+          f"原始时长 {duration:.1f} 秒, 读取过的不同短码 {len(scan['codes'])} 个")
+
+    code_map = seed_short_codes(scan["codes"], config)
+    unmapped = len(scan["codes"]) - len(code_map)
+    if unmapped and not code_map:
+        print(f"错误: {len(scan['codes'])} 个短码的短链接全部创建失败，无法回放")
+        return None
+    if unmapped:
+        print(f"警告: 有 {unmapped} / {len(scan['codes'])} 个短码没能创建短链接，"
+              f"回放时对它们的读取会返回 404，获取的错误数会偏高")
+
+    print(f"\n开始回放 (速度 {speed:g}x, 预计 {duration / speed:.1f} 秒, {config['concurrency']} 并发)...")
+    stats, logged = replay_trace(filename, code_map, config, scan["first"], total)
+    elapsed_time = time.time() - stats.started_at
+
+    print(f"\n回放完成 (耗时 {elapsed_time:.2f} 秒, 原始时长按速度换算为 {duration / speed:.2f} 秒):")
+    report = {"file": filename, "speed": speed, "original_duration": duration, "elapsed_time": elapsed_time,
+              "seeded_codes": len(code_map), "unmapped_codes": unmapped, "operations": {}}
+    for op, label in (("create", "创建短链接"), ("get", "获取原始URL")):
+        op_stats = stats.by_op.get(op)
+        if op_stats is None:
+            continue
+        print(f"\n{label}:")
+        print(f"请求数: {op_stats.total} (成功 {op_stats.success}, 错误 {op_stats.error}, 异常 {op_stats.exception})")
+        print_latency_percentiles(op_stats)
+        report["operations"][op] = {"requests": op_stats.total, "successful_requests": op_stats.success,
+                                    "replayed": histogram_summary(op_stats.latency),
+                                    "corrected": histogram_summary(op_stats.corrected_latency)}
+        if op in logged:
+            report["operations"][op]["logged"] = histogram_summary(logged[op])
+
+    compared = [(op, label) for op, label in (("create", "创建"), ("get", "获取")) if op in logged and op in stats.by_op]
+    if compared:
+        print("\n回放与日志记录的响应时间 (毫秒，均为成功请求；日志为 nginx 的 $request_time，精度 1 毫秒):")
+        print(f"{'操作':<8}{'':>4}{'P50':>10}{'P90':>10}{'P99':>10}{'最大':>10}")
+        for op, label in compared:
+            for source, histogram in (("日志", logged[op]), ("回放", stats.by_op[op].latency)):
+                p50, p90, p99 = histogram.percentiles([50, 90, 99])
+                print(f"{label:<8}{source:>4}{p50:>10.2f}{p90:>10.2f}{p99:>10.2f}{histogram.max:>10.2f}")
+            logged_p99 = logged[op].percentile(99)
+            if logged_p99 > 0:
+                print(f"{'':<8}P99 变化 {stats.by_op[op].latency.percentile(99) / logged_p99 - 1:+.1%}")
+    print_phase_server_metrics(config, stats)
+
+    if config["output_file"]:
+        save_results_to_file(report, config["output_file"])
+        print(f"回放结果已保存到 {config['output_file']}")
+    return report
+
+
+def print_read_pass(label, stats, elapsed_time):
+    """冷读/热读测试中一轮读取的结果"""
+    print(f"\n{label}: {stats.total} 请求 (成功 {stats.success}, 错误 {stats.error}, 异常 {stats.exception}), "
+          f"{stats.total / elapsed_time:.2f} 请求/秒, 平均响应时间 {stats.latency.mean():.2f} 毫秒")
+    p50, p90, p99, p999 = stats.latency.percentiles([50, 90, 99, 99.9])
+    print(f"  P50/P90/P99/P99.9: {p50:.2f} / {p90:.2f} / {p99:.2f} / {p999:.2f} 毫秒, 最大 {stats.latency.max:.2f} 毫秒")
+
+
+def test_cold_warm_reads(config):
+    """冷读与热读：创建一组短链接并让缓存失效，分别测量第一次读取（查 MySQL）和之后的重复读取（命中 Redis）
+
+    herd_clients 大于 0 时再做惊群测试：缓存再次失效后，herd_clients 个客户端同时读取同一个键。
+    没有创建成功的短链接或无法清空缓存时返回 None。
+    """
+    num_keys = config["requests"]
+    concurrency = config["concurrency"]
+    print(f"\n开始冷读/热读测试 ({num_keys} 个短链接, {concurrency} 并发, 每个键热读 {config['warm_reads']} 次)...")
+    # 先清空一次，确认 --cache-flush 可用，而不是在创建完所有短链接之后才发现地址或命令有误
+    if config.get("cache_flush") and not make_cache_cold(config):
+        return None
+    
+    created = run_sharded_requests("create", create_urls(num_keys, config["url_corpus"]), config, "创建短链接")
+    keys = [short_url for short_url, _ in created.successful]
+    if not keys:
+        print("错误: 没有创建成功的短链接")
+        return None
+    print(f"已创建 {len(keys)} 个短链接")
+    
+    if not make_cache_cold(config):
+        return None
+    # 第一次读取：缓存已失效，全部查询数据库并回填
+    start_time = cold_start = time.time()
+    cold = run_sharded_requests("get", keys, config, "冷读")
+    print_read_pass("冷读 (第一次读取, 查 MySQL)", cold, time.time() - (cold.started_at or start_time))
+    # 重复读取：刚回填的缓存在 TTL 内都会命中
+    start_time = time.time()
+    # 每个键在冷读阶段开始之后才被回填，以冷读开始时刻为准不会高估命中
+    warm = run_sharded_requests("get", keys * config["warm_reads"], dict(config, keys_cached_at=cold_start), "热读")
+    print_read_pass("热读 (重复读取, 命中 Redis)", warm, time.time() - (warm.started_at or start_time))
+    if warm.latency.count and cold.latency.count:
+        print(f"\n冷读/热读 P50 比值: {cold.latency.percentile(50) / max(warm.latency.percentile(50), 0.001):.1f} 倍, "
+              f"P99 比值: {cold.latency.percentile(99) / max(warm.latency.percentile(99), 0.001):.1f} 倍")
+    
+    results = {"keys": len(keys), "cold": histogram_summary(cold.latency), "warm": histogram_summary(warm.latency)}
+    if config["herd_clients"] > 0:
+        results["herd"] = test_thundering_herd(config, keys[:config["herd_keys"]], warm)
+        if results["herd"] is None:
+            return None
+    
+    if config["output_file"]:
+        save_results_to_file(results, config["output_file"])
+        print(f"冷读/热读结果已保存到 {config['output_file']}")
+    return results
+
+
+def test_thundering_herd(config, keys, warm):
+    """惊群：每个键的缓存失效后，herd_clients 个客户端在同一时刻读取它；无法让缓存失效时返回 None"""
+    clients = config["herd_clients"]
+    if not keys:
+        print("\n惊群测试: 没有可用的键，跳过")
+        return {"clients": clients, "keys": 0, "failures": 0}
+    print(f"\n惊群测试: {len(keys)} 个键, 每个键 {clients} 个客户端同时读取")
+    if not make_cache_cold(config):
+        return None
+    herd = None
+    failures = 0
+    with concurrent.futures.ThreadPoolExecutor(max_workers=clients) as executor:
+        # 先用一个不存在的键让每个线程建立好长连接，放行后的请求不包含建连时间
+        run_herd(executor, clients, "herd-warmup", config["base_url"])
+        for key in keys:
+            histogram, key_failures = run_herd(executor, clients, key, config["base_url"], config["verbose"])
+            failures += key_failures
+            if herd is None:
+                herd = histogram
+            else:
+                herd.merge(histogram)
+    if not herd.count:
+        print(f"惊群请求全部失败 ({failures} 个)")
+        return {"clients": clients, "keys": len(keys), "failures": failures}
+    p50, p99 = herd.percentiles([50, 99])
+    print(f"惊群请求: {herd.count} 成功, {failures} 失败, P50 {p50:.2f} 毫秒, P99 {p99:.2f} 毫秒, 最大 {herd.max:.2f} 毫秒")
+    if warm.latency.count:
+        print(f"  相对热读 P99 ({warm.latency.percentile(99):.2f} 毫秒) 的倍数: "
+              f"{p99 / max(warm.latency.percentile(99), 0.001):.1f}")
+    return {"clients": clients, "keys": len(keys), "failures": failures, **histogram_summary(herd)}
+
+
+def relative_change(new, old):
+    """相对变化的百分比文本；基准为 0（例如全部请求失败）时无法计算"""
+    return f"{(new - old) / old:+.1%}" if old else "无法计算"
+
+
+def test_near_cache(config):
+    """近端缓存对比：同一组偏斜的读取序列，分别在近端缓存关闭和开启时运行，比较吞吐量和 P99"""
+    endpoints = config["near_cache_endpoints"]
+    # sequential 每个键只读一次，近端缓存不会命中，默认改用 Zipf 分布
+    key_dist = "zipf:1.1" if config["key_dist"] == "sequential" else config["key_dist"]
+    if config["url_file"]:
+        keys = [url["short_url"] for url in load_urls_from_file(config["url_file"])]
+    else:
+        num_keys = max(100, config["requests"] // 10)
+        print(f"\n创建 {num_keys} 个短链接作为读取的键...")
+        created = run_sharded_requests("create", create_urls(num_keys, config["url_corpus"]), config, "创建短链接")
+        keys = [short_url for short_url, _ in created.successful]
+    if not keys:
+        print("错误: 没有可读取的短链接")
+        return None
+    # 两轮使用同一个种子，读取序列完全相同
+    selected = select_keys(keys, config["requests"], key_dist, config["seed"] if config["seed"] is not None else 0)
+    print(f"\n开始近端缓存对比 ({len(selected)} 请求, {len(keys)} 个键, 键分布 {key_dist}, "
+          f"{config['concurrency']} 并发, {len(endpoints)} 个实例)...")
+    
+    runs = {}
+    for enabled, label in ((False, "近端缓存关闭"), (True, "近端缓存开启")):
+        set_near_cache(endpoints, enabled)
+        before = near_cache_counters(endpoints)
+        start_time = time.time()
+        stats = run_sharded_requests("get", selected, config, label)
+        elapsed_time = time.time() - (stats.started_at or start_time)
+        delta = counter_delta(before, near_cache_counters(endpoints))
+        p50, p99 = stats.latency.percentiles([50, 99])
+        runs["on" if enabled else "off"] = {
+            "throughput": stats.total / elapsed_time, "p50": p50, "p99": p99,
+            "error_rate": (stats.error + stats.exception) / stats.total if stats.total else 0.0,
+            "near_cache": delta, **histogram_summary(stats.latency)
+        }
+        print(f"\n{label}: {stats.total / elapsed_time:.2f} 请求/秒, P50 {p50:.2f} 毫秒, P99 {p99:.2f} 毫秒, "
+              f"错误 {stats.error + stats.exception}, 近端缓存命中率 {delta['hit_ratio']:.1%} "
+              f"(命中 {delta['hits']}, 未命中 {delta['misses']}, 淘汰 {delta['evictions']})")
+    
+    off, on = runs["off"], runs["on"]
+    print("\n开启近端缓存后的变化:")
+    print(f"  吞吐量: {off['throughput']:.2f} -> {on['throughput']:.2f} 请求/秒 "
+          f"({relative_change(on['throughput'], off['throughput'])})")
+    print(f"  P99: {off['p99']:.2f} -> {on['p99']:.2f} 毫秒 ({relative_change(on['p99'], off['p99'])})")
+    
+    if config["output_file"]:
+        save_results_to_file({"key_distribution": key_dist, "keys": len(keys), "requests": len(selected), **runs},
+                             config["output_file"])
+        print(f"近端缓存对比结果已保存到 {config['output_file']}")
+    return runs
+
+
+def run_end_to_end_test(config):
+    """运行端到端测试：先创建短链接，再获取原始URL"""
+    print("=" * 50)
+    print("开始短链接服务端到端性能测试")
+    print("=" * 50)
+    
+    # 测试创建短链接性能
+    temp_file = f"temp_urls_{int(time.time())}.json"
+    create_config = config.copy()
+    create_config["save_urls"] = True
+    create_config["output_file"] = temp_file
+    
+    test_create_performance(create_config)
+    
+    # 测试获取原始URL性能
+    get_config = config.copy()
+    get_config["url_file"] = temp_file
+    test_get_performance(get_config)
+    
+    print("=" * 50)
+    print("端到端性能测试完成")
+    print("=" * 50)
+
+
+def save_results_to_file(results, filename):
+    """保存测试结果到文件"""
+    try:
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, separators=(',', ':'))
+    except Exception as e:
+        print(f"保存结果失败: {e}")
+
+
+def key_creation_times(records):
+    """url文件中各短链接的创建时刻 {短链接: Unix 秒}；旧文件没有记录创建时刻，这些键首次访问按未命中计"""
+    return {url["short_url"]: url["created_at"] for url in records if "created_at" in url}
+
+
+def load_urls_from_file(filename):
+    """从文件加载URL"""
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"加载URL失败: {e}")
+        return []
@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""压测过程中抓取服务端 Actuator 的 Prometheus 指标，按秒与客户端时间线对齐
+
+application.yml 在 8081 端口暴露 /actuator/prometheus，其中包含 Hikari 连接池、Tomcat 线程、
+Lettuce、Kafka 生产者和消费者的指标。后台线程按固定间隔抓取一个或多个实例（app1..appN），
+边读取响应边逐行解析，只保留关心的指标；同名指标的多个标签组合和多个实例合并为一个值。
+
+    sampler = MetricsSampler(["http://localhost:8081/actuator/prometheus"]).start()
+    ...  # 压测
+    sampler.stop()
+    report = server_metrics_report(sampler, stats.timeline)
+"""
+
+import bisect
+import math
+import threading
+import time
+import urllib.error
+import urllib.request
+
+# 默认抓取的指标: Prometheus 指标名 -> 显示名称
+DEFAULT_METRICS = {
+    "hikaricp_connections_pending": "Hikari 等待连接数",
+    "hikaricp_connections_active": "Hikari 活跃连接数",
+    "tomcat_threads_busy_threads": "Tomcat 忙碌线程数",
+    "tomcat_threads_current_threads": "Tomcat 当前线程数",
+    "lettuce_command_completion_seconds_max": "Lettuce 命令最大耗时(秒)",
+    "kafka_producer_record_send_rate": "Kafka 发送速率(条/秒)",
+    "kafka_producer_request_latency_avg": "Kafka 请求平均延迟(毫秒)",
+    "short_url_persisted_rows_total": "消费者写入 MySQL (行/秒)",
+    "kafka_consumer_fetch_manager_records_lag_max": "Kafka 消费积压(条，各分区最大)",
+}
+
+# 以这些后缀结尾的指标取各实例、各标签组合中的最大值，其余指标求和
+MAX_SUFFIXES = ("_max", "_avg")
+# 以这些后缀结尾的是累计计数器，转换为相邻两次抓取之间的每秒增量
+RATE_SUFFIXES = ("_total", "_count")
+
+
+def parse_prometheus_line(line):
+    """解析 Prometheus 文本格式的一行，返回 (指标名, 标签字符串, 值)；注释和空行返回 None"""
+    line = line.strip()
+    if not line or line.startswith('#'):
+        return None
+    if '{' in line:
+        name, _, rest = line.partition('{')
+        labels, _, rest = rest.rpartition('}')
+    else:
+        name, _, rest = line.partition(' ')
+        labels = ""
+    # 值后面可能还有可选的时间戳
+    value = rest.split()[0]
+    return name.strip(), labels, float(value)
+
+
+def parse_prometheus_text(lines, names=None):
+    """逐行解析指标文本，只保留 names 中的指标，按 MAX_SUFFIXES 规则合并不同标签组合: {指标名: 值}"""
+    values = {}
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', 'replace')
+        # 按前缀过滤，大部分行不需要完整解析
+        if names is not None and not line.startswith(names):
+            continue
+        parsed = parse_prometheus_line(line)
+        if parsed is None:
+            continue
+        name, _, value = parsed
+        if names is not None and name not in names or math.isnan(value):
+            continue
+        if name not in values:
+            values[name] = value
+        elif name.endswith(MAX_SUFFIXES):
+            values[name] = max(values[name], value)
+        else:
+            values[name] += value
+    return values
+
+
+class MetricsSampler:
+    """后台线程按间隔抓取各端点的指标，每个端点保留 [(抓取时间, {指标名: 值})] 序列"""
+
+    def __init__(self, endpoints, interval=1.0, metrics=None, timeout=None):
+        self.endpoints = list(endpoints)
+        self.interval = interval
+        self.metrics = dict(metrics or DEFAULT_METRICS)
+        self.timeout = timeout if timeout is not None else max(interval, 1.0)
+        self.samples = {endpoint: [] for endpoint in self.endpoints}
+        self.errors = {endpoint: 0 for endpoint in self.endpoints}
+        self.last_error = None
+        self._names = tuple(self.metrics)
+        self._previous = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def scrape(self, endpoint):
+        """抓取一个端点：边读取响应边解析，不把整个响应读入内存"""
+        with urllib.request.urlopen(endpoint, timeout=self.timeout) as response:
+            values = parse_prometheus_text(response, self._names)
+        now = time.time()
+        # 累计计数器换算成每秒增量，第一次抓取只记录基准值
+        previous_time, previous = self._previous.get(endpoint, (None, {}))
+        self._previous[endpoint] = (now, values)
+        sample = {}
+        for name, value in values.items():
+            if not name.endswith(RATE_SUFFIXES):
+                sample[name] = value
+            elif name in previous and now > previous_time:
+                sample[name] = max(0.0, value - previous[name]) / (now - previous_time)
+        with self._lock:
+            self.samples[endpoint].append((now, sample))
+
+    def _run(self):
+        # 对齐到整秒附近抓取，与按秒聚合的客户端时间线保持一致
+        while not self._stopped.wait(self.interval - time.time() % self.interval):
+            for endpoint in self.endpoints:
+                try:
+                    self.scrape(endpoint)
+                except urllib.error.HTTPError as e:
+                    self.errors[endpoint] += 1
+                    self.last_error = f"{endpoint}: {e}"
+                    if e.code == 404:
+                        # 服务端缺少 micrometer-registry-prometheus 时 Actuator 不提供该端点
+                        self.last_error += " (服务端是否引入了 micrometer-registry-prometheus 依赖?)"
+                except (OSError, ValueError) as e:
+                    self.errors[endpoint] += 1
+                    self.last_error = f"{endpoint}: {e}"
+
+    def series(self, first_second, last_second):
+        """按秒对齐: {指标名: [值或 None]}，每秒取该秒结束前最近一次抓取的值，多个端点合并
+
+        超过 3 个抓取间隔没有新样本的端点视为缺失，不沿用旧值。
+        """
+        stale = max(3 * self.interval, 2.0)
+        with self._lock:
+            samples = {endpoint: list(points) for endpoint, points in self.samples.items()}
+        result = {name: [] for name in self.metrics}
+        times = {endpoint: [t for t, _ in points] for endpoint, points in samples.items()}
+        for second in range(first_second, last_second + 1):
+            merged = {}
+            for endpoint, points in samples.items():
+                index = bisect.bisect_right(times[endpoint], second + 1) - 1
+                if index < 0 or second + 1 - points[index][0] > stale:
+                    continue
+                for name, value in points[index][1].items():
+                    if name not in merged:
+                        merged[name] = value
+                    elif name.endswith(MAX_SUFFIXES):
+                        merged[name] = max(merged[name], value)
+                    else:
+                        merged[name] += value
+            for name in self.metrics:
+                result[name].append(merged.get(name))
+        return result
+
+
+def correlation(xs, ys):
+    """两个序列的皮尔逊相关系数，忽略任一侧缺失的点；点数不足或没有波动时返回 None"""
+    pairs = [(x, y) for x, y in zip(xs, ys) if x is not None and y is not None]
+    if len(pairs) < 3:
+        return None
+    mean_x = sum(x for x, _ in pairs) / len(pairs)
+    mean_y = sum(y for _, y in pairs) / len(pairs)
+    cov = sum((x - mean_x) * (y - mean_y) for x, y in pairs)
+    var_x = sum((x - mean_x) ** 2 for x, _ in pairs)
+    var_y = sum((y - mean_y) ** 2 for _, y in pairs)
+    if var_x <= 0 or var_y <= 0:
+        return None
+    return cov / math.sqrt(var_x * var_y)
+
+
+def server_metrics_report(sampler, timeline):
+    """把服务端指标对齐到客户端时间线（与 Timeline.series() 使用同样的秒和相对时间 t）
+
+    返回可写入 JSON 的字典: 每秒序列、各指标的平均值/最大值，以及与各操作每秒 P99 的相关系数。
+    """
+    client = timeline.series() if timeline is not None else {}
+    points = next(iter(client.values()), [])
+    if not points:
+        return {"endpoints": sampler.endpoints, "interval": sampler.interval, "scrape_errors": dict(sampler.errors),
+                "last_error": sampler.last_error, "series": {}, "summary": {}}
+    start, end = points[0]["timestamp"], points[-1]["timestamp"]
+    aligned = sampler.series(start, end)
+    # 没有成功请求的秒不参与相关性计算
+    client_p99 = {op: [point["p99"] if point["requests"] > point["errors"] else None for point in op_points]
+                  for op, op_points in client.items()}
+    series = {}
+    summary = {}
+    for name, values in aligned.items():
+        present = [value for value in values if value is not None]
+        if not present:
+            continue
+        series[name] = [{"t": second - start, "timestamp": second, "value": value}
+                        for second, value in zip(range(start, end + 1), values)]
+        summary[name] = {
+            "label": sampler.metrics[name],
+            "mean": sum(present) / len(present),
+            "max": max(present),
+            "correlation_p99": {op: correlation(values, p99) for op, p99 in client_p99.items()}
+        }
+    return {
+        "endpoints": sampler.endpoints,
+        "interval": sampler.interval,
+        "scrape_errors": dict(sampler.errors),
+        "last_error": sampler.last_error,
+        "series": series,
+        "summary": summary
+    }
+
+
+def print_server_metrics(report, op_names=None):
+    """打印服务端指标摘要，相关系数接近 1 的指标与客户端 P99 同步升降，多半是瓶颈所在"""
+    op_names = op_names or {}
+    errors = sum(report.get("scrape_errors", {}).values())
+    if not report["summary"]:
+        print(f"服务端指标: 没有抓取到数据 (端点 {', '.join(report['endpoints'])}, 失败 {errors} 次)")
+        if report.get("last_error"):
+            print(f"  最近一次错误: {report['last_error']}")
+        return
+    print(f"服务端指标 ({len(report['endpoints'])} 个端点, 每 {report['interval']:g} 秒抓取, 失败 {errors} 次):")
+    for name, item in report["summary"].items():
+        correlations = ", ".join(
+            f"{op_names.get(op, op)} P99 相关 {value:+.2f}" if value is not None else f"{op_names.get(op, op)} P99 相关 -"
+            for op, value in item["correlation_p99"].items())
+        print(f"  {item['label']:<24} 平均 {item['mean']:>10.2f}  最大 {item['max']:>10.2f}  {correlations}")
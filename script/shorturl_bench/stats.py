@@ -0,0 +1,539 @@
+# -*- coding: utf-8 -*-
+"""固定内存的延迟统计：HDR 风格的对数分桶直方图、按状态计数的请求汇总，以及按秒聚合的时间线
+
+另有创建阶段用来检查重复短码的紧凑集合 ShortCodeSet。
+"""
+
+import base64
+import hashlib
+import math
+import sys
+import threading
+import time
+import zlib
+from array import array
+
+
+class LatencyHistogram:
+    """对数分桶延迟直方图
+
+    以微秒为单位记录样本。小于 2^sub_bucket_bits 微秒的值精确记录，
+    更大的值在每个 2 的幂区间内再线性切成 2^(sub_bucket_bits-1) 个子桶，
+    相对误差不超过 1/2^(sub_bucket_bits-1)（默认约 0.8%）。
+    内存只取决于可记录的最大值，与样本数量无关；记录一个样本是 O(1)。
+    本身不加锁，多线程时每个线程各用一个，最后再合并。
+    """
+
+    def __init__(self, sub_bucket_bits=8, max_value_ms=3600 * 1000):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.max_value_ms = max_value_ms
+        self._max_us = int(max_value_ms * 1000)
+        self.counts = array('Q', bytes(8 * (self._index(self._max_us) + 1)))
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def _index(self, value_us):
+        """微秒值 -> 桶下标"""
+        bits = self.sub_bucket_bits
+        if value_us < (1 << bits):
+            return value_us
+        shift = value_us.bit_length() - bits
+        return (shift << (bits - 1)) + (value_us >> shift)
+
+    def _bounds(self, index):
+        """桶下标 -> [下界, 上界) 微秒"""
+        bits = self.sub_bucket_bits
+        if index < (1 << bits):
+            return index, index + 1
+        shift = (index >> (bits - 1)) - 1
+        low = (index - (shift << (bits - 1))) << shift
+        return low, low + (1 << shift)
+
+    def record(self, value_ms):
+        """记录一个延迟样本（毫秒），超过上限的值计入最后一个桶"""
+        value_us = min(int(value_ms * 1000), self._max_us) if value_ms > 0 else 0
+        self.counts[self._index(value_us)] += 1
+        self.count += 1
+        self.total += value_ms
+        if self.min is None or value_ms < self.min:
+            self.min = value_ms
+        if self.max is None or value_ms > self.max:
+            self.max = value_ms
+
+    def merge(self, other):
+        """把另一个直方图的样本合并进来（两者的分桶参数必须一致）"""
+        if (other.sub_bucket_bits, other.max_value_ms) != (self.sub_bucket_bits, self.max_value_ms):
+            raise ValueError("无法合并分桶参数不同的直方图")
+        counts = self.counts
+        for index, count in enumerate(other.counts):
+            if count:
+                counts[index] += count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max = other.max
+        return self
+
+    def mean(self):
+        """平均值（毫秒），使用精确累加和"""
+        return self.total / self.count if self.count else 0.0
+
+    def percentiles(self, ps):
+        """一次遍历计算多个百分位数（毫秒），返回与 ps 顺序一致的列表"""
+        if not self.count:
+            return [0.0 for _ in ps]
+        targets = sorted((max(1, math.ceil(self.count * p / 100)), i) for i, p in enumerate(ps))
+        values = [0.0] * len(ps)
+        running = 0
+        position = 0
+        for index, count in enumerate(self.counts):
+            if not count:
+                continue
+            running += count
+            while position < len(targets) and running >= targets[position][0]:
+                low, high = self._bounds(index)
+                value = (low + high - 1) / 2 / 1000
+                values[targets[position][1]] = min(max(value, self.min), self.max)
+                position += 1
+            if position == len(targets):
+                break
+        return values
+
+    def percentile(self, p):
+        """单个百分位数（毫秒）"""
+        return self.percentiles([p])[0]
+
+    def buckets(self):
+        """按升序返回所有非空桶: (下界毫秒, 上界毫秒, 样本数)"""
+        for index, count in enumerate(self.counts):
+            if count:
+                low, high = self._bounds(index)
+                yield low / 1000, high / 1000, count
+
+    def to_dict(self):
+        """序列化为可写入 JSON 的字典，桶计数压缩后用 base64 编码"""
+        counts = array('Q', self.counts)
+        if sys.byteorder == 'big':
+            counts.byteswap()
+        return {
+            "sub_bucket_bits": self.sub_bucket_bits,
+            "max_value_ms": self.max_value_ms,
+            "count": self.count,
+            "total": self.total,
+            "min": self.min,
+            "max": self.max,
+            "counts": base64.b64encode(zlib.compress(counts.tobytes())).decode('ascii')
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """从 to_dict 的结果还原直方图"""
+        histogram = cls(data["sub_bucket_bits"], data["max_value_ms"])
+        counts = array('Q')
+        counts.frombytes(zlib.decompress(base64.b64decode(data["counts"])))
+        if sys.byteorder == 'big':
+            counts.byteswap()
+        histogram.counts = counts
+        histogram.count = data["count"]
+        histogram.total = data["total"]
+        histogram.min = data["min"]
+        histogram.max = data["max"]
+        return histogram
+
+
+BASE62 = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+_BASE62_INDEX = {c: i for i, c in enumerate(BASE62)}
+# 不超过 10 个 base62 字符的短码按 (长度, 数值) 一一映射到 [0, 2^63)，每种长度占一段连续的区间
+_MAX_CODE_LENGTH = 10
+_LENGTH_OFFSETS = [sum(62 ** i for i in range(length)) for length in range(_MAX_CODE_LENGTH + 2)]
+_HASHED = 1 << 63
+
+
+def code_key(code):
+    """把短码转换成 64 位整数；更长或含其他字符的短码退化为 63 位哈希（高位置 1，与前者不会冲突）"""
+    if len(code) <= _MAX_CODE_LENGTH:
+        value = 0
+        for char in code:
+            digit = _BASE62_INDEX.get(char)
+            if digit is None:
+                break
+            value = value * 62 + digit
+        else:
+            return _LENGTH_OFFSETS[len(code)] + value
+    return _HASHED | int.from_bytes(hashlib.blake2b(code.encode(), digest_size=8).digest(), 'big') >> 1
+
+
+def key_code(key):
+    """code_key 的逆变换；哈希得到的键无法还原，返回 "#十六进制" 形式"""
+    if key & _HASHED:
+        return f"#{key & ~_HASHED:016x}"
+    length = next(n for n in range(_MAX_CODE_LENGTH + 1) if key < _LENGTH_OFFSETS[n + 1])
+    value = key - _LENGTH_OFFSETS[length]
+    chars = []
+    for _ in range(length):
+        value, digit = divmod(value, 62)
+        chars.append(BASE62[digit])
+    return "".join(reversed(chars))
+
+
+class ShortCodeSet:
+    """创建阶段收到的全部短码，用于检查服务端是否返回了重复的短码
+
+    每个短码精确地存为 8 字节整数（见 code_key），先追加到 array 缓冲区，攒满后排序成一段；
+    统计重复时把所有段合并排序一次。1 亿个短码约占 800MB，分段排序在 NumPy 中进行；
+    短码不超过一个缓冲区（RUN_SIZE 个）时直接用集合统计，不加载 NumPy。
+    可以在线程和进程之间合并。
+    """
+
+    RUN_SIZE = 1 << 20
+
+    def __init__(self):
+        self.count = 0
+        self._buffer = array('Q')
+        self._runs = []
+
+    def add(self, code):
+        self._buffer.append(code_key(code))
+        self.count += 1
+        if len(self._buffer) >= self.RUN_SIZE:
+            self._seal()
+
+    def _seal(self):
+        """把缓冲区排序后存为一段"""
+        import numpy as np
+
+        if self._buffer:
+            run = np.frombuffer(self._buffer, dtype=np.uint64).copy()
+            run.sort()
+            self._runs.append(run)
+            self._buffer = array('Q')
+
+    def merge(self, other):
+        self._runs.extend(other._runs)
+        self._buffer.extend(other._buffer)
+        self.count += other.count
+        if len(self._buffer) >= self.RUN_SIZE:
+            self._seal()
+        return self
+
+    def duplicates(self, sample=10):
+        """返回 (重复次数, 重复短码样本)；重复次数为多出来的短码个数，即 总数 - 不同短码数"""
+        if not self._runs:
+            seen = set()
+            repeated = set()
+            for key in self._buffer:
+                if key in seen:
+                    repeated.add(key)
+                seen.add(key)
+            return len(self._buffer) - len(seen), [key_code(key) for key in sorted(repeated)[:sample]]
+
+        import numpy as np
+
+        self._seal()
+        if not self._runs:
+            return 0, []
+        if len(self._runs) > 1:
+            merged = np.concatenate(self._runs)
+            merged.sort()
+            self._runs = [merged]
+        keys = self._runs[0]
+        repeated = keys[1:][keys[1:] == keys[:-1]]
+        return int(repeated.size), [key_code(int(key)) for key in np.unique(repeated)[:sample]]
+
+
+class RequestStats:
+    """一批请求的汇总结果：按状态计数、成功请求的延迟直方图，以及可选保留的成功短链接
+
+    classifier 是可选的回调，接收成功的结果字典并返回分组名（如推测的缓存命中/未命中），
+    每个分组单独记录一个延迟直方图。classifier 只在当前进程内使用，不随对象序列化。
+    结果字典带有 "phases"（分阶段计时客户端的 {阶段: 毫秒}）时，每个阶段也单独记录一个直方图。
+    """
+
+    def __init__(self, keep_successful=False, classifier=None):
+        self.success = 0
+        self.error = 0
+        self.exception = 0
+        # 成功请求中创建或读取的短链接数，批量创建时一个请求对应多个短链接
+        self.links = 0
+        self.latency = LatencyHistogram()
+        # 开环模式下从计划发送时间起算的响应时间
+        self.corrected_latency = LatencyHistogram()
+        self.keep_successful = keep_successful
+        # (短链接, 原始URL) 列表，供后续获取测试使用
+        self.successful = []
+        # 与 successful 一一对应的创建请求发送时刻（Unix 秒），服务端在这之后才把短链接写入 Redis
+        self.created_at = array('d') if keep_successful else None
+        # 保留成功短链接（创建阶段）时同时记录所有短码，用于检查重复
+        self.codes = ShortCodeSet() if keep_successful else None
+        self.classifier = classifier
+        self.groups = {}
+        # 阶段 -> 延迟直方图（连接、首字节等待等）
+        self.phases = {}
+        # 每秒时间线（由压测引擎在进程级别记录后挂到最终结果上）
+        self.timeline = None
+        # 压测客户端自身的指标（ClientMetrics），同样由压测引擎在进程级别记录
+        self.client = None
+        # 分布式压测时各代理统一的开始时间（Unix 秒），吞吐量从该时刻算起
+        self.started_at = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["classifier"] = None
+        return state
+
+    @property
+    def total(self):
+        return self.success + self.error + self.exception
+
+    def creation_times(self):
+        """{短链接: 创建时刻}，供 CacheHitEstimator 推测每个键写入缓存的时间"""
+        return dict(zip((short_url for short_url, _ in self.successful), self.created_at or ()))
+
+    def add(self, result):
+        """记录一个请求结果字典，记录后即可丢弃该字典"""
+        status = result["status"]
+        if status == "success":
+            self.success += 1
+            self.links += result.get("links", 1)
+            self.latency.record(result["response_time"])
+            if "corrected_response_time" in result:
+                self.corrected_latency.record(result["corrected_response_time"])
+            if self.keep_successful:
+                sent_at = time.time() - result["response_time"] / 1000
+            if self.keep_successful and "short_urls" in result:
+                self.successful.extend(zip(result["short_urls"], result["original_urls"]))
+                self.created_at.extend([sent_at] * len(result["short_urls"]))
+                for code in result["short_urls"]:
+                    self.codes.add(code)
+            elif self.keep_successful:
+                self.successful.append((result["short_url"], result["original_url"]))
+                self.created_at.append(sent_at)
+                self.codes.add(result["short_url"])
+            if self.classifier:
+                group = self.classifier(result)
+                if group not in self.groups:
+                    self.groups[group] = LatencyHistogram()
+                self.groups[group].record(result["response_time"])
+            if "phases" in result:
+                for phase, value in result["phases"].items():
+                    if phase not in self.phases:
+                        self.phases[phase] = LatencyHistogram()
+                    self.phases[phase].record(value)
+        elif status == "error":
+            self.error += 1
+        else:
+            self.exception += 1
+
+    def merge(self, other):
+        """合并另一个线程或进程的统计结果"""
+        self.success += other.success
+        self.error += other.error
+        self.exception += other.exception
+        self.links += other.links
+        self.latency.merge(other.latency)
+        self.corrected_latency.merge(other.corrected_latency)
+        self.successful.extend(other.successful)
+        if other.created_at is not None:
+            if self.created_at is None:
+                self.created_at = array('d')
+            self.created_at.extend(other.created_at)
+        if other.codes is not None:
+            if self.codes is None:
+                self.codes = ShortCodeSet()
+            self.codes.merge(other.codes)
+        for group, histogram in other.groups.items():
+            if group not in self.groups:
+                self.groups[group] = LatencyHistogram()
+            self.groups[group].merge(histogram)
+        for phase, histogram in other.phases.items():
+            if phase not in self.phases:
+                self.phases[phase] = LatencyHistogram()
+            self.phases[phase].merge(histogram)
+        merge_timeline(self, other)
+        merge_client(self, other)
+        return self
+
+    @classmethod
+    def merge_all(cls, stats_list, keep_successful=False):
+        """把多个统计结果合并成一个新的"""
+        merged = cls(keep_successful)
+        for stats in stats_list:
+            merged.merge(stats)
+        return merged
+
+
+class OperationStats:
+    """按操作类型分别汇总的统计（混合读写时使用），结果字典中的 "op" 字段决定归属
+
+    classifiers 为 {操作: 分组回调}，只在当前进程内使用，不随对象序列化。
+    """
+
+    def __init__(self, classifiers=None):
+        self.classifiers = classifiers or {}
+        self.by_op = {}
+        self.timeline = None
+        self.client = None
+        self.started_at = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["classifiers"] = {}
+        return state
+
+    def _stats(self, op):
+        stats = self.by_op.get(op)
+        if stats is None:
+            stats = self.by_op[op] = RequestStats(classifier=self.classifiers.get(op))
+        return stats
+
+    @property
+    def total(self):
+        return sum(stats.total for stats in self.by_op.values())
+
+    def add(self, result):
+        """按结果的操作类型记录"""
+        self._stats(result["op"]).add(result)
+
+    def merge(self, other):
+        """合并另一个线程或进程的统计结果"""
+        for op, stats in other.by_op.items():
+            self._stats(op).merge(stats)
+        merge_timeline(self, other)
+        merge_client(self, other)
+        return self
+
+
+def merge_timeline(target, source):
+    """合并两个统计对象上挂的时间线"""
+    if source.timeline is not None:
+        if target.timeline is None:
+            target.timeline = Timeline()
+        target.timeline.merge(source.timeline)
+
+
+def merge_client(target, source):
+    """合并两个统计对象上挂的压测客户端指标"""
+    if source.client is not None:
+        if target.client is None:
+            target.client = ClientMetrics()
+        target.client.merge(source.client)
+
+
+class ClientMetrics:
+    """压测客户端自身的指标，用来判断结果受限于客户端还是服务端；每个进程记录一份，可跨进程合并
+
+    schedule_lag: 开环模式下实际开始发送的时刻减去计划发送时刻（毫秒）
+    handling: 请求完成后处理结果占用的线程 CPU 时间（记入统计、时间线、结果日志和进度条，毫秒）
+    stall: 监视线程每次短暂 sleep 的超出时间，反映线程等待 GIL 或 CPU 调度的时间（毫秒）
+    processes: 每个进程一项，包含每秒占用的 CPU 核数、在途和排队的请求数、并发上限和结果处理的总耗时
+    """
+
+    def __init__(self):
+        self.schedule_lag = LatencyHistogram()
+        self.handling = LatencyHistogram()
+        self.stall = LatencyHistogram()
+        self.processes = []
+
+    def merge(self, other):
+        self.schedule_lag.merge(other.schedule_lag)
+        self.handling.merge(other.handling)
+        self.stall.merge(other.stall)
+        self.processes.extend(other.processes)
+        return self
+
+
+class Timeline:
+    """按秒聚合的时间线：每个操作每秒一个低精度直方图，记录是 O(1)，可跨线程/进程合并
+
+    以 Unix 时间的整秒为键，不同进程记录的同一秒可以直接合并。
+    每秒直方图的相对误差约 6%、上限 60 秒，一小时每个操作约占 10MB。
+    """
+
+    WINDOW_SUB_BUCKET_BITS = 5
+    WINDOW_MAX_MS = 60 * 1000
+
+    def __init__(self):
+        # (操作, 秒) -> [成功数, 失败数, 成功请求的延迟直方图]
+        self.windows = {}
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        return {"windows": self.windows}
+
+    def __setstate__(self, state):
+        self.windows = state["windows"]
+        self._lock = threading.Lock()
+
+    def _window(self, op, second):
+        window = self.windows.get((op, second))
+        if window is None:
+            window = self.windows[(op, second)] = [
+                0, 0, LatencyHistogram(self.WINDOW_SUB_BUCKET_BITS, self.WINDOW_MAX_MS)]
+        return window
+
+    def record(self, op, result, now=None):
+        """在请求完成时记录，now 默认为当前时间"""
+        second = int(now if now is not None else time.time())
+        with self._lock:
+            window = self._window(op, second)
+            if result["status"] == "success":
+                window[0] += 1
+                window[2].record(result["response_time"])
+            else:
+                window[1] += 1
+
+    def merge_window(self, op, second, success, failed, histogram):
+        """合并单个窗口（实时视图从其他进程收到窗口时使用）"""
+        with self._lock:
+            window = self._window(op, second)
+            window[0] += success
+            window[1] += failed
+            window[2].merge(histogram)
+
+    def merge(self, other):
+        """合并另一条时间线"""
+        for (op, second), (success, failed, histogram) in list(other.windows.items()):
+            self.merge_window(op, second, success, failed, histogram)
+        return self
+
+    def windows_in(self, first_second, last_second):
+        """返回 [first_second, last_second] 范围内的窗口: [(操作, 秒, 成功数, 失败数, 直方图)]"""
+        with self._lock:
+            return [(op, second, success, failed, histogram)
+                    for (op, second), (success, failed, histogram) in self.windows.items()
+                    if first_second <= second <= last_second]
+
+    @staticmethod
+    def summarize(success, failed, histogram):
+        """单个窗口的指标"""
+        p50, p90, p99 = histogram.percentiles([50, 90, 99])
+        return {
+            "requests": success + failed,
+            "errors": failed,
+            "error_rate": failed / (success + failed) if success + failed else 0.0,
+            "mean": histogram.mean(),
+            "p50": p50,
+            "p90": p90,
+            "p99": p99
+        }
+
+    def series(self):
+        """导出为时间序列: {操作: [{"t": 相对首个窗口的秒数, "requests", "errors", ...}]}，缺失的秒补零"""
+        if not self.windows:
+            return {}
+        start = min(second for _, second in self.windows)
+        end = max(second for _, second in self.windows)
+        result = {}
+        for op in sorted({op for op, _ in self.windows}):
+            points = []
+            for second in range(start, end + 1):
+                window = self.windows.get((op, second))
+                if window is None:
+                    window = [0, 0, LatencyHistogram(self.WINDOW_SUB_BUCKET_BITS, self.WINDOW_MAX_MS)]
+                points.append({"t": second - start, "timestamp": second, **self.summarize(*window)})
+            result[op] = points
+        return result
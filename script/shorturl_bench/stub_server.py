@@ -0,0 +1,458 @@
+# -*- coding: utf-8 -*-
+"""本地替身服务：实现与 ShortUrlController 相同的 /short-url 接口，不依赖 MySQL/Kafka/Redis
+
+用于在没有完整 docker-compose 环境时调试压测脚本、测量压测客户端自身的最大吞吐量和开销，
+也可以在测试中作为夹具在后台线程启动:
+
+    server = StubServer(port=0).start_in_background()
+    base_url = server.base_url
+    ...
+    server.stop()
+
+延迟分布描述字符串（单位毫秒）:
+    fixed:MS                固定延迟（fixed:0 表示不等待）
+    uniform:MIN:MAX         均匀分布
+    normal:MEAN:STD         正态分布（小于 0 的值按 0 处理）
+    lognormal:MEDIAN:SIGMA  对数正态分布，适合模拟长尾
+    exp:MEAN                指数分布
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import threading
+import time
+from datetime import datetime
+from urllib.parse import parse_qs, urlsplit
+
+# 与 ShortCodeAllocator.java 相同的短码编号方案
+ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+EPOCH_SECONDS = 1735689600
+INSTANCE_BITS = 8
+SEQUENCE_BITS = 16
+
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+def parse_latency(spec):
+    """解析延迟分布描述字符串，返回无参数的采样函数（毫秒）"""
+    name, _, rest = spec.partition(':')
+    params = [float(p) for p in rest.split(':')] if rest else []
+    if name == 'fixed' and len(params) == 1:
+        return lambda: params[0]
+    if name == 'uniform' and len(params) == 2:
+        return lambda: random.uniform(params[0], params[1])
+    if name == 'normal' and len(params) == 2:
+        return lambda: max(0.0, random.gauss(params[0], params[1]))
+    if name == 'lognormal' and len(params) == 2:
+        return lambda: random.lognormvariate(0.0, params[1]) * params[0]
+    if name == 'exp' and len(params) == 1 and params[0] > 0:
+        return lambda: random.expovariate(1 / params[0])
+    raise ValueError(f"无法识别的延迟分布: {spec}")
+
+
+def encode_base62(value):
+    if value == 0:
+        return ALPHABET[0]
+    chars = []
+    while value > 0:
+        value, digit = divmod(value, len(ALPHABET))
+        chars.append(ALPHABET[digit])
+    return "".join(reversed(chars))
+
+
+class ShortCodeAllocator:
+    """与服务端 ShortCodeAllocator 相同的短码分配：编号 = 秒级时间戳(32位) | 实例ID(8位) | 秒内序号(16位)，
+    用 base62 编码；每秒超过 65536 个时借用下一秒的编号。替身服务在单个事件循环中调用，不需要加锁。
+    """
+
+    def __init__(self, instance_id=0):
+        if not 0 <= instance_id < 1 << INSTANCE_BITS:
+            raise ValueError(f"实例ID必须在 0 到 {(1 << INSTANCE_BITS) - 1} 之间: {instance_id}")
+        self.instance_id = instance_id
+        self.second = self._current_second() + 1
+        self.sequence = 0
+
+    @staticmethod
+    def _current_second():
+        return int(time.time()) - EPOCH_SECONDS
+
+    def next_id(self):
+        now = self._current_second()
+        if now > self.second:
+            self.second, self.sequence = now, 0
+        elif self.sequence >= 1 << SEQUENCE_BITS:
+            self.second, self.sequence = self.second + 1, 0
+        value = (self.second << (INSTANCE_BITS + SEQUENCE_BITS)) | (self.instance_id << SEQUENCE_BITS) | self.sequence
+        self.sequence += 1
+        return value
+
+    def next_code(self):
+        return encode_base62(self.next_id())
+
+
+class ShortUrlStore:
+    """内存中的短链接存储，按服务端规则模拟 Redis 缓存：创建时写入缓存，命中不续期，未命中时回填"""
+
+    def __init__(self, cache_ttl=60.0, persist_latency=None, persist_drop_rate=0.0, persist_rate=0.0, instance_id=0):
+        self.cache_ttl = cache_ttl
+        self.allocator = ShortCodeAllocator(instance_id)
+        # 模拟 Kafka 消费者写入 MySQL 的延迟（毫秒采样函数），None 表示创建时立即持久化
+        self.persist_latency = persist_latency
+        self.persist_drop_rate = persist_drop_rate
+        # 模拟消费者每秒最多写入的行数，0 表示不限；超过时按创建顺序排队，形成积压
+        self.persist_rate = persist_rate
+        self._consumer_free_at = 0.0
+        # 短链接 -> (原始URL, 创建时间, 自增ID)
+        self.urls = {}
+        # 短链接 -> 缓存到期时间
+        self.cache_expiry = {}
+        # 短链接 -> 写入"数据库"的时刻，之前只能从缓存读到；消息丢失的短链接为无穷大
+        self.durable_at = {}
+        # 模拟应用实例内的近端缓存：短链接 -> 到期时间，命中时不模拟 Redis 的延迟
+        self.near_cache_enabled = False
+        self.near_cache_ttl = 5.0
+        self.near_cache = {}
+        self.near_cache_stats = {"hits": 0, "misses": 0, "evictions": 0, "negativeHits": 0}
+
+    def create(self, original_url):
+        short_url = self.allocator.next_code()
+        now = time.monotonic()
+        self.urls[short_url] = (original_url, datetime.now(), len(self.urls) + 1)
+        self.cache_expiry[short_url] = now + self.cache_ttl
+        self.near_put(short_url, now)
+        if self.persist_drop_rate and random.random() < self.persist_drop_rate:
+            self.durable_at[short_url] = float('inf')
+        elif self.persist_latency is not None or self.persist_rate:
+            durable = now + (self.persist_latency() / 1000 if self.persist_latency is not None else 0.0)
+            if self.persist_rate:
+                durable = self._consumer_free_at = max(durable, self._consumer_free_at) + 1 / self.persist_rate
+            self.durable_at[short_url] = durable
+        return short_url
+
+    def consumer_progress(self):
+        """(已持久化的短链接数, 尚未持久化的积压数)；丢失的消息不计入积压"""
+        now = time.monotonic()
+        pending = dropped = 0
+        for durable in self.durable_at.values():
+            if durable == float('inf'):
+                dropped += 1
+            elif durable > now:
+                pending += 1
+        return len(self.urls) - pending - dropped, pending
+
+    def persisted(self, short_url, now=None):
+        """短链接是否已经写入"数据库"（只查数据库的 /info 和缓存未命中时的读取看到的状态）"""
+        return short_url in self.urls and self.durable_at.get(short_url, 0.0) <= (now or time.monotonic())
+
+    def near_lookup(self, short_url):
+        """近端缓存开启且命中时返回原始URL，否则返回 None"""
+        if not self.near_cache_enabled:
+            return None
+        now = time.monotonic()
+        expiry = self.near_cache.get(short_url)
+        if expiry is not None and expiry > now:
+            self.near_cache_stats["hits"] += 1
+            return self.urls[short_url][0]
+        if expiry is not None:
+            del self.near_cache[short_url]
+            self.near_cache_stats["evictions"] += 1
+        self.near_cache_stats["misses"] += 1
+        return None
+
+    def set_near_cache(self, enabled):
+        self.near_cache_enabled = enabled
+        if not enabled:
+            self.near_cache.clear()
+
+    def near_cache_info(self):
+        return {"enabled": self.near_cache_enabled, "size": len(self.near_cache), "negativeSize": 0,
+                **self.near_cache_stats}
+
+    def lookup(self, short_url):
+        """返回 (原始URL或None, 是否命中缓存)"""
+        now = time.monotonic()
+        if self.cache_expiry.get(short_url, 0.0) > now:
+            self.near_put(short_url, now)
+            return self.urls[short_url][0], True
+        if self.persisted(short_url, now):
+            self.cache_expiry[short_url] = now + self.cache_ttl
+            self.near_put(short_url, now)
+            return self.urls[short_url][0], False
+        return None, False
+
+    def near_put(self, short_url, now):
+        if self.near_cache_enabled:
+            self.near_cache[short_url] = now + self.near_cache_ttl
+
+    def info(self, short_url):
+        """与 ShortUrl 实体的 JSON 序列化格式一致"""
+        if not self.persisted(short_url):
+            return None
+        original_url, create_time, entry_id = self.urls[short_url]
+        return {"id": entry_id, "shortUrl": short_url, "originalUrl": original_url,
+                "createTime": create_time.isoformat()}
+
+
+class StubServer:
+    """基于 asyncio 的 HTTP/1.1 长连接服务，延迟用 asyncio.sleep 模拟，不占用线程"""
+
+    def __init__(self, host="127.0.0.1", port=8080, create_latency="fixed:0", hit_latency="fixed:0",
+                 miss_latency="fixed:0", error_rate=0.0, error_status=500, cache_ttl=60.0, persist_latency=None,
+                 persist_drop_rate=0.0, persist_rate=0.0, instance_id=0):
+        self.host = host
+        self.port = port
+        self.create_latency = parse_latency(create_latency)
+        self.hit_latency = parse_latency(hit_latency)
+        self.miss_latency = parse_latency(miss_latency)
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.store = ShortUrlStore(cache_ttl, parse_latency(persist_latency) if persist_latency else None,
+                                   persist_drop_rate, persist_rate, instance_id)
+        self.counters = {"create": 0, "cache_hit": 0, "cache_miss": 0, "not_found": 0, "injected_error": 0,
+                         "near_cache_hit": 0}
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._connections = set()
+        # 正在处理的请求数，以 Tomcat 忙碌线程数的名义在 /actuator/prometheus 中暴露
+        self.in_flight = 0
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}/short-url"
+
+    async def _handle(self, method, target, body=b"", content_type=""):
+        """处理一个请求，返回 (状态码, 响应体, Content-Type)"""
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        path = url.path.rstrip('/')
+        if method == 'GET' and path == '/actuator/prometheus':
+            return 200, self.prometheus_text().encode(), "text/plain;version=0.0.4;charset=utf-8"
+        if path == '/actuator/nearcache':
+            # 与应用的 NearCacheEndpoint 相同：GET 查看计数，POST {"enabled": true|false} 开关
+            if method == 'POST':
+                try:
+                    self.store.set_near_cache(bool(json.loads(body)["enabled"]))
+                except (ValueError, KeyError, TypeError):
+                    return 400, b"", None
+            return 200, json.dumps(self.store.near_cache_info()).encode(), "application/json"
+        if method == 'POST' and path == '/stub/flush-cache':
+            # 模拟清空 Redis，用于冷读测试
+            flushed = len(self.store.cache_expiry)
+            self.store.cache_expiry.clear()
+            return 200, str(flushed).encode(), "text/plain;charset=UTF-8"
+        if path not in ('/short-url', '/short-url/info', '/short-url/batch'):
+            return 404, b"", None
+        if self.error_rate and random.random() < self.error_rate:
+            self.counters["injected_error"] += 1
+            return self.error_status, b"injected error", "text/plain;charset=UTF-8"
+
+        if method == 'POST' and path == '/short-url/batch':
+            return await self._handle_batch(body, content_type)
+        if method == 'POST' and path == '/short-url':
+            if 'url' not in query:
+                return 400, b"", None
+            await self._sleep(self.create_latency)
+            self.counters["create"] += 1
+            return 201, self.store.create(query['url'][0]).encode(), "text/plain;charset=UTF-8"
+        if method != 'GET':
+            return 405, b"", None
+        if 'shortUrl' not in query:
+            return 400, b"", None
+        short_url = query['shortUrl'][0]
+        if path == '/short-url/info':
+            await self._sleep(self.miss_latency)
+            info = self.store.info(short_url)
+            if info is None:
+                return 404, b"", None
+            return 200, json.dumps(info).encode(), "application/json"
+
+        near_url = self.store.near_lookup(short_url)
+        if near_url is not None:
+            self.counters["near_cache_hit"] += 1
+            return 200, near_url.encode(), "text/plain;charset=UTF-8"
+        original_url, cache_hit = self.store.lookup(short_url)
+        await self._sleep(self.hit_latency if cache_hit else self.miss_latency)
+        if original_url is None:
+            self.counters["not_found"] += 1
+            return 404, b"", None
+        self.counters["cache_hit" if cache_hit else "cache_miss"] += 1
+        return 200, original_url.encode(), "text/plain;charset=UTF-8"
+
+    async def _handle_batch(self, body, content_type):
+        """批量创建：JSON 数组或 NDJSON（每行一个 JSON 字符串或 {"url": ...}），整批只模拟一次创建延迟
+
+        服务端用 pipeline 写 Redis，因此整批只有一次延迟；有无效项时整个请求返回 400，相当于服务端在第一批中遇到无效行。
+        """
+        ndjson = content_type.startswith("application/x-ndjson")
+        try:
+            if ndjson:
+                lines = [json.loads(line) for line in body.decode().splitlines() if line.strip()]
+                urls = [line.get("url") if isinstance(line, dict) else line for line in lines]
+            else:
+                urls = json.loads(body)
+        except ValueError:
+            return 400, b"", None
+        if not urls or not all(isinstance(url, str) and url.strip() for url in urls):
+            return 400, b"", None
+        await self._sleep(self.create_latency)
+        self.counters["create"] += len(urls)
+        short_urls = [self.store.create(url) for url in urls]
+        if ndjson:
+            return 201, "".join(json.dumps(s) + "\n" for s in short_urls).encode(), "application/x-ndjson"
+        return 201, json.dumps(short_urls).encode(), "application/json"
+
+    def prometheus_text(self):
+        """以 Actuator 的 Prometheus 文本格式输出替身服务自己的计数，便于离线验证指标抓取"""
+        lines = ["# TYPE tomcat_threads_busy_threads gauge",
+                 f'tomcat_threads_busy_threads{{name="http-nio-{self.port}"}} {self.in_flight}',
+                 "# TYPE stub_requests_total counter"]
+        lines.extend(f'stub_requests_total{{outcome="{name}"}} {count}' for name, count in self.counters.items())
+        # 与 KafkaConsumerService 和 Kafka 消费者客户端的指标同名
+        persisted, backlog = self.store.consumer_progress()
+        lines += ["# TYPE short_url_persisted_rows_total counter",
+                  f"short_url_persisted_rows_total {persisted}",
+                  "# TYPE kafka_consumer_fetch_manager_records_lag_max gauge",
+                  f'kafka_consumer_fetch_manager_records_lag_max{{client_id="stub"}} {backlog}']
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    async def _sleep(latency):
+        delay = latency()
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+
+    async def _serve_connection(self, reader, writer):
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                lines = head.decode('latin-1').split("\r\n")
+                method, target, version = lines[0].split(" ", 2)
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                request_body = b""
+                if int(headers.get("content-length", 0)):
+                    request_body = await reader.readexactly(int(headers["content-length"]))
+
+                self.in_flight += 1
+                try:
+                    status, body, content_type = await self._handle(method, target, request_body,
+                                                                    headers.get("content-type", ""))
+                finally:
+                    self.in_flight -= 1
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" and (version != "HTTP/1.0" or connection == "keep-alive")
+                response = [f"HTTP/1.1 {status} {REASONS.get(status, '')}", f"Content-Length: {len(body)}"]
+                if content_type:
+                    response.append(f"Content-Type: {content_type}")
+                if not keep_alive:
+                    response.append("Connection: close")
+                writer.write(("\r\n".join(response) + "\r\n\r\n").encode('latin-1') + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, asyncio.CancelledError, ConnectionError, ValueError):
+            # 客户端断开、请求格式错误或服务停止时关闭连接
+            pass
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    async def _start(self):
+        self._server = await asyncio.start_server(self._serve_connection, self.host, self.port, backlog=4096)
+        # port=0 时由系统分配端口
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    def serve_forever(self):
+        """在当前线程运行，直到被中断"""
+        async def main():
+            await self._start()
+            print(f"替身服务已启动: {self.base_url}", flush=True)
+            async with self._server:
+                await self._server.serve_forever()
+        asyncio.run(main())
+
+    def start_in_background(self):
+        """在后台线程中启动，返回自身；适合在测试中使用"""
+        started = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self._start())
+            started.set()
+            self._loop.run_forever()
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, name="stub-server", daemon=True)
+        self._thread.start()
+        started.wait()
+        return self
+
+    def stop(self):
+        """停止后台线程中的服务"""
+        async def shutdown():
+            self._server.close()
+            # 客户端保持的长连接不会自动断开，需要取消对应的任务
+            for task in list(self._connections):
+                task.cancel()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+            await self._server.wait_closed()
+            self._loop.stop()
+        asyncio.run_coroutine_threadsafe(shutdown(), self._loop)
+        self._thread.join()
+
+
+def parse_arguments(argv=None):
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(prog='python -m shorturl_bench stub', description='短链接服务的本地替身，用于离线调试压测脚本')
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址 (默认: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8080, help='监听端口 (默认: 8080)')
+    parser.add_argument('--create-latency', default='fixed:0',
+                        help='创建短链接的延迟分布，例如 lognormal:5:0.5 (默认: fixed:0)')
+    parser.add_argument('--hit-latency', default='fixed:0', help='读取命中缓存时的延迟分布 (默认: fixed:0)')
+    parser.add_argument('--miss-latency', default='fixed:0',
+                        help='读取未命中缓存（模拟查询 MySQL）时的延迟分布 (默认: fixed:0)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='随机返回错误的比例 0~1 (默认: 0)')
+    parser.add_argument('--error-status', type=int, default=500, help='注入错误时返回的状态码 (默认: 500)')
+    parser.add_argument('--cache-ttl', type=float, default=60.0, help='模拟的缓存过期时间(秒) (默认: 60)')
+    parser.add_argument('--persist-latency',
+                        help='模拟 Kafka 消费者写入 MySQL 的延迟分布，例如 lognormal:2000:0.8；写入之前 /short-url/info '
+                             '返回 404，缓存过期后读取也返回 404 (默认: 创建时立即持久化)')
+    parser.add_argument('--persist-drop-rate', type=float, default=0.0,
+                        help='模拟消息丢失、永远不会持久化的短链接比例 0~1 (默认: 0)')
+    parser.add_argument('--persist-rate', type=float, default=0.0,
+                        help='模拟 Kafka 消费者每秒最多写入 MySQL 的行数，超过时按创建顺序积压 (默认: 0，不限)')
+    parser.add_argument('--instance-id', type=int, default=0,
+                        help='短码编号中的实例ID 0~255，与服务端的 INSTANCE_ID 相同；多个替身服务使用相同的实例ID时'
+                             '会返回重复的短码，可用来验证创建阶段的重复短码检查 (默认: 0)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """主函数"""
+    args = parse_arguments(argv)
+    try:
+        server = StubServer(args.host, args.port, args.create_latency, args.hit_latency, args.miss_latency,
+                            args.error_rate, args.error_status, args.cache_ttl, args.persist_latency,
+                            args.persist_drop_rate, args.persist_rate, args.instance_id)
+    except ValueError as e:
+        print(f"错误: {e}")
+        return 1
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(f"请求统计: {server.counters}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""批量生成测试用的原始URL（NumPy 向量化），并保存为可内存映射的语料文件供多次测试复用
+
+生成:
+    python -m shorturl_bench corpus generate urls.corpus -n 10000000 --path-length lognormal:40:0.6 \\
+        --domains zipf:1000:1.1 --duplicates 0.05
+查看:
+    python -m shorturl_bench corpus info urls.corpus
+
+路径长度分布: fixed:N, uniform:MIN:MAX, lognormal:MEDIAN:SIGMA（截断到 1~2000 个字符）
+域名分布:     逗号分隔的域名列表（均匀选择），或 zipf:N:S（N 个合成域名按 Zipf 分布）
+重复比例:     指定比例的条目与之前某个URL完全相同，用于模拟重复提交的长链接
+
+文件格式（小端）: 32 字节文件头 (魔数, 版本, 条目数, 数据字节数)，
+每个条目的起始位置 uint64[条目数]、长度 uint32[条目数]，之后是所有不重复URL拼接的 ASCII 字节。
+重复的条目指向同一段数据，不额外占用空间。
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+
+import numpy as np
+
+MAGIC = b"SURLCORP"
+VERSION = 1
+HEADER = struct.Struct("<8sIxxxxQQ")
+ALPHABET = np.frombuffer(b"abcdefghijklmnopqrstuvwxyz0123456789", dtype=np.uint8)
+MAX_PATH_LENGTH = 2000
+# 每批生成的不重复URL数，限制生成时的内存占用
+CHUNK_SIZE = 1 << 20
+
+
+def parse_path_length(spec):
+    """解析路径长度分布，返回 (名称, 参数列表)"""
+    name, _, rest = spec.partition(':')
+    params = [float(p) for p in rest.split(':')] if rest else []
+    if name == 'fixed' and len(params) == 1 and params[0] >= 1:
+        return name, params
+    if name == 'uniform' and len(params) == 2 and 1 <= params[0] <= params[1]:
+        return name, params
+    if name == 'lognormal' and len(params) == 2 and params[0] > 0:
+        return name, params
+    raise ValueError(f"无法识别的路径长度分布: {spec}")
+
+
+def sample_path_lengths(rng, count, spec):
+    """按分布生成 count 个路径长度"""
+    name, params = parse_path_length(spec)
+    if name == 'fixed':
+        lengths = np.full(count, params[0])
+    elif name == 'uniform':
+        lengths = rng.integers(int(params[0]), int(params[1]) + 1, size=count)
+    else:
+        lengths = np.rint(rng.lognormal(np.log(params[0]), params[1], size=count))
+    return np.clip(lengths, 1, MAX_PATH_LENGTH).astype(np.int64)
+
+
+def parse_domains(spec):
+    """解析域名分布，返回 (域名列表, 概率数组或None)"""
+    if spec.startswith('zipf:'):
+        _, count, exponent = spec.split(':')
+        count, exponent = int(count), float(exponent)
+        if count < 1 or exponent <= 0:
+            raise ValueError(f"无法识别的域名分布: {spec}")
+        weights = np.arange(1, count + 1, dtype=np.float64) ** -exponent
+        return [f"site{i}.example.com" for i in range(count)], weights / weights.sum()
+    domains = [domain.strip() for domain in spec.split(',') if domain.strip()]
+    if not domains:
+        raise ValueError(f"无法识别的域名分布: {spec}")
+    return domains, None
+
+
+def build_urls(rng, path_lengths, domain_indices, prefixes):
+    """把一批URL拼成一段连续的字节，返回 (字节数组, 每个URL的长度)"""
+    prefix_lengths = np.array([len(prefix) for prefix in prefixes], dtype=np.int64)[domain_indices]
+    lengths = prefix_lengths + path_lengths
+    starts = np.cumsum(lengths) - lengths
+    data = np.empty(int(lengths.sum()), dtype=np.uint8)
+    # 按域名分组写入 "https://域名/" 前缀
+    for index, prefix in enumerate(prefixes):
+        rows = np.flatnonzero(domain_indices == index)
+        if len(rows):
+            prefix_bytes = np.frombuffer(prefix, dtype=np.uint8)
+            data[starts[rows, None] + np.arange(len(prefix_bytes))] = prefix_bytes
+    # 随机路径：一次生成所有字符，再按每个URL的路径起点展开位置
+    path_total = int(path_lengths.sum())
+    path_offsets = np.cumsum(path_lengths) - path_lengths
+    positions = np.arange(path_total) + np.repeat(starts + prefix_lengths - path_offsets, path_lengths)
+    data[positions] = ALPHABET[rng.integers(0, len(ALPHABET), size=path_total)]
+    return data, lengths
+
+
+def plan_urls(rng, count, path_length, domains, duplicates):
+    """确定每个条目对应哪个不重复URL，以及每个不重复URL的路径长度和域名
+
+    返回 (条目 -> 不重复URL编号, 路径长度数组, 域名下标数组, 各域名的URL前缀)
+    """
+    domain_list, probabilities = parse_domains(domains)
+    prefixes = [f"https://{domain}/".encode('ascii') for domain in domain_list]
+    source = duplicate_sources(rng, count, duplicates)
+    unique_count = int(source.max()) + 1 if count else 0
+    path_lengths = sample_path_lengths(rng, unique_count, path_length)
+    domain_indices = rng.choice(len(prefixes), size=unique_count, p=probabilities)
+    return source, path_lengths, domain_indices, prefixes
+
+
+def generate_urls(count, path_length="fixed:10", domains="example.com", duplicates=0.0, seed=None):
+    """在内存中生成 count 个URL，返回字符串列表（不需要语料文件时使用）"""
+    rng = np.random.default_rng(seed)
+    source, path_lengths, domain_indices, prefixes = plan_urls(rng, count, path_length, domains, duplicates)
+    data, lengths = build_urls(rng, path_lengths, domain_indices, prefixes)
+    text = data.tobytes().decode('ascii')
+    starts = np.cumsum(lengths) - lengths
+    unique = [text[start:start + length] for start, length in zip(starts.tolist(), lengths.tolist())]
+    return [unique[i] for i in source.tolist()]
+
+
+def duplicate_sources(rng, count, duplicates):
+    """每个条目对应的不重复URL编号：新URL按出现顺序编号，重复条目随机指向之前出现过的某个URL"""
+    is_duplicate = rng.random(count) < duplicates
+    if count:
+        is_duplicate[0] = False
+    seen = np.cumsum(~is_duplicate)
+    source = seen - 1
+    duplicate_rows = np.flatnonzero(is_duplicate)
+    source[duplicate_rows] = (rng.random(len(duplicate_rows)) * seen[duplicate_rows]).astype(np.int64)
+    return source
+
+
+def write_corpus(filename, count, path_length="fixed:10", domains="example.com", duplicates=0.0, seed=None):
+    """生成 count 个URL并写入语料文件，按批生成，内存占用与总数无关（索引数组除外）"""
+    rng = np.random.default_rng(seed)
+    # 先确定每个不重复URL的长度和位置，才能在写数据之前写出索引
+    source, path_lengths, domain_indices, prefixes = plan_urls(rng, count, path_length, domains, duplicates)
+    unique_count = len(path_lengths)
+    unique_lengths = np.array([len(prefix) for prefix in prefixes], dtype=np.int64)[domain_indices] + path_lengths
+    unique_starts = np.cumsum(unique_lengths) - unique_lengths
+    data_size = int(unique_lengths.sum())
+
+    with open(filename, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, count, data_size))
+        f.write(unique_starts[source].astype('<u8').tobytes())
+        f.write(unique_lengths[source].astype('<u4').tobytes())
+        for chunk_start in range(0, unique_count, CHUNK_SIZE):
+            chunk = slice(chunk_start, chunk_start + CHUNK_SIZE)
+            data, _ = build_urls(rng, path_lengths[chunk], domain_indices[chunk], prefixes)
+            f.write(data.tobytes())
+    return unique_count
+
+
+class UrlCorpus:
+    """只读的语料文件（或其中一段连续范围），通过内存映射按需读取
+
+    支持 len()、下标、切片和迭代；切片是共享同一个内存映射的视图，不复制数据、也不重新打开文件，
+    序列化时只传递文件路径和范围，因此分发给多进程时几乎没有开销。
+    """
+
+    def __init__(self, filename, start=0, stop=None):
+        self.filename = filename
+        with open(filename, 'rb') as f:
+            magic, version, count, _ = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"不是有效的URL语料文件: {filename}")
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._starts = np.frombuffer(self._mmap, dtype='<u8', count=count, offset=HEADER.size)
+        self._lengths = np.frombuffer(self._mmap, dtype='<u4', count=count, offset=HEADER.size + 8 * count)
+        # 数据区在文件中的起始位置
+        self._data_offset = HEADER.size + 12 * count
+        self.start, self.stop, _ = slice(start, stop).indices(count)
+        self.stop = max(self.start, self.stop)
+
+    def _view(self, start, stop):
+        """同一个文件中的另一段范围，与当前对象共享内存映射和索引数组"""
+        view = object.__new__(UrlCorpus)
+        view.__dict__.update(self.__dict__)
+        view.start, view.stop = start, stop
+        return view
+
+    def __reduce__(self):
+        return UrlCorpus, (self.filename, self.start, self.stop)
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            return self._view(self.start + start, self.start + max(start, stop))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        offset = self._data_offset + int(self._starts[self.start + index])
+        return self._mmap[offset:offset + int(self._lengths[self.start + index])].decode('ascii')
+
+    def __iter__(self):
+        # 按批把索引转成 Python 整数，避免逐条访问 NumPy 标量的开销
+        data, base = self._mmap, self._data_offset
+        for batch in range(self.start, self.stop, CHUNK_SIZE):
+            end = min(batch + CHUNK_SIZE, self.stop)
+            for offset, length in zip(self._starts[batch:end].tolist(), self._lengths[batch:end].tolist()):
+                yield data[base + offset:base + offset + length].decode('ascii')
+
+
+def load_corpus(filename, count):
+    """读取语料文件的前 count 个URL；语料不足时给出提示并只使用已有的部分"""
+    corpus = UrlCorpus(filename)
+    if len(corpus) < count:
+        print(f"警告: 语料文件只有 {len(corpus)} 个URL，少于请求数 {count}")
+    return corpus[:count]
+
+
+def parse_arguments(argv=None):
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(prog='python -m shorturl_bench corpus', description='生成和查看测试用的URL语料文件')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    generate = subparsers.add_parser('generate', help='生成语料文件')
+    generate.add_argument('output', help='输出的语料文件')
+    generate.add_argument('--count', '-n', type=int, default=1000000, help='URL数量 (默认: 1000000)')
+    generate.add_argument('--path-length', default='fixed:10',
+                          help='路径长度分布: fixed:N, uniform:MIN:MAX, lognormal:MEDIAN:SIGMA (默认: fixed:10)')
+    generate.add_argument('--domains', default='example.com',
+                          help='域名分布: 逗号分隔的域名列表，或 zipf:N:S (默认: example.com)')
+    generate.add_argument('--duplicates', type=float, default=0.0,
+                          help='与之前某个URL完全相同的条目比例 0~1 (默认: 0)')
+    generate.add_argument('--seed', type=int, help='随机种子')
+    info = subparsers.add_parser('info', help='查看语料文件')
+    info.add_argument('corpus', help='语料文件')
+    info.add_argument('--sample', type=int, default=5, help='显示的样本数 (默认: 5)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """主函数"""
+    args = parse_arguments(argv)
+    if args.command == 'generate':
+        try:
+            unique_count = write_corpus(args.output, args.count, args.path_length, args.domains, args.duplicates,
+                                        args.seed)
+        except (OSError, ValueError) as e:
+            print(f"错误: {e}")
+            return 1
+        print(f"已生成 {args.count} 个URL（{unique_count} 个不重复）到 {args.output}，"
+              f"文件大小 {os.path.getsize(args.output) / 1024 / 1024:.1f} MB")
+    else:
+        try:
+            corpus = UrlCorpus(args.corpus)
+        except (OSError, ValueError) as e:
+            print(f"错误: {e}")
+            return 1
+        lengths = np.asarray(corpus._lengths)
+        print(f"URL数量: {len(corpus)}")
+        print(f"不重复URL数量: {len(np.unique(np.asarray(corpus._starts)))}")
+        if len(corpus):
+            print(f"URL长度 平均/P50/P99/最大: {lengths.mean():.1f} / {np.percentile(lengths, 50):.0f} / "
+                  f"{np.percentile(lengths, 99):.0f} / {lengths.max()}")
+        for url in corpus[:args.sample]:
+            print(f"  {url}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
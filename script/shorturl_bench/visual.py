@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""visual 命令（原 visual_test_short_url.py）：环境变量配置的端到端测试，保存结果文件并生成图表
+
+请求经由 engine 的线程池引擎发送（与 run 命令相同），matplotlib 只在 GENERATE_CHART=true 时导入。
+"""
+
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+
+from .client_metrics import client_metrics_report, print_client_metrics
+from .engine import DEFAULT_CONFIG, run_sharded_requests
+from .key_distribution import select_keys
+from .report import GROUP_LABELS, histogram_summary, phase_breakdown, print_duplicate_codes, print_phase_breakdown
+from .result_log import reset_log
+from .server_metrics import MetricsSampler, print_server_metrics, server_metrics_report
+from .stats import Timeline
+from .workload import create_urls
+
+# 从环境变量获取配置，如果不存在则使用默认值
+BASE_URL = os.environ.get('SHORT_URL_API', 'http://localhost:8080/short-url')
+NUM_REQUESTS = int(os.environ.get('TEST_REQUESTS', '10000'))
+MAX_WORKERS = int(os.environ.get('TEST_CONCURRENCY', '50'))
+SAVE_RESULTS = os.environ.get('SAVE_RESULTS', 'true').lower() == 'true'
+GENERATE_CHART = os.environ.get('GENERATE_CHART', 'true').lower() == 'true'
+# 保存结果时同时从结果文件生成自包含的 HTML 报告 performance_report_<时间戳>.html
+HTML_REPORT = os.environ.get('HTML_REPORT', 'true').lower() == 'true'
+NUM_PROCESSES = int(os.environ.get('TEST_PROCESSES', '1'))
+# 逐请求结果日志，默认在 SAVE_RESULTS 时写入 performance_log_<时间戳>.jsonl
+RESULT_LOG_FILE = os.environ.get('RESULT_LOG_FILE')
+STREAM_RESULTS = os.environ.get('STREAM_RESULTS', 'true').lower() == 'true'
+# 获取阶段的键访问分布（见 key_distribution.py），以及用于推测缓存命中的 Redis 过期时间
+KEY_DISTRIBUTION = os.environ.get('TEST_KEY_DIST', 'sequential')
+KEY_SEED = int(os.environ['TEST_KEY_SEED']) if os.environ.get('TEST_KEY_SEED') else None
+CACHE_TTL = float(os.environ.get('CACHE_TTL', '60'))
+# 创建阶段使用的URL语料文件（由 corpus generate 命令生成），不指定时在内存中批量生成
+URL_CORPUS = os.environ.get('URL_CORPUS')
+# 用每秒一行的实时视图代替进度条
+LIVE_VIEW = os.environ.get('LIVE_VIEW', 'false').lower() == 'true'
+# 测试期间抓取的 Actuator Prometheus 端点（逗号分隔），例如 http://localhost:8081/actuator/prometheus
+METRICS_ENDPOINTS = [e for e in os.environ.get('METRICS_ENDPOINTS', '').split(',') if e]
+METRICS_INTERVAL = float(os.environ.get('METRICS_INTERVAL', '1'))
+# 用分阶段计时的客户端代替 requests，分别记录 DNS、连接、TLS、请求写入、首字节等待和响应读取的耗时
+PHASE_TIMING = os.environ.get('PHASE_TIMING', 'false').lower() == 'true'
+# 分阶段计时时是否复用连接；为 false 时每个请求都新建连接，可测出经过 nginx 建立连接的开销
+PHASE_KEEP_ALIVE = os.environ.get('PHASE_KEEP_ALIVE', 'true').lower() == 'true'
+
+
+def engine_config(log_file):
+    """把环境变量配置转换成压测引擎的配置"""
+    return dict(DEFAULT_CONFIG, base_url=BASE_URL, requests=NUM_REQUESTS, concurrency=MAX_WORKERS,
+                processes=NUM_PROCESSES, log_file=log_file, key_dist=KEY_DISTRIBUTION, seed=KEY_SEED,
+                cache_ttl=CACHE_TTL, url_corpus=URL_CORPUS, live=LIVE_VIEW, progress=not LIVE_VIEW,
+                phase_timing=PHASE_TIMING, phase_keep_alive=PHASE_KEEP_ALIVE)
+
+
+def run_performance_test():
+    """运行性能测试"""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    results_file = f"performance_results_{timestamp}.json"
+    chart_file = f"performance_chart_{timestamp}.png"
+    report_file = f"performance_report_{timestamp}.html"
+    log_file = RESULT_LOG_FILE or (f"performance_log_{timestamp}.jsonl" if SAVE_RESULTS and STREAM_RESULTS else None)
+    if log_file:
+        reset_log(log_file)
+    
+    print("=" * 50)
+    print(f"短链接服务性能测试 - {NUM_REQUESTS} 请求, {MAX_WORKERS} 并发, {NUM_PROCESSES} 进程")
+    print(f"API URL: {BASE_URL}")
+    print("=" * 50)
+    
+    config = engine_config(log_file)
+    sampler = MetricsSampler(METRICS_ENDPOINTS, METRICS_INTERVAL).start() if METRICS_ENDPOINTS else None
+    
+    # 第一步：创建短链接
+    print("\n[1/2] 测试创建短链接性能...")
+    urls = create_urls(NUM_REQUESTS, URL_CORPUS)
+    
+    start_time = time.time()
+    create_stats = run_sharded_requests("create", urls, config, "创建短链接")
+    
+    create_end_time = time.time()
+    create_elapsed_time = create_end_time - start_time
+    
+    # 响应时间只保存在直方图中，不再保留每个请求的结果
+    create_histogram = create_stats.latency
+    
+    print(f"\n创建短链接测试完成:")
+    print(f"  总请求数: {NUM_REQUESTS}")
+    print(f"  成功请求数: {create_stats.success}")
+    print(f"  总耗时: {create_elapsed_time:.2f} 秒")
+    print(f"  平均每秒处理: {NUM_REQUESTS / create_elapsed_time:.2f} 请求")
+    print(f"  平均响应时间: {create_histogram.mean():.2f} 毫秒")
+    print(f"  99%响应时间: {create_histogram.percentile(99):.2f} 毫秒")
+    print_phase_breakdown(create_stats.phases)
+    duplicate_codes = print_duplicate_codes(create_stats)
+    create_client = client_metrics_report(create_stats.client)
+    print_client_metrics(create_client)
+    
+    # 第二步：获取原始URL
+    print("\n[2/2] 测试获取原始URL性能...")
+    created = [short_url for short_url, _ in create_stats.successful]
+    # sequential 每个短链接访问一次；其他分布按 NUM_REQUESTS 重复访问
+    num_gets = len(created) if KEY_DISTRIBUTION == 'sequential' else NUM_REQUESTS
+    short_urls = select_keys(created, num_gets, KEY_DISTRIBUTION, KEY_SEED)
+    print(f"  键分布: {KEY_DISTRIBUTION}")
+    
+    start_time = time.time()
+    # 每个短链接在创建时写入缓存，按各自的创建时刻推测读取是否命中
+    get_stats = run_sharded_requests("get", short_urls, dict(config, keys_created_at=create_stats.creation_times()),
+                                     "获取原始URL")
+    
+    get_end_time = time.time()
+    get_elapsed_time = get_end_time - start_time
+    
+    get_histogram = get_stats.latency
+    
+    print(f"\n获取原始URL测试完成:")
+    print(f"  总请求数: {len(short_urls)}")
+    print(f"  成功请求数: {get_stats.success}")
+    print(f"  总耗时: {get_elapsed_time:.2f} 秒")
+    print(f"  平均每秒处理: {len(short_urls) / get_elapsed_time:.2f} 请求")
+    print(f"  平均响应时间: {get_histogram.mean():.2f} 毫秒")
+    print(f"  99%响应时间: {get_histogram.percentile(99):.2f} 毫秒")
+    print_phase_breakdown(get_stats.phases)
+    for group, histogram in sorted(get_stats.groups.items()):
+        print(f"  {GROUP_LABELS.get(group, group)}: {histogram.count} 请求, "
+              f"平均 {histogram.mean():.2f} 毫秒, 99% {histogram.percentile(99):.2f} 毫秒")
+    get_client = client_metrics_report(get_stats.client)
+    print_client_metrics(get_client)
+    
+    # 两个阶段的每秒时间线，阶段之间的空档补零
+    timeline = Timeline().merge(create_stats.timeline).merge(get_stats.timeline)
+    server_metrics = None
+    if sampler:
+        sampler.stop()
+        server_metrics = server_metrics_report(sampler, timeline)
+        print()
+        print_server_metrics(server_metrics, {"create": "创建", "get": "获取"})
+    
+    # 保存结果
+    if SAVE_RESULTS:
+        results = {
+            "test_config": {
+                "base_url": BASE_URL,
+                "num_requests": NUM_REQUESTS,
+                "max_workers": MAX_WORKERS,
+                "processes": NUM_PROCESSES,
+                "key_distribution": KEY_DISTRIBUTION,
+                "key_seed": KEY_SEED,
+                "cache_ttl": CACHE_TTL,
+                "phase_timing": PHASE_TIMING,
+                "phase_keep_alive": PHASE_KEEP_ALIVE,
+                "timestamp": timestamp
+            },
+            "create_test": {
+                "total_requests": NUM_REQUESTS,
+                "successful_requests": create_stats.success,
+                "total_time": create_elapsed_time,
+                "requests_per_second": NUM_REQUESTS / create_elapsed_time,
+                "duplicate_codes": duplicate_codes,
+                **histogram_summary(create_histogram),
+                "phase_breakdown": phase_breakdown(create_stats.phases),
+                "client_metrics": create_client
+            },
+            "get_test": {
+                "total_requests": len(short_urls),
+                "successful_requests": get_stats.success,
+                "total_time": get_elapsed_time,
+                "requests_per_second": len(short_urls) / get_elapsed_time,
+                "key_distribution": KEY_DISTRIBUTION,
+                **histogram_summary(get_histogram),
+                "latency_groups": {group: histogram_summary(histogram)
+                                   for group, histogram in get_stats.groups.items()},
+                "phase_breakdown": phase_breakdown(get_stats.phases),
+                "client_metrics": get_client
+            },
+            "timeline": timeline.series()
+        }
+        if server_metrics:
+            results["server_metrics"] = server_metrics
+        
+        with open(results_file, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n性能测试结果已保存到: {results_file}")
+        if HTML_REPORT:
+            from .html_report import save_html_report
+            save_html_report([results_file], report_file)
+    if log_file:
+        print(f"逐请求结果日志: {log_file} (可用 python -m shorturl_bench log {log_file} --chart <图表文件> 离线重新分析)")
+    
+    # 生成图表
+    if GENERATE_CHART and create_histogram.count > 0 and get_histogram.count > 0:
+        from .report import generate_performance_chart
+        generate_performance_chart(create_histogram, get_histogram, chart_file, timeline, server_metrics,
+                                   {"create": create_stats.phases, "get": get_stats.phases})
+    
+    print("=" * 50)
+    print("性能测试完成")
+    print("=" * 50)
+
+
+ENVIRONMENT_HELP = """环境变量 (默认值):
+  SHORT_URL_API       API基础URL (http://localhost:8080/short-url)
+  TEST_REQUESTS       请求数量 (10000)
+  TEST_CONCURRENCY    并发数 (50)
+  TEST_PROCESSES      压测进程数 (1)
+  TEST_KEY_DIST       获取阶段的键访问分布，取值同 run --key-dist (sequential)
+  TEST_KEY_SEED       键分布的随机种子
+  CACHE_TTL           服务端 Redis 缓存过期时间，秒 (60)
+  SAVE_RESULTS        是否保存结果文件 (true)
+  GENERATE_CHART      是否生成图表 (true)
+  HTML_REPORT         保存结果时是否同时生成 HTML 报告 (true)
+  RESULT_LOG_FILE     逐请求结果日志文件 (保存结果时为 performance_log_<时间戳>.jsonl)
+  STREAM_RESULTS      是否流式写入逐请求结果日志 (true)
+  URL_CORPUS          创建阶段使用的URL语料文件
+  LIVE_VIEW           用每秒一行的实时视图代替进度条 (false)
+  METRICS_ENDPOINTS   测试期间抓取的 Actuator Prometheus 端点，逗号分隔
+  METRICS_INTERVAL    服务端指标的抓取间隔，秒 (1)
+  PHASE_TIMING        使用分阶段计时的客户端 (false)
+  PHASE_KEEP_ALIVE    分阶段计时时是否复用连接 (true)"""
+
+
+def parse_arguments(argv=None):
+    """配置全部来自环境变量，命令行只接受 --help；其他参数视为错误，不会误启动压测"""
+    parser = argparse.ArgumentParser(prog='python -m shorturl_bench visual',
+                                     description='环境变量配置的短链接服务端到端压测，保存结果文件并生成图表',
+                                     epilog=ENVIRONMENT_HELP, formatter_class=argparse.RawDescriptionHelpFormatter)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """主函数"""
+    parse_arguments(argv)
+    run_performance_test()
+    return 0
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""请求的生成：创建阶段的原始URL、混合读写的请求序列，以及开环模式的发送时间线"""
+
+import csv
+import os
+import random
+import string
+import threading
+
+# 混合读写时每次准备的原始URL数量
+URL_BLOCK = 10000
+# 随机URL的路径长度和字符集
+URL_PATH_LENGTH = 10
+URL_ALPHABET = string.ascii_lowercase + string.digits
+# 把随机字节映射到字符集的转换表（取模带来的轻微不均匀不影响压测）
+_URL_TRANSLATION = bytes(ord(URL_ALPHABET[b % len(URL_ALPHABET)]) for b in range(256))
+
+
+def random_urls(count, rng=None):
+    """批量生成 count 个随机URL：一次取出全部随机字节再整体转换成字符，不需要 NumPy
+
+    rng 为 random.Random 时结果由它的种子决定，否则使用 os.urandom。
+    """
+    size = count * URL_PATH_LENGTH
+    data = rng.randbytes(size) if rng is not None else os.urandom(size)
+    text = data.translate(_URL_TRANSLATION).decode('ascii')
+    return [f"https://example.com/{text[i:i + URL_PATH_LENGTH]}" for i in range(0, size, URL_PATH_LENGTH)]
+
+
+def create_urls(count, corpus=None):
+    """创建阶段的原始URL：指定语料文件时通过内存映射读取前 count 个，否则在内存中批量生成"""
+    if not corpus:
+        return random_urls(count)
+    # 语料模块依赖 NumPy，只在读取语料文件时导入
+    from .url_corpus import load_corpus
+
+    return load_corpus(corpus, count)
+
+
+class UrlBatches:
+    """把原始URL序列按每批 size 个切分的只读序列，批量创建时使用
+
+    每一批在取用时才切片（语料文件的切片是共享内存映射的视图），不预先生成所有批次；
+    切片仍是 UrlBatches，按批次范围切分给多个进程时只带上对应的那部分URL。
+    """
+
+    def __init__(self, urls, size):
+        self.urls = urls
+        self.size = size
+
+    def __len__(self):
+        return -(-len(self.urls) // self.size)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            return UrlBatches(self.urls[start * self.size:max(start, stop) * self.size], self.size)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self.urls[index * self.size:(index + 1) * self.size]
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+class MixedWorkload:
+    """混合读写负载：每个请求发送时才决定读还是写，读请求从已成功创建的短链接池中随机选取
+
+    池随着创建成功不断增长，多进程时每个进程维护自己的池。
+    写请求的原始URL与创建阶段来源相同，每次准备 URL_BLOCK 个：指定语料文件时从随机位置起
+    顺序读取（读到末尾从头开始），否则用 random_urls 批量生成。
+    """
+
+    def __init__(self, read_ratio, initial_pool=None, seed=None, cache_classifier=None, corpus=None):
+        self.read_ratio = read_ratio
+        self.pool = list(initial_pool or [])
+        self.random = random.Random(seed)
+        self.cache_classifier = cache_classifier
+        self.corpus = corpus
+        self.corpus_position = None
+        self.urls = iter(())
+        self.urls_lock = threading.Lock()
+
+    def next_request(self):
+        """返回 (操作, 参数)；池为空时先发创建请求"""
+        if self.pool and self.random.random() < self.read_ratio:
+            return "get", self.random.choice(self.pool)
+        return "create", self.next_url()
+
+    def next_url(self):
+        """取下一个原始URL，当前这批用完时准备下一批"""
+        with self.urls_lock:
+            url = next(self.urls, None)
+            if url is None:
+                self.urls = iter(self.next_url_block())
+                url = next(self.urls)
+            return url
+
+    def next_url_block(self):
+        """准备下一批原始URL"""
+        if not self.corpus:
+            return random_urls(URL_BLOCK, self.random)
+        # 语料模块依赖 NumPy，只在读取语料文件时导入
+        from .url_corpus import UrlCorpus
+        if not isinstance(self.corpus, UrlCorpus):
+            self.corpus = UrlCorpus(self.corpus)
+            if not len(self.corpus):
+                raise ValueError(f"语料文件中没有URL: {self.corpus.filename}")
+        if self.corpus_position is None:
+            self.corpus_position = self.random.randrange(len(self.corpus))
+        start = self.corpus_position
+        self.corpus_position = min(start + URL_BLOCK, len(self.corpus)) % len(self.corpus)
+        return list(self.corpus[start:start + URL_BLOCK])
+
+    def observe(self, result):
+        """创建成功的短链接加入读取池，并记为刚写入缓存"""
+        if result["op"] == "create" and result["status"] == "success":
+            self.pool.append(result["short_url"])
+            if self.cache_classifier:
+                self.cache_classifier.record_write(result["short_url"])
+
+
+def parse_mix(spec):
+    """解析读写比例 "读:写"，返回读请求所占比例"""
+    read, _, write = spec.partition(':')
+    read, write = float(read), float(write or 0)
+    if read < 0 or write < 0 or read + write <= 0:
+        raise ValueError(f"无法识别的读写比例: {spec}")
+    return read / (read + write)
+
+
+def load_rate_curve(filename):
+    """从CSV文件读取目标速率曲线，每行为: 起始秒数,每秒请求数"""
+    curve = []
+    with open(filename, 'r', encoding='utf-8') as f:
+        for row in csv.reader(f):
+            if not row or row[0].strip().startswith('#'):
+                continue
+            curve.append((float(row[0]), float(row[1])))
+    curve.sort()
+    return curve
+
+
+def build_schedule(num_requests, rate=None, rate_curve=None):
+    """生成每个请求的计划发送时间（相对测试开始的秒数），速率曲线按分段常数处理"""
+    curve = rate_curve or [(0.0, rate)]
+    offsets = []
+    for i, (segment_start, segment_rate) in enumerate(curve):
+        segment_end = curve[i + 1][0] if i + 1 < len(curve) else float('inf')
+        if segment_rate <= 0:
+            continue
+        interval = 1.0 / segment_rate
+        t = segment_start
+        while t < segment_end and len(offsets) < num_requests:
+            offsets.append(t)
+            t += interval
+        if len(offsets) >= num_requests:
+            break
+    return offsets
@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+"""测试从 script 目录导入 shorturl_bench 包: python -m pytest script/tests"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
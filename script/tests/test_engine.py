@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""压测引擎端到端测试：在后台线程启动替身服务（系统分配端口），经由各引擎发送请求"""
+
+import json
+
+import pytest
+import requests
+
+from shorturl_bench.engine import DEFAULT_CONFIG, run_sharded_requests
+from shorturl_bench.stub_server import StubServer
+from shorturl_bench.workload import UrlBatches, create_urls
+
+
+@pytest.fixture(scope="module")
+def stub():
+    server = StubServer(port=0).start_in_background()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def config(stub):
+    return dict(DEFAULT_CONFIG, base_url=stub.base_url, concurrency=8, connections=8, progress=False)
+
+
+def create_links(config, urls):
+    stats = run_sharded_requests("create", urls, config, "创建短链接")
+    assert stats.success == len(urls)
+    return stats
+
+
+@pytest.mark.parametrize("engine", ["threads", "asyncio"])
+def test_create_then_get(config, engine):
+    if engine == "asyncio":
+        pytest.importorskip("aiohttp")
+    config = dict(config, engine=engine)
+    created = create_links(config, create_urls(200))
+    assert (created.error, created.exception) == (0, 0)
+    assert created.latency.count == 200
+    assert created.codes.duplicates() == (0, [])
+    assert created.timeline is not None and created.client is not None
+
+    keys = [short_url for short_url, _ in created.successful]
+    fetched = run_sharded_requests("get", keys + ["missing"], config, "获取原始URL")
+    assert fetched.success == len(keys)
+    # 不存在的短码返回 404，记为错误而不是异常
+    assert (fetched.error, fetched.exception) == (1, 0)
+    # 刚创建的短链接都在缓存中
+    assert sum(histogram.count for histogram in fetched.groups.values()) == len(keys)
+
+
+def test_get_returns_original_url(stub, config):
+    urls = create_urls(20)
+    created = create_links(config, urls)
+    for short_url, original_url in created.successful:
+        response = requests.get(stub.base_url, params={"shortUrl": short_url})
+        assert response.status_code == 200
+        assert response.text == original_url
+    assert sorted(original_url for _, original_url in created.successful) == sorted(urls)
+
+
+@pytest.mark.parametrize("engine", ["threads", "asyncio"])
+def test_open_loop(config, engine):
+    if engine == "asyncio":
+        pytest.importorskip("aiohttp")
+    stats = create_links(dict(config, engine=engine, rate=500), create_urls(100))
+    # 开环模式同时记录从计划发送时间起算的响应时间
+    assert stats.corrected_latency.count == 100
+    assert stats.client.schedule_lag.count == 100
+
+
+def test_multiple_processes(config):
+    stats = create_links(dict(config, processes=2), create_urls(200))
+    assert len(stats.client.processes) == 2
+    assert stats.codes.duplicates() == (0, [])
+
+
+@pytest.mark.parametrize("engine", ["threads", "asyncio"])
+def test_batch_create(config, engine):
+    if engine == "asyncio":
+        pytest.importorskip("aiohttp")
+    urls = create_urls(1050)
+    batches = UrlBatches(urls, 100)
+    assert len(batches) == 11 and len(batches[-1]) == 50
+    stats = run_sharded_requests("create_batch", batches, dict(config, engine=engine), "批量创建短链接")
+    assert stats.success == 11
+    assert stats.links == 1050
+    assert sorted(original_url for _, original_url in stats.successful) == sorted(urls)
+    assert stats.codes.duplicates() == (0, [])
+
+    keys = [short_url for short_url, _ in stats.successful]
+    fetched = run_sharded_requests("get", keys, config, "获取原始URL")
+    assert fetched.success == len(keys)
+
+
+def test_batch_rejects_blank_urls(stub):
+    batch_url = stub.base_url + "/batch"
+    assert requests.post(batch_url, json=["https://example.com/a", ""]).status_code == 400
+    ndjson = {"Content-Type": "application/x-ndjson"}
+    assert requests.post(batch_url, data='"https://example.com/a"\n{}\n', headers=ndjson).status_code == 400
+    response = requests.post(batch_url, data='"https://example.com/a"\n{"url": "https://example.com/b"}\n',
+                             headers=ndjson)
+    assert response.status_code == 201
+    assert len([json.loads(line) for line in response.text.splitlines()]) == 2
+
+
+def test_result_log(config, tmp_path):
+    from shorturl_bench.result_log import iter_result_log
+
+    log_file = str(tmp_path / "results.jsonl")
+    create_links(dict(config, log_file=log_file), create_urls(50))
+    assert len(list(iter_result_log([log_file]))) == 50
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""LatencyHistogram：百分位数的误差上限、跨分片合并和序列化；ShortCodeSet 的重复统计"""
+
+import json
+import math
+import random
+
+import pytest
+
+from shorturl_bench.stats import LatencyHistogram, ShortCodeSet
+
+# 默认 sub_bucket_bits=8 时的相对误差上限，另加 1 微秒的取整误差
+RELATIVE_ERROR = 1 / 2 ** 7
+ROUNDING_MS = 0.001
+PERCENTILES = [1, 10, 50, 90, 99, 99.9, 100]
+
+
+def exact_percentile(sorted_values, p):
+    """与 LatencyHistogram 相同的最近秩定义"""
+    return sorted_values[max(1, math.ceil(len(sorted_values) * p / 100)) - 1]
+
+
+def histogram_of(values):
+    histogram = LatencyHistogram()
+    for value in values:
+        histogram.record(value)
+    return histogram
+
+
+def assert_within_error(histogram, values):
+    ordered = sorted(values)
+    for p, estimate in zip(PERCENTILES, histogram.percentiles(PERCENTILES)):
+        exact = exact_percentile(ordered, p)
+        assert abs(estimate - exact) <= exact * RELATIVE_ERROR + ROUNDING_MS, (p, estimate, exact)
+
+
+@pytest.mark.parametrize("sample", [
+    lambda rng: rng.uniform(0.0, 1000.0),
+    lambda rng: rng.lognormvariate(math.log(5.0), 1.0),
+    lambda rng: rng.expovariate(1 / 20.0),
+], ids=["uniform", "lognormal", "exponential"])
+def test_percentiles_within_relative_error(sample):
+    rng = random.Random(42)
+    values = [sample(rng) for _ in range(50000)]
+    histogram = histogram_of(values)
+    assert histogram.count == len(values)
+    assert histogram.mean() == pytest.approx(sum(values) / len(values))
+    assert histogram.min == min(values)
+    assert histogram.max == max(values)
+    assert_within_error(histogram, values)
+
+
+def test_small_values_are_exact():
+    # 小于 256 微秒的值每微秒一个桶
+    values = [i / 1000 for i in range(256)]
+    histogram = histogram_of(values)
+    for p in (1, 50, 100):
+        assert histogram.percentile(p) == pytest.approx(exact_percentile(values, p), abs=ROUNDING_MS)
+
+
+def test_values_above_max_are_clamped():
+    histogram = LatencyHistogram(max_value_ms=100)
+    histogram.record(5000.0)
+    assert histogram.count == 1
+    assert histogram.max == 5000.0
+    assert histogram.percentile(100) == 5000.0
+    assert sum(histogram.counts) == 1
+
+
+def test_empty_histogram():
+    histogram = LatencyHistogram()
+    assert histogram.mean() == 0.0
+    assert histogram.percentiles([50, 99]) == [0.0, 0.0]
+
+
+def test_merge_is_associative_and_matches_single_histogram():
+    rng = random.Random(7)
+    shards = [[rng.lognormvariate(math.log(10.0), 0.8) for _ in range(10000)] for _ in range(3)]
+    a, b, c = (histogram_of(shard) for shard in shards)
+    left = a.merge(b).merge(c)
+    right = histogram_of(shards[0]).merge(histogram_of(shards[1]).merge(histogram_of(shards[2])))
+    combined = histogram_of(shards[0] + shards[1] + shards[2])
+    for merged in (left, right):
+        assert list(merged.counts) == list(combined.counts)
+        assert merged.count == combined.count
+        assert merged.total == pytest.approx(combined.total)
+        assert (merged.min, merged.max) == (combined.min, combined.max)
+        assert merged.percentiles(PERCENTILES) == combined.percentiles(PERCENTILES)
+    # 合并不改变被合并的一方
+    assert b.count == c.count == 10000
+    assert_within_error(left, shards[0] + shards[1] + shards[2])
+
+
+def test_merge_with_empty_histogram():
+    histogram = histogram_of([1.0, 2.0, 3.0])
+    assert histogram.merge(LatencyHistogram()).count == 3
+    empty = LatencyHistogram().merge(histogram)
+    assert (empty.count, empty.min, empty.max) == (3, 1.0, 3.0)
+
+
+def test_merge_rejects_different_bucket_parameters():
+    with pytest.raises(ValueError):
+        LatencyHistogram().merge(LatencyHistogram(sub_bucket_bits=6))
+    with pytest.raises(ValueError):
+        LatencyHistogram().merge(LatencyHistogram(max_value_ms=1000))
+
+
+@pytest.mark.parametrize("values", [[], [0.0], [0.5, 3.0, 250.0, 90000.0]], ids=["empty", "zero", "spread"])
+def test_dict_round_trip(values):
+    histogram = histogram_of(values)
+    # 结果文件中的直方图经过 JSON 保存再读取
+    restored = LatencyHistogram.from_dict(json.loads(json.dumps(histogram.to_dict())))
+    assert list(restored.counts) == list(histogram.counts)
+    assert (restored.count, restored.total, restored.min, restored.max) == \
+        (histogram.count, histogram.total, histogram.min, histogram.max)
+    assert restored.percentiles(PERCENTILES) == histogram.percentiles(PERCENTILES)
+    # 还原的直方图可以继续记录和合并
+    restored.record(1.0)
+    restored.merge(histogram)
+    assert restored.count == 2 * len(values) + 1
+
+
+def test_dict_round_trip_keeps_custom_parameters():
+    histogram = LatencyHistogram(sub_bucket_bits=5, max_value_ms=60 * 1000)
+    histogram.record(12.5)
+    restored = LatencyHistogram.from_dict(histogram.to_dict())
+    assert (restored.sub_bucket_bits, restored.max_value_ms) == (5, 60 * 1000)
+    assert restored.percentile(50) == histogram.percentile(50)
+
+
+@pytest.mark.parametrize("run_size", [ShortCodeSet.RUN_SIZE, 64])
+def test_short_code_duplicates(monkeypatch, run_size):
+    # run_size 很小时短码分成多段，走 NumPy 排序；默认时全部在缓冲区中，用集合统计
+    monkeypatch.setattr(ShortCodeSet, "RUN_SIZE", run_size)
+    rng = random.Random(5)
+    codes = ["".join(rng.choice("abcXYZ019") for _ in range(6)) for _ in range(500)]
+    codes += ["dup001", "dup001", "dup002", "dup001", "dup002", "x" * 20, "x" * 20]
+    first, second = ShortCodeSet(), ShortCodeSet()
+    for i, code in enumerate(codes):
+        (first if i % 2 else second).add(code)
+    merged = first.merge(second)
+    duplicates, sample = merged.duplicates()
+    assert merged.count == len(codes)
+    assert duplicates == len(codes) - len(set(codes))
+    assert {"dup001", "dup002"} <= set(sample)
@@ -0,0 +1,103 @@
+package com.example.shorturl.cache;
+
+import com.github.benmanes.caffeine.cache.Cache;
+import com.github.benmanes.caffeine.cache.Caffeine;
+import com.github.benmanes.caffeine.cache.stats.CacheStats;
+import io.micrometer.core.instrument.MeterRegistry;
+import io.micrometer.core.instrument.binder.cache.CaffeineCacheMetrics;
+import org.springframework.beans.factory.annotation.Value;
+import org.springframework.stereotype.Component;
+
+import java.time.Duration;
+import java.util.LinkedHashMap;
+import java.util.Map;
+
+/**
+ * 每个应用实例内存中的近端缓存，位于 Redis 之前
+ * 按条数和写入后的存活时间淘汰；不存在的短链接也缓存一小段时间，避免反复穿透到 Redis 和 MySQL。
+ * 命中/未命中/淘汰次数通过 Micrometer 注册为 cache_gets_total、cache_evictions_total 等指标。
+ */
+@Component
+public class NearCache {
+    public static final String CACHE_NAME = "short_url_near_cache";
+    public static final String NEGATIVE_CACHE_NAME = "short_url_near_cache_negative";
+
+    private final Cache<String, String> urls;
+    private final Cache<String, Boolean> missing;
+    private volatile boolean enabled;
+
+    public NearCache(@Value("${short-url.near-cache.enabled:false}") boolean enabled,
+                     @Value("${short-url.near-cache.max-size:100000}") long maxSize,
+                     @Value("${short-url.near-cache.ttl:5s}") Duration ttl,
+                     @Value("${short-url.near-cache.negative-ttl:1s}") Duration negativeTtl,
+                     MeterRegistry meterRegistry) {
+        this.enabled = enabled;
+        this.urls = Caffeine.newBuilder()
+                .maximumSize(maxSize)
+                .expireAfterWrite(ttl)
+                .recordStats()
+                .build();
+        this.missing = Caffeine.newBuilder()
+                .maximumSize(Math.max(1, maxSize / 10))
+                .expireAfterWrite(negativeTtl)
+                .recordStats()
+                .build();
+        CaffeineCacheMetrics.monitor(meterRegistry, urls, CACHE_NAME);
+        CaffeineCacheMetrics.monitor(meterRegistry, missing, NEGATIVE_CACHE_NAME);
+    }
+
+    public boolean isEnabled() {
+        return enabled;
+    }
+
+    /**
+     * 运行时开关，关闭时清空缓存，便于在同一实例上对比开启和关闭的效果
+     */
+    public void setEnabled(boolean enabled) {
+        this.enabled = enabled;
+        if (!enabled) {
+            urls.invalidateAll();
+            missing.invalidateAll();
+        }
+    }
+
+    /**
+     * @return 缓存的原始URL，未缓存或近端缓存关闭时返回 null
+     */
+    public String get(String shortCode) {
+        return enabled ? urls.getIfPresent(shortCode) : null;
+    }
+
+    /**
+     * @return 该短链接最近是否确认过不存在
+     */
+    public boolean isKnownMissing(String shortCode) {
+        return enabled && missing.getIfPresent(shortCode) != null;
+    }
+
+    public void put(String shortCode, String originalUrl) {
+        if (enabled) {
+            urls.put(shortCode, originalUrl);
+            missing.invalidate(shortCode);
+        }
+    }
+
+    public void putMissing(String shortCode) {
+        if (enabled) {
+            missing.put(shortCode, Boolean.TRUE);
+        }
+    }
+
+    public Map<String, Object> stats() {
+        Map<String, Object> stats = new LinkedHashMap<>();
+        stats.put("enabled", enabled);
+        stats.put("size", urls.estimatedSize());
+        stats.put("negativeSize", missing.estimatedSize());
+        CacheStats positive = urls.stats();
+        stats.put("hits", positive.hitCount());
+        stats.put("misses", positive.missCount());
+        stats.put("evictions", positive.evictionCount());
+        stats.put("negativeHits", missing.stats().hitCount());
+        return stats;
+    }
+}
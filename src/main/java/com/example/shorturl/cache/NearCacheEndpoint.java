@@ -0,0 +1,32 @@
+package com.example.shorturl.cache;
+
+import org.springframework.boot.actuate.endpoint.annotation.Endpoint;
+import org.springframework.boot.actuate.endpoint.annotation.ReadOperation;
+import org.springframework.boot.actuate.endpoint.annotation.WriteOperation;
+import org.springframework.stereotype.Component;
+
+import java.util.Map;
+
+/**
+ * Actuator 端点 /actuator/nearcache：GET 查看近端缓存的计数，POST {"enabled": true|false} 在运行时开关
+ */
+@Component
+@Endpoint(id = "nearcache")
+public class NearCacheEndpoint {
+    private final NearCache nearCache;
+
+    public NearCacheEndpoint(NearCache nearCache) {
+        this.nearCache = nearCache;
+    }
+
+    @ReadOperation
+    public Map<String, Object> stats() {
+        return nearCache.stats();
+    }
+
+    @WriteOperation
+    public Map<String, Object> configure(boolean enabled) {
+        nearCache.setEnabled(enabled);
+        return nearCache.stats();
+    }
+}
@@ -2,21 +2,41 @@ package com.example.shorturl.controller;
 
 import com.example.shorturl.entity.ShortUrl;
 import com.example.shorturl.service.ShortUrlService;
+import com.fasterxml.jackson.core.JsonProcessingException;
+import com.fasterxml.jackson.databind.JsonNode;
+import com.fasterxml.jackson.databind.ObjectMapper;
+import jakarta.servlet.http.HttpServletRequest;
+import jakarta.servlet.http.HttpServletResponse;
 import org.springframework.beans.factory.annotation.Autowired;
 import org.springframework.http.HttpStatus;
+import org.springframework.http.MediaType;
 import org.springframework.http.ResponseEntity;
 import org.springframework.web.bind.annotation.*;
 
+import java.io.BufferedReader;
+import java.io.IOException;
+import java.io.Writer;
+import java.util.ArrayList;
+import java.util.List;
+import java.util.Map;
 import java.util.Optional;
 
 @RestController
 @RequestMapping("/short-url")
 public class ShortUrlController {
+    private static final String NDJSON = "application/x-ndjson";
+    // JSON 数组一次最多包含的URL数，更大的导入请使用 NDJSON 流
+    private static final int MAX_BATCH_SIZE = 10000;
+    // NDJSON 流每读满这么多行就创建一批并写回结果
+    private static final int STREAM_CHUNK_SIZE = 1000;
+
     private final ShortUrlService shortUrlService;
+    private final ObjectMapper objectMapper;
 
     @Autowired
-    public ShortUrlController(ShortUrlService shortUrlService) {
+    public ShortUrlController(ShortUrlService shortUrlService, ObjectMapper objectMapper) {
         this.shortUrlService = shortUrlService;
+        this.objectMapper = objectMapper;
     }
 
     @GetMapping
@@ -40,4 +60,96 @@ public class ShortUrlController {
         String shortUrl = shortUrlService.createShortUrl(url);
         return ResponseEntity.status(HttpStatus.CREATED).body(shortUrl);
     }
-}
\ No newline at end of file
+
+    /**
+     * 批量创建：请求体为原始URL的 JSON 数组，返回同样顺序的短链接 JSON 数组
+     */
+    @PostMapping(value = "/batch", consumes = MediaType.APPLICATION_JSON_VALUE)
+    public ResponseEntity<List<String>> addBatch(@RequestBody List<String> urls) {
+        if (urls.isEmpty() || urls.size() > MAX_BATCH_SIZE || urls.stream().anyMatch(u -> u == null || u.isBlank())) {
+            return ResponseEntity.badRequest().build();
+        }
+        return ResponseEntity.status(HttpStatus.CREATED).body(shortUrlService.createShortUrls(urls));
+    }
+
+    /**
+     * 批量创建（流式）：请求体每行一个原始URL（JSON 字符串或 {"url": ...}），边读边按块创建，
+     * 响应每行一个 JSON 字符串形式的短链接，顺序与请求一致，请求体大小不受 MAX_BATCH_SIZE 限制。
+     * 每块在创建前整体校验：第一块中有无效行（无法解析、不是字符串、为空）时返回 400，不创建任何短链接；
+     * 之后的块中有无效行时，该块不创建，响应末尾写一行 {"error": ..., "line": 行号} 并停止处理，
+     * 此前的块已经创建，响应中对应的短链接有效。
+     */
+    @PostMapping(value = "/batch", consumes = NDJSON)
+    public void addBatchStream(HttpServletRequest request, HttpServletResponse response) throws IOException {
+        BufferedReader reader = request.getReader();
+        List<String> chunk = new ArrayList<>(STREAM_CHUNK_SIZE);
+        Writer writer = null;
+        long lineNumber = 0;
+        String line;
+        while ((line = reader.readLine()) != null) {
+            lineNumber++;
+            if (line.isBlank()) {
+                continue;
+            }
+            String url = parseStreamUrl(line);
+            if (url == null) {
+                if (writer == null) {
+                    response.setStatus(HttpStatus.BAD_REQUEST.value());
+                    response.setContentType(MediaType.APPLICATION_JSON_VALUE);
+                    writeError(response.getWriter(), lineNumber);
+                } else {
+                    writeError(writer, lineNumber);
+                }
+                return;
+            }
+            chunk.add(url);
+            if (chunk.size() == STREAM_CHUNK_SIZE) {
+                writer = writer != null ? writer : startStream(response);
+                writeShortUrls(writer, chunk);
+            }
+        }
+        writer = writer != null ? writer : startStream(response);
+        writeShortUrls(writer, chunk);
+        writer.flush();
+    }
+
+    /**
+     * 解析流中的一行，无效时返回 null（与 JSON 数组接口相同，不接受 null 和空白URL）
+     */
+    private String parseStreamUrl(String line) {
+        JsonNode node;
+        try {
+            node = objectMapper.readTree(line);
+        } catch (JsonProcessingException e) {
+            return null;
+        }
+        JsonNode url = node.isObject() ? node.get("url") : node;
+        if (url == null || !url.isTextual() || url.asText().isBlank()) {
+            return null;
+        }
+        return url.asText();
+    }
+
+    private Writer startStream(HttpServletResponse response) throws IOException {
+        response.setStatus(HttpStatus.CREATED.value());
+        response.setContentType(NDJSON);
+        return response.getWriter();
+    }
+
+    private void writeError(Writer writer, long lineNumber) throws IOException {
+        writer.write(objectMapper.writeValueAsString(Map.of("error", "invalid url", "line", lineNumber)));
+        writer.write('\n');
+        writer.flush();
+    }
+
+    private void writeShortUrls(Writer writer, List<String> chunk) throws IOException {
+        if (chunk.isEmpty()) {
+            return;
+        }
+        for (String shortUrl : shortUrlService.createShortUrls(chunk)) {
+            writer.write(objectMapper.writeValueAsString(shortUrl));
+            writer.write('\n');
+        }
+        chunk.clear();
+    }
+}
@@ -14,6 +14,7 @@ public class ShortUrl {
     @Column(name = "short_url", unique = true, nullable = false, length = 32)
     private String shortUrl;
 
+    // 前缀索引 idx_short_url_original_url 由 schema.sql 创建，@Index 无法指定前缀长度
     @Column(name = "original_url", nullable = false, length = 2048)
     private String originalUrl;
 
@@ -2,8 +2,12 @@ package com.example.shorturl.repository;
 
 import com.example.shorturl.entity.ShortUrl;
 import org.springframework.data.jpa.repository.JpaRepository;
+import org.springframework.data.jpa.repository.Query;
+import org.springframework.data.repository.query.Param;
 import org.springframework.stereotype.Repository;
 
+import java.util.Collection;
+import java.util.List;
 import java.util.Optional;
 
 @Repository
@@ -21,4 +25,12 @@ public interface ShortUrlRepository extends JpaRepository<ShortUrl, Long> {
      * @return 短链接对象
      */
     Optional<ShortUrl> findByOriginalUrl(String originalUrl);
+
+    /**
+     * 一次查询出给定原始URL中已经存在的那些，只返回原始URL列
+     * @param originalUrls 原始URL集合
+     * @return 已存在的原始URL
+     */
+    @Query("select s.originalUrl from ShortUrl s where s.originalUrl in :originalUrls")
+    List<String> findExistingOriginalUrls(@Param("originalUrls") Collection<String> originalUrls);
 } 
\ No newline at end of file
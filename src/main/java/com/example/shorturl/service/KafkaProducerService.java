@@ -8,6 +8,8 @@ import org.springframework.beans.factory.annotation.Autowired;
 import org.springframework.kafka.core.KafkaTemplate;
 import org.springframework.stereotype.Service;
 
+import java.util.List;
+
 @Service
 public class KafkaProducerService {
     public static final String TOPIC = "short-url-topic";
@@ -28,4 +30,14 @@ public class KafkaProducerService {
             throw new RuntimeException("Error converting message to JSON", e);
         }
     }
+
+    /**
+     * 批量发送：消息先全部交给生产者的发送缓冲区，由生产者按 batch-size/linger.ms 合并成批，最后 flush 一次
+     */
+    public void sendShortUrlMessages(List<ShortUrlMessage> messages) {
+        for (ShortUrlMessage message : messages) {
+            sendShortUrlMessage(message);
+        }
+        kafkaTemplate.flush();
+    }
 } 
\ No newline at end of file
@@ -0,0 +1,68 @@
+package com.example.shorturl.service;
+
+import org.springframework.beans.factory.annotation.Value;
+import org.springframework.stereotype.Component;
+
+/**
+ * 不需要协调的短码分配器：每个实例按 INSTANCE_ID 拥有独立的编号空间，编号用 base62 编码
+ * 编号 = 秒级时间戳(32位) | 实例ID(8位) | 秒内序号(16位)，不同实例、同一实例的不同秒互不重叠，
+ * 因此 app1..app3 生成的短码不会重复，也不需要查询数据库或 Redis。
+ * 每个实例每秒最多分配 65536 个短码；用完时借用下一秒的编号，逻辑时钟暂时超前于实际时间。
+ * 重启后从当前时间的下一秒开始，只有在重启前逻辑时钟超前（持续超过每秒 65536 个）时才可能与重启前的编号重叠。
+ */
+@Component
+public class ShortCodeAllocator {
+    static final String ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz";
+    // 2025-01-01T00:00:00Z，32 位秒数可以使用到 2161 年
+    private static final long EPOCH_SECONDS = 1735689600L;
+    private static final int INSTANCE_BITS = 8;
+    private static final int SEQUENCE_BITS = 16;
+    private static final long MAX_SEQUENCE = (1L << SEQUENCE_BITS) - 1;
+
+    private final long instanceId;
+    private long second;
+    private long sequence;
+
+    public ShortCodeAllocator(@Value("${INSTANCE_ID:0}") long instanceId) {
+        if (instanceId < 0 || instanceId >= (1L << INSTANCE_BITS)) {
+            throw new IllegalArgumentException("INSTANCE_ID must be between 0 and " + ((1L << INSTANCE_BITS) - 1));
+        }
+        this.instanceId = instanceId;
+        this.second = currentSecond() + 1;
+    }
+
+    public String nextCode() {
+        return encode(nextId());
+    }
+
+    synchronized long nextId() {
+        long now = currentSecond();
+        if (now > second) {
+            second = now;
+            sequence = 0;
+        } else if (sequence > MAX_SEQUENCE) {
+            // 本秒的序号已用完，借用下一秒
+            second++;
+            sequence = 0;
+        }
+        long id = (second << (INSTANCE_BITS + SEQUENCE_BITS)) | (instanceId << SEQUENCE_BITS) | sequence;
+        sequence++;
+        return id;
+    }
+
+    static String encode(long id) {
+        if (id == 0) {
+            return String.valueOf(ALPHABET.charAt(0));
+        }
+        StringBuilder code = new StringBuilder(11);
+        while (id > 0) {
+            code.append(ALPHABET.charAt((int) (id % ALPHABET.length())));
+            id /= ALPHABET.length();
+        }
+        return code.reverse().toString();
+    }
+
+    private static long currentSecond() {
+        return System.currentTimeMillis() / 1000 - EPOCH_SECONDS;
+    }
+}
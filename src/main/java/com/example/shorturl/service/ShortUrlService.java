@@ -13,6 +13,13 @@ public interface ShortUrlService {
      * @return 生成的短链接
      */
     String createShortUrl(String originalUrl);
+
+    /**
+     * 批量创建短链接，Redis 写入走同一个 pipeline，Kafka 消息发送完后统一 flush
+     * @param originalUrls 原始URL列表
+     * @return 生成的短链接，顺序与参数一致
+     */
+    List<String> createShortUrls(List<String> originalUrls);
     
     /**
      * 根据短链接获取原始URL
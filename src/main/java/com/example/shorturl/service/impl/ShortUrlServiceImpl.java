@@ -1,20 +1,31 @@
 package com.example.shorturl.service.impl;
 
+import com.example.shorturl.cache.NearCache;
 import com.example.shorturl.entity.ShortUrl;
 import com.example.shorturl.message.ShortUrlMessage;
 import com.example.shorturl.repository.ShortUrlRepository;
 import com.example.shorturl.service.AsyncService;
 import com.example.shorturl.service.KafkaProducerService;
+import com.example.shorturl.service.ShortCodeAllocator;
 import com.example.shorturl.service.ShortUrlService;
 import jakarta.annotation.Resource;
 import java.util.concurrent.CompletableFuture;
 import org.springframework.beans.factory.annotation.Autowired;
+import org.springframework.data.redis.core.RedisOperations;
 import org.springframework.data.redis.core.RedisTemplate;
+import org.springframework.data.redis.core.SessionCallback;
+import org.springframework.data.redis.core.ValueOperations;
+import org.springframework.jdbc.core.JdbcTemplate;
 import org.springframework.stereotype.Service;
 
+import java.sql.Timestamp;
+import java.util.ArrayList;
+import java.util.HashSet;
 import java.util.List;
 import java.util.Optional;
+import java.util.Set;
 import java.util.concurrent.TimeUnit;
+import java.util.stream.Collectors;
 
 @Service
 public class ShortUrlServiceImpl implements ShortUrlService {
@@ -31,9 +42,22 @@ public class ShortUrlServiceImpl implements ShortUrlService {
     @Resource
     AsyncService asyncService;
 
+    @Resource
+    NearCache nearCache;
+
+    @Resource
+    ShortCodeAllocator shortCodeAllocator;
+
+    @Resource
+    JdbcTemplate jdbcTemplate;
+
     private static final String REDIS_KEY_PREFIX = "short_url:";
     private static final long REDIS_EXPIRE_TIME = 1;
     private static final TimeUnit REDIS_EXPIRE_UNIT = TimeUnit.MINUTES;
+    private static final String INSERT_SQL =
+            "INSERT IGNORE INTO short_url (short_url, original_url, create_time) VALUES (?, ?, ?)";
+    // 每次 executeBatch 的行数，驱动开启 rewriteBatchedStatements 后合并为一条多行 INSERT
+    private static final int INSERT_BATCH_SIZE = 500;
 
     @Override
     public String createShortUrl(String originalUrl) {
@@ -41,6 +65,8 @@ public class ShortUrlServiceImpl implements ShortUrlService {
         ShortUrl shortUrl = new ShortUrl();
         shortUrl.setOriginalUrl(originalUrl);
         shortUrl.setShortUrl(generateShortCode());
+        // Redis 是异步写入的，先放进本实例的近端缓存，创建后立即读取不会落空
+        nearCache.put(shortUrl.getShortUrl(), originalUrl);
         asyncService.runSync(() -> {
             // 保存到Redis
             String redisKey = REDIS_KEY_PREFIX + shortUrl.getShortUrl();
@@ -52,13 +78,53 @@ public class ShortUrlServiceImpl implements ShortUrlService {
         return shortUrl.getShortUrl();
     }
 
+    @Override
+    public List<String> createShortUrls(List<String> originalUrls) {
+        List<ShortUrlMessage> messages = new ArrayList<>(originalUrls.size());
+        List<String> shortCodes = new ArrayList<>(originalUrls.size());
+        for (String originalUrl : originalUrls) {
+            String shortCode = generateShortCode();
+            shortCodes.add(shortCode);
+            messages.add(new ShortUrlMessage(shortCode, originalUrl));
+            // 与单个创建相同：pipeline 写入 Redis 之前读取不会落空，也不会被记入近端缓存的不存在列表
+            nearCache.put(shortCode, originalUrl);
+        }
+        asyncService.runSync(() -> {
+            // 所有 SET 命令在同一个连接上用 pipeline 发送，只等待一次往返
+            redisTemplate.executePipelined(new SessionCallback<Object>() {
+                @Override
+                @SuppressWarnings("unchecked")
+                public <K, V> Object execute(RedisOperations<K, V> operations) {
+                    ValueOperations<String, String> ops = (ValueOperations<String, String>) operations.opsForValue();
+                    for (ShortUrlMessage message : messages) {
+                        ops.set(REDIS_KEY_PREFIX + message.getShortUrl(), message.getOriginalUrl(),
+                                REDIS_EXPIRE_TIME, REDIS_EXPIRE_UNIT);
+                    }
+                    return null;
+                }
+            });
+            kafkaProducerService.sendShortUrlMessages(messages);
+        });
+        return shortCodes;
+    }
+
     @Override
     public Optional<String> getOriginalUrl(String shortCode) {
-        // 先从Redis中获取
+        // 先查本实例的近端缓存（未开启时总是未命中）
+        String nearUrl = nearCache.get(shortCode);
+        if (nearUrl != null) {
+            return Optional.of(nearUrl);
+        }
+        if (nearCache.isKnownMissing(shortCode)) {
+            return Optional.empty();
+        }
+
+        // 再从Redis中获取
         String redisKey = REDIS_KEY_PREFIX + shortCode;
         String longUrl = redisTemplate.opsForValue().get(redisKey);
 
         if (longUrl != null) {
+            nearCache.put(shortCode, longUrl);
             return Optional.of(longUrl);
         }
 
@@ -68,9 +134,11 @@ public class ShortUrlServiceImpl implements ShortUrlService {
             ShortUrl shortUrl = shortUrlOpt.get();
             // 更新Redis缓存
             redisTemplate.opsForValue().set(redisKey, shortUrl.getOriginalUrl(), REDIS_EXPIRE_TIME, REDIS_EXPIRE_UNIT);
+            nearCache.put(shortCode, shortUrl.getOriginalUrl());
             return Optional.of(shortUrl.getOriginalUrl());
         }
 
+        nearCache.putMissing(shortCode);
         return Optional.empty();
     }
 
@@ -81,16 +149,24 @@ public class ShortUrlServiceImpl implements ShortUrlService {
 
     @Override
     public void addBatch(List<ShortUrl> list) {
-        // 检查URL是否已存在
-        final var saveToDb = list.stream().filter(i -> {
-            Optional<ShortUrl> existingUrl = shortUrlRepository.findByOriginalUrl(i.getOriginalUrl());
-            return existingUrl.isEmpty();
-        }).toList();
-        shortUrlRepository.saveAll(saveToDb);
+        if (list.isEmpty()) {
+            return;
+        }
+        // 检查URL是否已存在：整批只查询一次，而不是每条消息一次
+        Set<String> existing = new HashSet<>(shortUrlRepository.findExistingOriginalUrls(
+                list.stream().map(ShortUrl::getOriginalUrl).collect(Collectors.toSet())));
+        final var saveToDb = list.stream().filter(i -> !existing.contains(i.getOriginalUrl())).toList();
+        // 主键是 IDENTITY 自增，Hibernate 不会批量执行这类插入，saveAll 仍是逐行 INSERT；改用 JDBC 批量插入。
+        // Kafka 至少投递一次，重复投递的短链接被 INSERT IGNORE 跳过，不会让整批失败
+        jdbcTemplate.batchUpdate(INSERT_SQL, saveToDb, INSERT_BATCH_SIZE, (ps, shortUrl) -> {
+            ps.setString(1, shortUrl.getShortUrl());
+            ps.setString(2, shortUrl.getOriginalUrl());
+            ps.setTimestamp(3, Timestamp.valueOf(shortUrl.getCreateTime()));
+        });
     }
 
     private String generateShortCode() {
-        // 生成6位随机字符串
-        return java.util.UUID.randomUUID().toString().substring(0, 6);
+        // 按实例划分编号空间的 base62 短码，多个实例之间不会重复
+        return shortCodeAllocator.nextCode();
     }
 } 
\ No newline at end of file
@@ -0,0 +1,15 @@
+-- 表结构由 Hibernate (ddl-auto: update) 创建，这里补充 JPA 注解表达不了的索引；
+-- 设置了 spring.jpa.defer-datasource-initialization，脚本在 Hibernate 建表之后执行，每次启动都会运行，需要可重复执行
+
+-- 批量写入前按原始URL查询已存在的记录 (ShortUrlRepository.findExistingOriginalUrls)，没有索引时每批都要全表扫描。
+-- original_url 最长 2048 个字符，utf8mb4 下超过 InnoDB 索引长度上限，只索引前 255 个字符（前缀索引同样可用于等值和 IN 查询）
+SET @create_index = (
+    SELECT IF(COUNT(*) = 0,
+              'CREATE INDEX idx_short_url_original_url ON short_url (original_url(255))',
+              'DO 0')
+    FROM information_schema.statistics
+    WHERE table_schema = DATABASE() AND table_name = 'short_url' AND index_name = 'idx_short_url_original_url'
+);
+PREPARE create_index FROM @create_index;
+EXECUTE create_index;
+DEALLOCATE PREPARE create_index;
@@ -0,0 +1,53 @@
+package com.example.shorturl.service;
+
+import com.example.shorturl.entity.ShortUrl;
+import jakarta.persistence.Column;
+import org.junit.jupiter.api.Test;
+
+import java.util.HashSet;
+import java.util.Set;
+
+import static org.junit.jupiter.api.Assertions.*;
+
+class ShortCodeAllocatorTest {
+    // 超过每秒 65536 个，覆盖借用下一秒编号的分支
+    private static final int CODES_PER_INSTANCE = 200_000;
+
+    @Test
+    void codesFromDifferentInstancesNeverCollide() {
+        Set<String> codes = new HashSet<>();
+        for (long instanceId : new long[]{1, 2, 3}) {
+            ShortCodeAllocator allocator = new ShortCodeAllocator(instanceId);
+            for (int i = 0; i < CODES_PER_INSTANCE; i++) {
+                String code = allocator.nextCode();
+                assertTrue(codes.add(code), "duplicate short code " + code + " from instance " + instanceId);
+            }
+        }
+    }
+
+    @Test
+    void codesFitInShortUrlColumn() throws NoSuchFieldException {
+        int columnLength = ShortUrl.class.getDeclaredField("shortUrl").getAnnotation(Column.class).length();
+        ShortCodeAllocator allocator = new ShortCodeAllocator(255);
+        for (int i = 0; i < 1000; i++) {
+            String code = allocator.nextCode();
+            assertTrue(code.length() <= columnLength, code);
+            assertTrue(code.chars().allMatch(c -> ShortCodeAllocator.ALPHABET.indexOf(c) >= 0), code);
+        }
+        assertTrue(ShortCodeAllocator.encode(Long.MAX_VALUE).length() <= columnLength);
+    }
+
+    @Test
+    void encodeIsBase62() {
+        assertEquals("0", ShortCodeAllocator.encode(0));
+        assertEquals("z", ShortCodeAllocator.encode(61));
+        assertEquals("10", ShortCodeAllocator.encode(62));
+        assertEquals("AzL8n0Y58m7", ShortCodeAllocator.encode(Long.MAX_VALUE));
+    }
+
+    @Test
+    void rejectsInstanceIdOutOfRange() {
+        assertThrows(IllegalArgumentException.class, () -> new ShortCodeAllocator(-1));
+        assertThrows(IllegalArgumentException.class, () -> new ShortCodeAllocator(256));
+    }
+}